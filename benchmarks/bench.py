@@ -0,0 +1,347 @@
+"""Offline benchmarks for the research agent
+
+Runs the agent, the Flask endpoints and the analysis functions against
+FakeTavilyClient, so no API key or network is needed. Reports throughput,
+p50/p99 latency and peak traced memory, and can save the results as a
+baseline and compare later runs against it.
+
+    python benchmarks/bench.py --sizes 10,1000 --save
+    python benchmarks/bench.py --compare benchmarks/baselines/<commit>.json
+"""
+from typing import Callable, Dict, List, Optional
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# The app module refuses to start without a key and reads the queue backend
+# at import time; the benchmarks never reach the network and keep everything in memory
+os.environ.setdefault('TAVILY_API_KEY', 'benchmark')
+os.environ['QUEUE_BACKEND'] = 'memory'
+os.environ['CACHE_BACKEND'] = 'memory'
+os.environ['RATE_LIMIT_BACKEND'] = 'memory'
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+from agent import WorkflowAgent
+from cache import ResultsCache, LRUCache
+from events import EventBus
+from rate_limiter import RateLimiter
+from retry import CircuitBreaker, RetryPolicy
+from fake_tavily import FakeTavilyClient, LatencyModel
+
+CATEGORIES = ('technology', 'science', 'business', 'health', 'general')
+BASELINE_DIR = os.path.join(ROOT, 'benchmarks', 'baselines')
+
+def make_items(n: int, unique: float, seed: int = 0) -> List[dict]:
+    """n task descriptions; `unique` is the fraction of distinct queries"""
+    distinct = max(1, int(n * unique))
+    return [{
+        'query': f"benchmark query {(i * 7919 + seed) % distinct}",
+        'category': CATEGORIES[i % len(CATEGORIES)],
+        'importance': 1 + i % 5
+    } for i in range(n)]
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(q * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+class Measurement:
+    """Wall time, per-operation latencies and peak traced memory of one scenario"""
+
+    def __init__(self, suite: str, scenario: str, n: int, trace_memory: bool):
+        self.suite = suite
+        self.scenario = scenario
+        self.n = n
+        self.trace_memory = trace_memory
+        self.latencies: List[float] = []
+        self.extra: Dict[str, float] = {}
+
+    def __enter__(self) -> "Measurement":
+        if self.trace_memory:
+            tracemalloc.start()
+            tracemalloc.reset_peak()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.wall = time.perf_counter() - self.start
+        self.peak = 0
+        if self.trace_memory:
+            self.peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+    def result(self) -> dict:
+        latencies = sorted(self.latencies)
+        return {
+            'suite': self.suite,
+            'scenario': self.scenario,
+            'n': self.n,
+            'wall_s': round(self.wall, 4),
+            'throughput': round(self.n / self.wall, 1) if self.wall else 0.0,
+            'p50_ms': round(percentile(latencies, 0.50) * 1000, 3),
+            'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+            'peak_mem_mb': round(self.peak / 2 ** 20, 2) if self.trace_memory else None,
+            **self.extra
+        }
+
+def make_agent(args, client: Optional[FakeTavilyClient] = None) -> WorkflowAgent:
+    """An agent wired to the fake client, with no rate limit and short retry delays"""
+    return WorkflowAgent(
+        api_key='benchmark',
+        max_workers=args.workers,
+        client=client or make_client(args),
+        rate_limiter=RateLimiter(calls=10 ** 9, period=1),
+        results_cache=ResultsCache(LRUCache(max_entries=args.cache_entries, ttl=None)),
+        events=EventBus(),
+        retry_policy=RetryPolicy(max_retries=3, base_delay=0.001, max_delay=0.01),
+        circuit_breaker=CircuitBreaker('benchmark', failure_threshold=10 ** 9)
+    )
+
+def make_client(args) -> FakeTavilyClient:
+    return FakeTavilyClient(latency=LatencyModel.parse(args.latency), error_rate=args.error_rate,
+                            result_count=args.results, content_words=args.content_words, seed=args.seed)
+
+def time_process_task(agent: WorkflowAgent, latencies: List[float]) -> None:
+    """Record how long each process_task call takes, without changing what it does"""
+    process_task = agent.process_task
+
+    async def timed(task):
+        start = time.perf_counter()
+        try:
+            return await process_task(task)
+        finally:
+            latencies.append(time.perf_counter() - start)
+
+    agent.process_task = timed
+
+def bench_agent(args, n: int) -> List[dict]:
+    """process_tasks over a queue of n tasks"""
+    agent = make_agent(args)
+    client = agent.client
+    agent.add_tasks(make_items(n, args.unique, args.seed))
+    with Measurement('agent', 'process_tasks', n, args.memory) as m:
+        time_process_task(agent, m.latencies)
+        results = asyncio.run(agent.process_tasks())
+    m.extra['failed'] = sum(1 for r in results if r['result']['status'] != 'success')
+    m.extra['upstream_calls'] = client.calls
+    return [m.result()]
+
+def bench_endpoints(args, n: int) -> List[dict]:
+    """The Flask endpoints through the test client, on a fresh agent"""
+    import app as app_module
+    from jobs import JobManager
+
+    agent = make_agent(args)
+    app_module.agent = agent
+    app_module.jobs = JobManager(agent, loop=app_module.jobs.loop)
+    client = app_module.app.test_client()
+    items = make_items(n, args.unique, args.seed)
+    results = []
+
+    def run(scenario: str, count: int, requests: Callable[[Measurement], None]) -> None:
+        with Measurement('endpoints', scenario, count, args.memory) as m:
+            requests(m)
+        results.append(m.result())
+
+    def request(m: Measurement, method: str, url: str, **kwargs):
+        start = time.perf_counter()
+        response = client.open(url, method=method, **kwargs)
+        m.latencies.append(time.perf_counter() - start)
+        if response.status_code >= 400:
+            raise RuntimeError(f"{method} {url} returned {response.status_code}: {response.get_data(as_text=True)[:200]}")
+        return response
+
+    def add_task(m):
+        for item in items:
+            request(m, 'POST', '/api/add-task', json=item)
+
+    def add_tasks(m):
+        size = args.batch_size
+        for start in range(0, len(items), size):
+            request(m, 'POST', '/api/add-tasks', json=items[start:start + size])
+
+    def queue_status(m):
+        cursor = None
+        while True:
+            url = '/api/queue-status?summary=1&limit=100' + (f'&cursor={cursor}' if cursor else '')
+            cursor = request(m, 'GET', url).get_json()['next_cursor']
+            if not cursor:
+                break
+
+    def task_lookup(m):
+        for task in list(agent.recent_tasks)[:n]:
+            request(m, 'GET', f'/api/tasks/{task}')
+
+    def process(m):
+        time_process_task(agent, m.latencies)
+        request(m, 'POST', '/api/process-tasks')
+
+    run('add-task', n, add_task)
+    run('add-tasks', n, add_tasks)
+    run('queue-status', 2 * n, queue_status)
+    run('process-tasks', 2 * n, process)
+    run('task-lookup', min(n, len(agent.recent_tasks)), task_lookup)
+    return results
+
+def bench_analysis(args, n: int) -> List[dict]:
+    """Result analysis, category insights and credibility scoring on n responses"""
+    agent = make_agent(args)
+    client = agent.client
+    items = make_items(n, 1.0, args.seed)
+    responses = [client.make_response(item['query']) for item in items]
+
+    async def analyze_all(m: Measurement) -> None:
+        for item, response in zip(items, responses):
+            start = time.perf_counter()
+            analyzed = agent.analyzer.analyze(response)
+            await agent._analyze_results(response, analyzed)
+            agent._get_category_insights(item['category'], response, analyzed)
+            m.latencies.append(time.perf_counter() - start)
+
+    with Measurement('analysis', 'analyze', n, args.memory) as m:
+        asyncio.run(analyze_all(m))
+    return [m.result()]
+
+SUITES = {
+    'agent': bench_agent,
+    'endpoints': bench_endpoints,
+    'analysis': bench_analysis
+}
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+def print_table(results: List[dict], baseline: Optional[Dict[tuple, dict]] = None) -> None:
+    header = f"{'suite':<10} {'scenario':<14} {'n':>8} {'ops/s':>12} {'p50 ms':>10} {'p99 ms':>10} {'peak MB':>9}"
+    if baseline is not None:
+        header += f" {'vs base':>9}"
+    print(header)
+    print('-' * len(header))
+    for r in results:
+        peak = f"{r['peak_mem_mb']:.2f}" if r['peak_mem_mb'] is not None else '-'
+        line = (f"{r['suite']:<10} {r['scenario']:<14} {r['n']:>8} {r['throughput']:>12.1f} "
+                f"{r['p50_ms']:>10.3f} {r['p99_ms']:>10.3f} {peak:>9}")
+        if baseline is not None:
+            base = baseline.get((r['suite'], r['scenario'], r['n']))
+            change = f"{(r['throughput'] / base['throughput'] - 1) * 100:+.1f}%" if base and base['throughput'] else 'new'
+            line += f" {change:>9}"
+        print(line)
+
+def compare(results: List[dict], baseline: Dict[tuple, dict], tolerance: float) -> List[str]:
+    """Scenarios whose throughput dropped, or p99 or peak memory grew, by more than tolerance"""
+    regressions = []
+    for r in results:
+        base = baseline.get((r['suite'], r['scenario'], r['n']))
+        if not base:
+            continue
+        name = f"{r['suite']}/{r['scenario']}/{r['n']}"
+        if base['throughput'] and r['throughput'] < base['throughput'] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {base['throughput']} -> {r['throughput']} ops/s")
+        if base['p99_ms'] and r['p99_ms'] > base['p99_ms'] * (1 + tolerance):
+            regressions.append(f"{name}: p99 {base['p99_ms']} -> {r['p99_ms']} ms")
+        if base.get('peak_mem_mb') and r['peak_mem_mb'] and r['peak_mem_mb'] > base['peak_mem_mb'] * (1 + tolerance):
+            regressions.append(f"{name}: peak memory {base['peak_mem_mb']} -> {r['peak_mem_mb']} MB")
+    return regressions
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Offline benchmarks against a fake Tavily backend")
+    parser.add_argument('--suites', default='agent,endpoints,analysis',
+                        help=f"comma-separated suites to run ({', '.join(SUITES)})")
+    parser.add_argument('--sizes', default='10,1000,100000', help="comma-separated task counts")
+    parser.add_argument('--latency', default='lognormal:0.002,0.5',
+                        help="fake upstream latency: constant:S, uniform:LO,HI, lognormal:MEDIAN,SIGMA or exponential:MEAN")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="fraction of upstream calls that fail transiently")
+    parser.add_argument('--results', type=int, default=5, help="results per fake response")
+    parser.add_argument('--content-words', type=int, default=60, help="words of content per result")
+    parser.add_argument('--unique', type=float, default=0.5, help="fraction of distinct queries among the tasks")
+    parser.add_argument('--workers', type=int, default=50, help="concurrent tasks per batch")
+    parser.add_argument('--cache-entries', type=int, default=1000, help="in-memory results cache size")
+    parser.add_argument('--batch-size', type=int, default=1000, help="tasks per /api/add-tasks request")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-memory', dest='memory', action='store_false',
+                        help="skip tracemalloc, which slows everything down noticeably")
+    parser.add_argument('--save', nargs='?', const='', metavar='PATH',
+                        help="save results as a baseline (default: benchmarks/baselines/<commit>.json)")
+    parser.add_argument('--compare', metavar='PATH', help="compare against a saved baseline")
+    parser.add_argument('--tolerance', type=float, default=0.15,
+                        help="relative change counted as a regression when comparing (default 0.15)")
+    args = parser.parse_args(argv)
+
+    suites = [s.strip() for s in args.suites.split(',') if s.strip()]
+    unknown = [s for s in suites if s not in SUITES]
+    if unknown:
+        parser.error(f"unknown suites: {', '.join(unknown)}")
+    sizes = [int(s) for s in args.sizes.split(',') if s.strip()]
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            saved = json.load(f)
+        baseline = {(r['suite'], r['scenario'], r['n']): r for r in saved['results']}
+        if saved['meta'].get('settings') != settings(args):
+            print("warning: baseline was recorded with different settings; numbers may not be comparable")
+
+    results = []
+    for suite in suites:
+        for n in sizes:
+            print(f"running {suite} with {n} tasks...", file=sys.stderr)
+            results.extend(SUITES[suite](args, n))
+
+    print_table(results, baseline)
+
+    if args.save is not None:
+        path = args.save or os.path.join(BASELINE_DIR, f"{git_commit()}.json")
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump({
+                'meta': {
+                    'commit': git_commit(),
+                    'recorded_at': datetime.now().isoformat(),
+                    'python': platform.python_version(),
+                    'platform': platform.platform(),
+                    'settings': settings(args)
+                },
+                'results': results
+            }, f, indent=2)
+        print(f"saved baseline to {path}")
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if regressions else 0
+    return 0
+
+def settings(args) -> dict:
+    """The options that change what is measured, stored with baselines"""
+    return {
+        'latency': args.latency,
+        'error_rate': args.error_rate,
+        'results': args.results,
+        'content_words': args.content_words,
+        'unique': args.unique,
+        'workers': args.workers,
+        'cache_entries': args.cache_entries,
+        'batch_size': args.batch_size,
+        'seed': args.seed,
+        'memory': args.memory
+    }
+
+if __name__ == "__main__":
+    sys.exit(main())
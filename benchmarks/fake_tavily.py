@@ -0,0 +1,124 @@
+from typing import Dict, Optional, Sequence
+import asyncio
+import hashlib
+import math
+import random
+
+# Words the fake results are built from. Category keywords from analysis.CATEGORY_RULES
+# are mixed in so category insights and key concepts have something to find.
+VOCABULARY = (
+    'system', 'network', 'model', 'data', 'learning', 'quantum', 'energy', 'market', 'growth',
+    'strategy', 'therapy', 'trial', 'study', 'research', 'evidence', 'theory', 'future', 'trend',
+    'innovation', 'challenge', 'impact', 'risk', 'safety', 'industry', 'discovery', 'python',
+    'async', 'performance', 'latency', 'throughput', 'the', 'and', 'of', 'with', 'for'
+)
+
+DOMAINS = (
+    'example.com', 'news.example.org', 'cs.stanford.edu', 'nih.gov', 'en.wikipedia.org',
+    'ox.ac.uk', 'nature.com', 'blog.example.io', 'archive.org', 'research-lab.com'
+)
+
+class LatencyModel:
+    """A latency distribution, written as "kind:params"
+
+    constant:0.05          always 50 ms
+    uniform:0.01,0.1       uniform between 10 and 100 ms
+    lognormal:0.05,0.5     median 50 ms, sigma 0.5 (long right tail)
+    exponential:0.05       mean 50 ms
+    """
+
+    KINDS = ('constant', 'uniform', 'lognormal', 'exponential')
+
+    def __init__(self, kind: str = 'constant', *params: float):
+        if kind not in self.KINDS:
+            raise ValueError(f"Unknown latency distribution: {kind}")
+        self.kind = kind
+        self.params = params or (0.0,)
+
+    @classmethod
+    def parse(cls, spec: str) -> "LatencyModel":
+        kind, _, params = spec.partition(':')
+        return cls(kind, *(float(p) for p in params.split(',') if p))
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == 'constant':
+            return self.params[0]
+        if self.kind == 'uniform':
+            low, high = self.params[0], self.params[1] if len(self.params) > 1 else self.params[0]
+            return rng.uniform(low, high)
+        if self.kind == 'lognormal':
+            median, sigma = self.params[0], self.params[1] if len(self.params) > 1 else 0.5
+            return median * math.exp(rng.gauss(0, sigma)) if median > 0 else 0.0
+        return rng.expovariate(1 / self.params[0]) if self.params[0] > 0 else 0.0
+
+    def __str__(self) -> str:
+        return f"{self.kind}:{','.join(str(p) for p in self.params)}"
+
+class FakeHTTPError(Exception):
+    """Stands in for an HTTP error response; retry.error_status reads .status"""
+
+    def __init__(self, status: int, headers: Optional[Dict[str, str]] = None):
+        super().__init__(f"{status}, message='Fake upstream error'")
+        self.status = status
+        self.headers = headers or {}
+
+class FakeTavilyClient:
+    """Deterministic offline stand-in for AsyncTavilyClient
+
+    Everything is derived from (seed, query, attempt number), so a run is
+    reproducible: the same query gets the same results, latency and
+    errors every time, and a retried call can succeed where the first one
+    failed. Errors are raised as FakeHTTPError with one of error_statuses.
+    """
+
+    def __init__(self, latency: Optional[LatencyModel] = None, error_rate: float = 0.0,
+                 error_statuses: Sequence[int] = (503, 429), result_count: int = 5,
+                 content_words: int = 60, seed: int = 0):
+        self.latency = latency or LatencyModel()
+        self.error_rate = error_rate
+        self.error_statuses = tuple(error_statuses)
+        self.result_count = result_count
+        self.content_words = content_words
+        self.seed = seed
+        self.calls = 0
+        self.errors = 0
+        self._attempts: Dict[str, int] = {}
+
+    def _rng(self, *parts) -> random.Random:
+        digest = hashlib.blake2b(repr((self.seed,) + parts).encode(), digest_size=8).digest()
+        return random.Random(int.from_bytes(digest, 'big'))
+
+    def make_response(self, query: str, max_results: int = 5, include_answer: bool = True) -> dict:
+        """The response body for a query, without latency or errors"""
+        rng = self._rng('response', query)
+        results = []
+        for i in range(min(max_results, self.result_count)):
+            domain = rng.choice(DOMAINS)
+            words = ' '.join(rng.choice(VOCABULARY) for _ in range(self.content_words))
+            results.append({
+                'title': f"{query} - result {i + 1}",
+                'url': f"https://{domain}/{rng.randrange(100000)}",
+                'content': f"{query} {words}",
+                'score': round(rng.random(), 4)
+            })
+        response = {'query': query, 'results': results, 'response_time': 0.0}
+        if include_answer:
+            response['answer'] = f"{query}: " + ' '.join(rng.choice(VOCABULARY) for _ in range(30))
+        return response
+
+    async def search(self, query: str, search_depth: str = "basic", include_answer: bool = False,
+                     max_results: int = 5, **kwargs) -> dict:
+        attempt = self._attempts.get(query, 0)
+        self._attempts[query] = attempt + 1
+        self.calls += 1
+        rng = self._rng('call', query, attempt)
+        delay = self.latency.sample(rng)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if self.error_rate and rng.random() < self.error_rate:
+            self.errors += 1
+            raise FakeHTTPError(rng.choice(self.error_statuses))
+        return self.make_response(query, max_results, include_answer)
+
+    async def close(self) -> None:
+        pass
@@ -1,41 +1,38 @@
-from typing import Dict, List, Optional
-from dataclasses import dataclass
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from tavily import TavilyClient
 import asyncio
-from datetime import datetime
-import json
-import aiohttp
-import time
-from functools import wraps
+from datetime import datetime, timedelta
 from dotenv import load_dotenv
+import logging
 import os
+import sys
+import threading
+import time
+import uuid
+from config import Config
+from task_queue import TaskQueue
+from rate_limiter import RateLimiter
+from cache import ResultsCache, SingleFlight, make_cache_key
+from search_client import AsyncTavilyClient
+from events import EventBus
+from analysis import AnalyzedText, TextAnalyzer, default_analyzer
+from credibility import CredibilityScorer, default_scorer
+from persistence import TaskStore
+from retry import CircuitBreaker, CircuitOpenError, RetryPolicy, error_status, is_transient
+from metrics import MetricsRegistry, SampledLogger
+from result_store import ResultStore
+from similarity import SimilarMatch, SimilarityIndex
+from local_index import LocalIndex
+from scheduler import DeadlineScheduler
 
-def rate_limit(calls: int, period: float):
-    """Rate limiting decorator"""
-    def decorator(func):
-        last_reset = time.time()
-        calls_made = 0
+logger = logging.getLogger(__name__)
 
-        @wraps(func)
-        async def wrapper(*args, **kwargs):
-            nonlocal last_reset, calls_made
-            
-            current = time.time()
-            if current - last_reset >= period:
-                calls_made = 0
-                last_reset = current
-            
-            if calls_made >= calls:
-                wait_time = period - (current - last_reset)
-                if wait_time > 0:
-                    await asyncio.sleep(wait_time)
-                    last_reset = time.time()
-                    calls_made = 0
-            
-            calls_made += 1
-            return await func(*args, **kwargs)
-        return wrapper
-    return decorator
+# asyncio.timeout, Task.uncancel and create_task(context=) are 3.11 additions
+if sys.version_info < (3, 11):
+    raise RuntimeError("Python 3.11 or newer is required")
 
 class ResearchError(Exception):
     """Custom exception for research-related errors"""
@@ -45,161 +42,545 @@ class ReasoningError(Exception):
     """Custom exception for reasoning-related errors"""
     pass
 
-@dataclass
+@dataclass(slots=True)
 class ResearchTask:
     query: str
     category: str
     importance: int
     created_at: datetime
+    task_id: str = field(default_factory=lambda: uuid.uuid4().hex)
     status: str = "pending"
     error: Optional[str] = None
-    research_results: Optional[dict] = None
+    # ID of the task's search response in the agent's ResultStore
+    result_id: Optional[str] = None
     reasoning_analysis: Optional[str] = None
+    # The task times out if it has not finished by then
+    deadline: Optional[datetime] = None
 
 class WorkflowAgent:
-    def __init__(self, api_key: str, max_retries: int = 3):
-        self.client = TavilyClient(api_key=api_key)
-        self.task_queue: List[ResearchTask] = []
-        self.results_cache: Dict[str, dict] = {}
+    def __init__(self, api_key: str, max_retries: int = Config.MAX_RETRIES, max_workers: int = Config.MAX_WORKERS,
+                 rate_limiter: Optional[RateLimiter] = None, results_cache: Optional[ResultsCache] = None,
+                 client=None, events: Optional[EventBus] = None, analyzer: Optional[TextAnalyzer] = None,
+                 credibility: Optional[CredibilityScorer] = None, store: Optional[TaskStore] = None,
+                 retry_policy: Optional[RetryPolicy] = None, circuit_breaker: Optional[CircuitBreaker] = None,
+                 metrics: Optional[MetricsRegistry] = None, results: Optional[ResultStore] = None,
+                 similarity: Optional[SimilarityIndex] = None, local_index: Optional[LocalIndex] = None):
+        self.api_key = api_key
+        if client is None:
+            if Config.SEARCH_TRANSPORT == "thread":
+                client = TavilyClient(api_key=api_key)
+            else:
+                client = AsyncTavilyClient(api_key=api_key)
+        self.client = client
+        self.rate_limiter = rate_limiter or RateLimiter.from_config()
+        self.task_queue = TaskQueue()
+        # Finished tasks, kept for per-task lookups after they leave the queue
+        self.recent_tasks: "OrderedDict[str, ResearchTask]" = OrderedDict()
+        self.max_recent_tasks = Config.TASK_HISTORY
+        # Tasks are retired on the loop and by cancel_task on request threads
+        self._recent_lock = threading.Lock()
+        self.results_cache = results_cache if results_cache is not None else ResultsCache.from_config()
+        self.inflight = SingleFlight()
+        # Optional near-duplicate tier, consulted after an exact cache miss
+        self.similarity = similarity if similarity is not None else SimilarityIndex.from_config()
+        # Optional full-text index of every fetched result, for offline search and local-first answers
+        self.local_index = local_index if local_index is not None else LocalIndex.from_config()
+        self.local_first = Config.LOCAL_FIRST
+        self.results = results if results is not None else ResultStore.from_config()
+        self.events = events if events is not None else EventBus()
+        self.analyzer = analyzer or default_analyzer
+        if credibility is None:
+            credibility = CredibilityScorer.from_file(Config.CREDIBILITY_RULES) if Config.CREDIBILITY_RULES else default_scorer
+        self.credibility = credibility
+        self.store = store
         self.max_retries = max_retries
-        
-    def add_task(self, query: str, category: str, importance: int) -> None:
-        """Add a new task to the queue"""
+        self.retry_policy = retry_policy or RetryPolicy(max_retries=max_retries)
+        self.circuit_breaker = circuit_breaker or CircuitBreaker("tavily")
+        self.max_workers = max(1, max_workers)
+        if Config.SEARCH_MODE not in ("importance", "tiered"):
+            raise ValueError(f"Unknown search mode: {Config.SEARCH_MODE}")
+        self.search_mode = Config.SEARCH_MODE
+        self.max_results = Config.MAX_RESULTS
+        self.search_costs = {"basic": Config.SEARCH_COST_BASIC, "advanced": Config.SEARCH_COST_ADVANCED}
+        # Moving average of upstream call latency per depth, for deadline planning (0 until observed),
+        # and when each was last updated
+        self.search_estimates = {"basic": 0.0, "advanced": 0.0}
+        self._estimated_at = {"basic": 0.0, "advanced": 0.0}
+        # asyncio tasks running each task, so a running task can be cancelled from any thread
+        self._running: Dict[str, asyncio.Task] = {}
+        self._cancel_requested: set = set()
+        # Blocking clients get their own pool, so calls that hang cannot starve the loop's default executor
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.log = SampledLogger(logger, Config.LOG_SAMPLE_RATE)
+        self.metrics = metrics if metrics is not None else MetricsRegistry()
+        self._register_metrics()
+
+    def _register_metrics(self) -> None:
+        """Create the hot-path metrics and the gauges read at scrape time"""
+        m = self.metrics
+        self.stage_seconds = m.histogram(
+            'research_stage_seconds', 'Time spent in each stage of processing a task', ['stage'])
+        self.task_seconds = m.histogram(
+            'research_task_seconds', 'End-to-end time to process a task', ['status'])
+        self.tasks_total = m.counter('research_tasks_total', 'Tasks processed', ['status'])
+        self.cache_lookups = m.counter('research_cache_lookups_total', 'Results cache lookups', ['result'])
+        self.similar_lookups = m.counter(
+            'research_similar_lookups_total', 'Near-duplicate lookups after an exact cache miss', ['result'])
+        self.errors_total = m.counter('research_errors_total', 'Task failures by error type', ['type'])
+        self.upstream_errors = m.counter(
+            'research_upstream_errors_total', 'Failed Tavily calls by error type', ['type'])
+        self.upstream_retries = m.counter('research_upstream_retries_total', 'Tavily calls retried after a transient error')
+        self.search_seconds = m.histogram(
+            'research_search_seconds', 'Latency of successful Tavily calls by search depth', ['depth'])
+        self.search_cost = m.counter('research_search_cost_total', 'Tavily API credits spent by search depth', ['depth'])
+        self.escalations = m.counter(
+            'research_search_escalations_total', 'Tiered searches that escalated from basic to advanced')
+        self.downgrades = m.counter(
+            'research_deadline_downgrades_total', 'Advanced searches downgraded to basic to meet a deadline')
+        self.local_answers = m.counter(
+            'research_local_answers_total', 'Local-first lookups in the local index', ['result'])
+
+        def cache_hit_ratio() -> float:
+            hits, misses = self.cache_lookups.value('hit'), self.cache_lookups.value('miss')
+            return hits / (hits + misses) if hits + misses else 0
+
+        m.gauge('research_queue_depth', 'Tasks waiting in the queue', lambda: self.task_queue.pending_count)
+        m.gauge('research_inflight_calls', 'Distinct Tavily fetches in flight',
+                lambda: self.inflight.stats()['in_flight'])
+        m.counter_func('research_coalesced_calls_total',
+                       'Tavily fetches saved by joining an identical fetch already in flight',
+                       lambda: self.inflight.coalesced)
+        m.gauge('research_cache_hit_ratio', 'Share of results cache lookups that hit', cache_hit_ratio)
+        m.gauge('research_cache_entries', 'Entries in the in-memory results cache',
+                lambda: len(self.results_cache.memory))
+        m.counter_func('research_cache_evictions_total', 'Results cache entries evicted to stay within the size limit',
+                       lambda: self.results_cache.tier_counts('evictions'), labels=('tier',))
+        m.counter_func('research_cache_expirations_total', 'Results cache entries dropped after their TTL',
+                       lambda: self.results_cache.tier_counts('expirations'), labels=('tier',))
+        m.gauge('research_local_documents', 'Documents in the local full-text index',
+                lambda: len(self.local_index) if self.local_index is not None else 0)
+        m.gauge('research_stored_results', 'Distinct search responses referenced by tasks', lambda: len(self.results))
+        m.gauge('research_circuit_open', '1 while the Tavily circuit breaker is rejecting calls',
+                lambda: 1 if self.circuit_breaker.state != CircuitBreaker.CLOSED else 0)
+
+    def add_task(self, query: str, category: str, importance: int, timeout: Optional[float] = None) -> str:
+        """Add a new task to the queue and return its ID
+
+        The task times out `timeout` seconds from now (default: TASK_TIMEOUT).
+        """
+        now = datetime.now()
         task = ResearchTask(
             query=query,
             category=category,
             importance=importance,
-            created_at=datetime.now()
+            created_at=now,
+            deadline=self._deadline(now, timeout)
         )
-        self.task_queue.append(task)
-        self.task_queue.sort(key=lambda x: (-x.importance, x.created_at))
+        task_id = self.task_queue.push(task)
+        self._publish('task_added', task)
+        return task_id
+
+    def add_tasks(self, items: List[dict]) -> List[str]:
+        """Add many tasks in one pass and return their IDs
 
-    def get_queue_status(self) -> List[dict]:
-        """Get the current status of all tasks in the queue"""
-        return [{
+        Each item needs a query and may set category, importance and timeout
+        (seconds). Items are validated before anything is queued, so a bad
+        item raises ValueError and queues nothing.
+        """
+        now = datetime.now()
+        tasks = []
+        for index, item in enumerate(items):
+            query, category, importance = self.validate_task(item, index)
+            deadline = self._deadline(now, self.validate_timeout(item.get('timeout'), index))
+            tasks.append(ResearchTask(query=query, category=category, importance=importance,
+                                      created_at=now, deadline=deadline))
+        task_ids = self.task_queue.push_many(tasks)
+        if self.store is not None:
+            self.store.record_many(tasks)
+        if tasks:
+            # One event for the whole batch; clients reload the queue
+            self.task_queue.touch()
+            self.events.publish('tasks_added', {'count': len(tasks)})
+        return task_ids
+
+    @staticmethod
+    def validate_task(item: dict, index: Optional[int] = None) -> tuple:
+        """Check one task description and return (query, category, importance)"""
+        where = f"Task {index}: " if index is not None else ""
+        if not isinstance(item, dict):
+            raise ValueError(f"{where}expected an object")
+        query = item.get('query')
+        if not isinstance(query, str) or not query.strip():
+            raise ValueError(f"{where}query is required")
+        category = item.get('category') or 'general'
+        try:
+            importance = int(item.get('importance', 1))
+        except (TypeError, ValueError):
+            raise ValueError(f"{where}importance must be an integer")
+        return query, category, importance
+
+    @staticmethod
+    def validate_timeout(timeout, index: Optional[int] = None) -> Optional[float]:
+        """Check an optional timeout in seconds"""
+        if timeout is None:
+            return None
+        where = f"Task {index}: " if index is not None else ""
+        try:
+            timeout = float(timeout)
+        except (TypeError, ValueError):
+            raise ValueError(f"{where}timeout must be a number of seconds")
+        if timeout <= 0:
+            raise ValueError(f"{where}timeout must be positive")
+        return timeout
+
+    @staticmethod
+    def _deadline(start: datetime, timeout: Optional[float]) -> Optional[datetime]:
+        if timeout is None:
+            timeout = Config.TASK_TIMEOUT
+        return start + timedelta(seconds=timeout) if timeout > 0 else None
+
+    def claim_tasks(self, task_ids: List[str]) -> List[ResearchTask]:
+        """Take specific pending tasks off the queue for immediate processing"""
+        return self.task_queue.claim(task_ids)
+
+    def recover(self) -> int:
+        """Rebuild the queue from the task store after a restart
+
+        Tasks that were processing when the process stopped are queued again,
+        with their original deadlines. Returns the number of tasks restored.
+        """
+        if self.store is None:
+            return 0
+        tasks = []
+        for task_id, query, category, importance, created_at, status, deadline in self.store.load_unfinished():
+            if task_id in self.task_queue:
+                continue
+            tasks.append(ResearchTask(query=query, category=category, importance=importance,
+                                      created_at=created_at, task_id=task_id, deadline=deadline))
+        self.task_queue.push_many(tasks)
+        # Record the re-queued tasks as pending again
+        self.store.record_many(tasks)
+        return len(tasks)
+
+    def get_task(self, task_id: str) -> Optional[ResearchTask]:
+        """Look up a task by ID, including recently finished tasks"""
+        task = self.task_queue.get(task_id)
+        if task is None:
+            task = self.recent_tasks.get(task_id)
+        return task
+
+    def cancel_task(self, task_id: str) -> bool:
+        """Cancel a pending task, or stop a running one
+
+        Safe to call from any thread. A task already taken off the queue by a
+        batch is skipped when its turn comes, and a running task is cancelled
+        at its next await; both finish with status "cancelled". Returns False
+        if the task is unknown or already finished.
+        """
+        task = self.task_queue.get(task_id)
+        if self.task_queue.cancel(task_id):
+            # Keep it visible to per-task lookups like any other finished task
+            self._retire([task])
+            self._publish('task_cancelled', task)
+            return True
+        if task is None:
+            return False
+        # process_task registers the runner, then sets the status, then checks
+        # this set, so whichever way this races one of the two sees the request
+        self._cancel_requested.add(task_id)
+        if task.status == "pending":
+            return True
+        runner = self._running.get(task_id)
+        if runner is None:
+            self._cancel_requested.discard(task_id)
+            return False
+        runner.get_loop().call_soon_threadsafe(self._cancel_running, task_id)
+        return True
+
+    def _cancel_running(self, task_id: str) -> None:
+        # Runs on the loop; the task may have finished since the request
+        runner = self._running.get(task_id)
+        if runner is not None:
+            runner.cancel()
+        else:
+            self._cancel_requested.discard(task_id)
+
+    def _publish(self, event_type: str, task: ResearchTask, **extra) -> None:
+        """Publish a compact task event (no result payloads)"""
+        data = {
+            'task_id': task.task_id,
+            'query': task.query,
+            'category': task.category,
+            'importance': task.importance,
+            'status': task.status
+        }
+        data.update(extra)
+        if self.store is not None:
+            self.store.record(task)
+        self.task_queue.touch()
+        self.events.publish(event_type, data)
+
+    @property
+    def queue_version(self) -> int:
+        """Counter that changes whenever the queue or a task's status changes"""
+        return self.task_queue.version
+
+    def task_to_dict(self, task: ResearchTask, summary: bool = False) -> dict:
+        """Serialize a task; summary mode leaves out the heavy result fields"""
+        data = {
+            'task_id': task.task_id,
             'query': task.query,
             'category': task.category,
             'importance': task.importance,
             'created_at': task.created_at.isoformat(),
             'status': task.status,
             'error': task.error,
-            'research_results': task.research_results,
-            'reasoning_analysis': task.reasoning_analysis
-        } for task in self.task_queue]
+            'deadline': task.deadline.isoformat() if task.deadline else None
+        }
+        if not summary:
+            data['research_results'] = self.results.get(task.result_id)
+            data['reasoning_analysis'] = task.reasoning_analysis
+        return data
 
-    @rate_limit(calls=5, period=60)
-    async def _research_query(self, query: str) -> dict:
-        """Perform research on a query using Tavily API"""
-        try:
-            # TavilyClient.search is not async, so run it in a thread pool
-            loop = asyncio.get_event_loop()
-            response = await loop.run_in_executor(
-                None, 
-                lambda: self.client.search(
-                    query=query,
-                    search_depth="advanced",
-                    include_answer=True,
-                    max_results=5
-                )
-            )
-            
+    def get_queue_status(self, offset: int = 0, limit: Optional[int] = None,
+                         after: Optional[str] = None, summary: bool = False) -> List[dict]:
+        """Get the current status of tasks in the queue, in priority order"""
+        return [self.task_to_dict(task, summary) for task in self.task_queue.page(offset, limit, after)]
+
+    def search_stats(self) -> dict:
+        """Calls, credits spent and latency for each search depth"""
+        stats = {}
+        for depth, cost in self.search_costs.items():
+            latency = self.search_seconds.snapshot(depth)
+            stats[depth] = {
+                'calls': latency['count'],
+                'cost': self.search_cost.value(depth),
+                'cost_per_call': cost,
+                'latency_p50': latency['p50'],
+                'latency_p99': latency['p99']
+            }
+        stats['mode'] = self.search_mode
+        stats['escalations'] = self.escalations.value()
+        # Upstream calls saved by coalescing identical in-flight fetches
+        stats['coalesced'] = self.inflight.coalesced
+        if self.similarity is not None:
+            stats['similarity'] = self.similarity.stats()
+        if self.local_index is not None:
+            stats['local_index'] = self.local_index.stats()
+            stats['local_answers'] = self.local_answers.value('hit')
+        return stats
+
+    async def _research_query(self, query: str, search_depth: str = "advanced",
+                              max_results: int = Config.MAX_RESULTS) -> dict:
+        """Perform research on a query using Tavily API
+
+        Transient failures are retried with jittered exponential backoff.
+        Every attempt takes a rate-limit token and goes through the circuit
+        breaker, so retries cannot exceed the quota or pile onto a failing
+        upstream.
+        """
+        attempt = 0
+        while True:
+            try:
+                self.circuit_breaker.before_call()
+            except CircuitOpenError as e:
+                raise ResearchError(f"Research failed: {str(e)}")
+
+            waited = await self.rate_limiter.acquire(self.api_key)
+            self.stage_seconds.observe(waited, 'rate_limit_wait')
+            call_started = time.perf_counter()
+            try:
+                with self.stage_seconds.time('upstream'):
+                    response = await asyncio.wait_for(
+                        self._search(query, search_depth, max_results), Config.SEARCH_TIMEOUT or None)
+            except Exception as e:
+                if isinstance(e, asyncio.TimeoutError):
+                    # Not recorded as a latency: one hung call would otherwise make every
+                    # shorter deadline look unreachable
+                    e = asyncio.TimeoutError(f"No response from Tavily within {Config.SEARCH_TIMEOUT:g}s")
+                status = error_status(e)
+                self.upstream_errors.inc(f"http_{status}" if status is not None else e.__class__.__name__)
+                if not is_transient(e):
+                    self.circuit_breaker.release()
+                    raise ResearchError(f"Research failed: {str(e)}")
+                self.circuit_breaker.record_failure()
+                if attempt >= self.retry_policy.max_retries:
+                    raise ResearchError(f"Research failed after {attempt + 1} attempts: {str(e)}")
+                delay = self.retry_policy.delay(attempt, e)
+                attempt += 1
+                self.upstream_retries.inc()
+                self.log.info("Retrying %r in %.1fs (attempt %d): %s", query, delay, attempt + 1, e)
+                await asyncio.sleep(delay)
+                continue
+
+            self.circuit_breaker.record_success()
+            elapsed = time.perf_counter() - call_started
+            self.search_seconds.observe(elapsed, search_depth)
+            self._observe_latency(search_depth, elapsed)
+            self.search_cost.inc(search_depth, amount=self.search_costs.get(search_depth, 1))
             if not response or not isinstance(response, dict):
-                raise ResearchError("Invalid response from Tavily API")
-                
+                raise ResearchError("Research failed: Invalid response from Tavily API")
+
             if 'error' in response:
-                raise ResearchError(f"Tavily API error: {response['error']}")
-                
+                raise ResearchError(f"Research failed: Tavily API error: {response['error']}")
+
             return response
-            
-        except Exception as e:
-            raise ResearchError(f"Research failed: {str(e)}")
 
-    def _get_category_insights(self, category: str, research_results: dict) -> str:
+    def _observe_latency(self, search_depth: str, seconds: float) -> None:
+        estimate = self._estimate(search_depth)
+        self.search_estimates[search_depth] = seconds if not estimate else estimate + 0.2 * (seconds - estimate)
+        self._estimated_at[search_depth] = time.monotonic()
+
+    def _estimate(self, search_depth: str) -> float:
+        """Expected latency of a search, decaying towards 0 while no calls are observed
+
+        Tasks that are dropped for their deadline make no calls, so without
+        the decay a stale high estimate could keep dropping them for good.
+        """
+        estimate = self.search_estimates[search_depth]
+        if not estimate or not Config.ESTIMATE_HALF_LIFE:
+            return estimate
+        age = time.monotonic() - self._estimated_at[search_depth]
+        return estimate * 0.5 ** (age / Config.ESTIMATE_HALF_LIFE)
+
+    async def _search(self, query: str, search_depth: str, max_results: int) -> dict:
+        """Make one search call with whichever client is configured"""
+        search = lambda: self.client.search(
+            query=query,
+            search_depth=search_depth,
+            include_answer=True,
+            max_results=max_results
+        )
+        if asyncio.iscoroutinefunction(self.client.search):
+            return await search()
+        # Blocking clients such as TavilyClient run in a thread pool. A thread
+        # cannot be interrupted, so a call that times out keeps its thread
+        # until the client's own socket timeout; the pool bounds how many
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers * 2, thread_name_prefix="tavily-search")
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, search)
+
+    async def start(self) -> None:
+        """Open the search client's session on the loop the agent will run on"""
+        open_client = getattr(self.client, 'open', None)
+        if asyncio.iscoroutinefunction(open_client):
+            await open_client()
+
+    async def close(self) -> None:
+        """Release the search client's connections and flush the local index"""
+        close = getattr(self.client, 'close', None)
+        if asyncio.iscoroutinefunction(close):
+            await close()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        if self.local_index is not None:
+            self.local_index.close()
+
+    async def _fetch_and_cache(self, query: str, cache_key: str, search_depth: str) -> dict:
+        """Fetch results for a query and store them in the cache"""
+        # Compact before caching so neither the cache nor the tasks hold the raw response
+        research_results = self.results.compact(await self._research_query(query, search_depth, self.max_results))
+        await self.results_cache.aset(cache_key, research_results)
+        if self.local_index is not None:
+            with self.stage_seconds.time('local_index'):
+                self.local_index.add_response(research_results)
+        if self.similarity is not None:
+            self.similarity.add(self._cache_namespace(search_depth), query, cache_key)
+        return research_results
+
+    def _cache_key(self, query: str, search_depth: str) -> str:
+        # Depth is part of the key, so basic results are never served for an advanced search
+        return make_cache_key(query, search_depth, max_results=self.max_results, include_answer=True)
+
+    def _cache_namespace(self, search_depth: str) -> str:
+        """The cache key minus the query, so near-duplicates only match under the same search parameters"""
+        return self._cache_key("", search_depth)
+
+    async def _cache_get(self, cache_key: str) -> Optional[dict]:
+        with self.stage_seconds.time('cache_lookup'):
+            research_results = await self.results_cache.aget(cache_key)
+        self.cache_lookups.inc('hit' if research_results is not None else 'miss')
+        return research_results
+
+    async def _similar_get(self, query: str, cache_key: str, search_depth: str) -> Tuple[Optional[dict], Optional[SimilarMatch]]:
+        """Cached results of an earlier near-duplicate query, after an exact miss"""
+        if self.similarity is None:
+            return None, None
+        with self.stage_seconds.time('similar_lookup'):
+            match = self.similarity.lookup(self._cache_namespace(search_depth), query, exclude=cache_key)
+            research_results = await self.results_cache.aget(match.cache_key) if match is not None else None
+        if match is not None and research_results is None:
+            # The matched entry expired or was evicted from the results cache
+            self.similarity.remove(match.cache_key)
+            match = None
+        self.similar_lookups.inc('hit' if match is not None else 'miss')
+        return research_results, match
+
+    async def _cached(self, query: str, search_depth: str) -> Tuple[Optional[dict], Optional[SimilarMatch]]:
+        """Cached results for the exact query, or else for a near-duplicate of it"""
+        cache_key = self._cache_key(query, search_depth)
+        research_results = await self._cache_get(cache_key)
+        if research_results is not None:
+            return research_results, None
+        return await self._similar_get(query, cache_key, search_depth)
+
+    async def _search_results(self, query: str, search_depth: str) -> Tuple[dict, Optional[SimilarMatch]]:
+        """Results for one search depth, from the cache or a coalesced upstream call
+
+        Returns (results, the near-duplicate they were served for, if any).
+        """
+        research_results, match = await self._cached(query, search_depth)
+        if research_results is None:
+            cache_key = self._cache_key(query, search_depth)
+            research_results = await self.inflight.do(
+                cache_key, lambda: self._fetch_and_cache(query, cache_key, search_depth)
+            )
+        return research_results, match
+
+    async def _tiered_search(self, query: str) -> Tuple[dict, str, bool, Optional[SimilarMatch]]:
+        """Try a basic search and escalate to advanced only if its results look weak
+
+        Returns (results, depth used, whether it escalated, near-duplicate match).
+        """
+        # Cached advanced results are better than basic ones and cost nothing
+        research_results, match = await self._cached(query, "advanced")
+        if research_results is not None:
+            return research_results, "advanced", False, match
+        research_results, match = await self._search_results(query, "basic")
+        if not self._needs_escalation(research_results):
+            return research_results, "basic", False, match
+        self.escalations.inc()
+        research_results, match = await self._search_results(query, "advanced")
+        return research_results, "advanced", True, match
+
+    def _needs_escalation(self, research_results: dict) -> bool:
+        """Whether a basic response has too short an answer or no credible enough source"""
+        answer = (research_results.get('answer') or '').strip()
+        if len(answer) < Config.TIER_MIN_ANSWER_CHARS:
+            return True
+        urls = [result.get('url', '') for result in research_results.get('results') or []]
+        return max(self.credibility.score_many(urls), default=0.0) < Config.TIER_MIN_CREDIBILITY
+
+    def _get_category_insights(self, category: str, research_results: dict,
+                               analyzed: Optional[AnalyzedText] = None) -> str:
         """Generate category-specific insights from research results"""
         if not research_results or not research_results.get('results'):
             return ""
-            
-        insights = ""
-        answer = research_results.get('answer', '')
-        results = research_results.get('results', [])
-        all_content = answer + ' ' + ' '.join(r.get('content', '') for r in results)
-        
-        if category.lower() == 'technology':
-            # Look for emerging trends, technical details, and future implications
-            if any(word in all_content.lower() for word in ['future', 'emerging', 'trend', 'advancement', 'innovation']):
-                insights += "• Future Trends: This topic shows significant potential for future developments\n"
-            if any(word in all_content.lower() for word in ['challenge', 'limitation', 'problem', 'issue']):
-                insights += "• Technical Challenges: There are notable technical challenges to consider\n"
-            if any(word in all_content.lower() for word in ['impact', 'effect', 'influence', 'change']):
-                insights += "• Societal Impact: This technology may have significant societal implications\n"
-                
-        elif category.lower() == 'science':
-            # Focus on methodology, evidence, and scientific implications
-            if any(word in all_content.lower() for word in ['experiment', 'study', 'research', 'evidence']):
-                insights += "• Research Focus: Strong experimental/research foundation\n"
-            if any(word in all_content.lower() for word in ['theory', 'hypothesis', 'model']):
-                insights += "• Theoretical Framework: Well-established theoretical background\n"
-            if any(word in all_content.lower() for word in ['discovery', 'breakthrough', 'finding']):
-                insights += "• Scientific Impact: Notable scientific achievements identified\n"
-                
-        elif category.lower() == 'business':
-            # Analyze market trends, strategies, and business implications
-            if any(word in all_content.lower() for word in ['market', 'industry', 'sector']):
-                insights += "• Market Analysis: Significant market/industry factors identified\n"
-            if any(word in all_content.lower() for word in ['strategy', 'plan', 'approach']):
-                insights += "• Strategic Insights: Clear strategic implications present\n"
-            if any(word in all_content.lower() for word in ['opportunity', 'growth', 'potential']):
-                insights += "• Growth Potential: Business opportunities highlighted\n"
-                
-        elif category.lower() == 'health':
-            # Focus on medical implications, research, and health impacts
-            if any(word in all_content.lower() for word in ['study', 'research', 'trial']):
-                insights += "• Medical Research: Based on clinical/medical studies\n"
-            if any(word in all_content.lower() for word in ['treatment', 'therapy', 'intervention']):
-                insights += "• Treatment Options: Therapeutic approaches discussed\n"
-            if any(word in all_content.lower() for word in ['prevention', 'risk', 'safety']):
-                insights += "• Health Implications: Important health considerations noted\n"
-        
-        return insights
+        if analyzed is None:
+            analyzed = self.analyzer.analyze(research_results)
+        return self.analyzer.category_insights(category, analyzed)
 
     def _calculate_source_credibility(self, url: str) -> float:
         """Calculate credibility score for a source"""
-        credibility_score = 1.0
-        
-        # Academic and educational domains get higher scores
-        if any(domain in url.lower() for domain in ['.edu', 'academic', 'research', 'science']):
-            credibility_score *= 1.3
-        
-        # Established reference sites
-        if any(domain in url.lower() for domain in ['wikipedia.org', 'britannica.com', 'nature.com', 'science.org']):
-            credibility_score *= 1.2
-            
-        # Government sources
-        if '.gov' in url.lower():
-            credibility_score *= 1.25
-            
-        # Recent or archived content
-        if 'archive.org' in url.lower():
-            credibility_score *= 0.9  # Slightly lower score for archived content
-            
-        return min(credibility_score, 2.0)  # Cap at 2.0
+        return self.credibility.score(url)
 
     def _extract_key_concepts(self, text: str) -> List[str]:
         """Extract key concepts from text"""
-        # Simple keyword extraction based on frequency and importance
-        words = text.lower().split()
-        # Remove common words
-        common_words = {'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by'}
-        keywords = [word for word in words if word not in common_words and len(word) > 3]
-        
-        # Count frequency
-        from collections import Counter
-        keyword_freq = Counter(keywords)
-        
-        # Return top concepts
-        return [word for word, _ in keyword_freq.most_common(5)]
+        return self.analyzer.key_concepts(self.analyzer.analyze_text(text))
 
-    async def _analyze_results(self, research_results: dict) -> str:
+    async def _analyze_results(self, research_results: dict, analyzed: Optional[AnalyzedText] = None) -> str:
         """Analyze research results and generate insights"""
         try:
             if not research_results:
@@ -208,15 +589,16 @@ class WorkflowAgent:
             answer = research_results.get('answer', 'No direct answer available')
             results = research_results.get('results', [])
             
-            # Extract key concepts
-            all_text = answer + ' ' + ' '.join(r.get('content', '') for r in results)
-            key_concepts = self._extract_key_concepts(all_text)
+            # Extract key concepts from the shared token stream
+            if analyzed is None:
+                analyzed = self.analyzer.analyze(research_results)
+            key_concepts = self.analyzer.key_concepts(analyzed)
             
-            # Calculate source credibility
+            # Calculate source credibility for the whole response at once
             credible_sources = []
-            for result in results:
+            scores = self.credibility.score_many([result.get('url', '') for result in results])
+            for result, credibility in zip(results, scores):
                 url = result.get('url', '')
-                credibility = self._calculate_source_credibility(url)
                 if credibility > 1.0:
                     credible_sources.append({
                         'title': result.get('title', ''),
@@ -260,84 +642,278 @@ class WorkflowAgent:
         except Exception as e:
             raise ReasoningError(f"Analysis failed: {str(e)}")
 
-    async def process_task(self, task: ResearchTask) -> dict:
-        """Process a single task"""
+    def _local_results(self, query: str) -> Optional[dict]:
+        """A response built from the local index, if it covers the query well enough"""
+        with self.stage_seconds.time('local_lookup'):
+            research_results = self.local_index.answer(
+                query, self.max_results, Config.LOCAL_MIN_RESULTS, Config.LOCAL_MIN_COVERAGE)
+        self.local_answers.inc('hit' if research_results is not None else 'miss')
+        return research_results
+
+    async def _plan(self, task: ResearchTask) -> Tuple[Optional[str], Optional[float]]:
+        """Search depth for a task and the seconds it has left before its deadline
+
+        Depth follows importance, downgraded to basic when an advanced search
+        is neither cached nor expected to finish in time. It is None when the
+        deadline has passed or no depth would make it.
+        """
+        search_depth = "advanced" if task.importance >= Config.ADVANCED_IMPORTANCE else "basic"
+        if task.deadline is None:
+            return search_depth, None
+        remaining = (task.deadline - datetime.now()).total_seconds()
+        if remaining <= 0:
+            return None, remaining
+        for depth in (("advanced", "basic") if search_depth == "advanced" else ("basic",)):
+            if remaining >= self._estimate(depth) or await self._is_cached(task.query, depth):
+                return depth, remaining
+        return None, remaining
+
+    async def _is_cached(self, query: str, search_depth: str) -> bool:
+        """Whether results for a query at this depth can be served without an upstream call"""
+        cache_key = self._cache_key(query, search_depth)
+        if await self.results_cache.aget(cache_key) is not None:
+            return True
+        if self.similarity is None:
+            return False
+        match = self.similarity.lookup(self._cache_namespace(search_depth), query, exclude=cache_key)
+        return match is not None and await self.results_cache.aget(match.cache_key) is not None
+
+    def _expected_seconds(self, task: ResearchTask) -> float:
+        """Expected time to run a task, from recent upstream latency at its depth"""
+        search_depth = "advanced" if task.importance >= Config.ADVANCED_IMPORTANCE else "basic"
+        return self._estimate(search_depth)
+
+    async def process_task(self, task: ResearchTask, local_first: Optional[bool] = None) -> dict:
+        """Process a single task
+
+        With local_first (default: LOCAL_FIRST), the task is answered from the
+        local index when it covers the query, without calling Tavily. A task
+        with a deadline is downgraded, dropped or stopped as needed and then
+        ends as "timed_out"; a task stopped through cancel_task ends as
+        "cancelled".
+        """
+        started = time.perf_counter()
+        runner = asyncio.current_task()
+        self._running[task.task_id] = runner
         task.status = "processing"
-        print(f"Processing task: {task.query}")
         
         try:
-            # Determine search depth based on importance
-            search_depth = "advanced" if task.importance >= 3 else "basic"
-            
-            # Check cache first
-            cache_key = f"{task.query}_{search_depth}"
-            if cache_key in self.results_cache:
-                print(f"Using cached results for: {task.query}")
-                research_results = self.results_cache[cache_key]
-            else:
-                print(f"Fetching new results for: {task.query}")
-                research_results = await self._research_query(task.query)
-                self.results_cache[cache_key] = research_results
-            
-            # Enhance research results with category-specific analysis
-            category_insights = self._get_category_insights(task.category, research_results)
-            
-            # Generate comprehensive analysis
-            task.research_results = research_results
-            task.reasoning_analysis = await self._analyze_results(research_results)
-            
-            # Add category-specific insights
-            if category_insights:
-                task.reasoning_analysis += f"\n\nCategory-Specific Insights ({task.category}):\n{category_insights}"
-            
-            task.status = "completed"
-            
-            print(f"Task completed: {task.query}")
-            
-            return {
-                'query': task.query,
-                'category': task.category,
-                'result': {
-                    'status': 'success',
-                    'research_results': research_results,
-                    'reasoning_analysis': task.reasoning_analysis,
-                    'importance_level': task.importance,
-                    'search_depth': search_depth
-                }
-            }
-            
+            if task.task_id in self._cancel_requested:
+                # Cancelled after its batch took it off the queue, before it started
+                return self._task_failed(task, "cancelled", "Cancelled before it started", started)
+            self._publish('task_started', task)
+            self.log.debug("Processing task %s: %r", task.task_id, task.query)
+            search_depth, remaining = await self._plan(task)
+            research_results = None
+            if search_depth is None and remaining > 0 and self.local_index is not None:
+                # No search would finish in time, but the local index may cover the query
+                research_results = self._local_results(task.query)
+            if search_depth is None and research_results is None:
+                if remaining <= 0:
+                    reason = "Deadline passed before the task could run"
+                else:
+                    reason = f"Not enough time left before the deadline ({remaining:.1f}s)"
+                return self._task_failed(task, "timed_out", reason, started)
+            async with asyncio.timeout(remaining):
+                return await self._run_task(task, search_depth, started, local_first, research_results)
+        except TimeoutError:
+            return self._task_failed(task, "timed_out", "Deadline exceeded", started)
+        except asyncio.CancelledError:
+            if task.task_id not in self._cancel_requested:
+                raise
+            # Only this task was cancelled, not whatever is running it
+            runner.uncancel()
+            return self._task_failed(task, "cancelled", "Cancelled while processing", started)
         except (ResearchError, ReasoningError) as e:
-            print(f"Task failed: {task.query} - Error: {str(e)}")  # Debug log
-            task.status = "failed"
-            task.error = str(e)
-            return {
-                'query': task.query,
-                'category': task.category,
-                'result': {
-                    'status': 'error',
-                    'error': str(e)
-                }
-            }
+            self.errors_total.inc(e.__class__.__name__)
+            return self._task_failed(task, "failed", str(e), started)
+        except Exception as e:
+            # A bug in one task must not abort the rest of its batch
+            logger.exception("Unexpected error processing task %s", task.task_id)
+            self.errors_total.inc(e.__class__.__name__)
+            return self._task_failed(task, "failed", f"Unexpected error: {e}", started)
+        finally:
+            self._running.pop(task.task_id, None)
+            self._cancel_requested.discard(task.task_id)
 
-    async def process_tasks(self) -> List[dict]:
-        """Process all tasks in the queue"""
-        if not self.task_queue:
-            return []
-            
-        results = []
-        tasks_to_remove = []
+    async def _run_task(self, task: ResearchTask, search_depth: Optional[str], started: float,
+                        local_first: Optional[bool], research_results: Optional[dict] = None) -> dict:
+        """Search, analyze and complete a task that has been planned to run at search_depth
+
+        research_results, if given, were already taken from the local index.
+        """
+        # Whether the deadline forced a basic search for an advanced task
+        downgraded = search_depth == "basic" and task.importance >= Config.ADVANCED_IMPORTANCE
+        if downgraded:
+            self.downgrades.inc()
+        escalated = False
+        match = None
+        if local_first is None:
+            local_first = self.local_first
         
-        for task in self.task_queue:
-            result = await self.process_task(task)
-            results.append(result)
-            tasks_to_remove.append(task)
+        if research_results is None and local_first and self.local_index is not None:
+            research_results = self._local_results(task.query)
+        if research_results is not None:
+            search_depth = "local"
+        elif search_depth == "advanced" and self.search_mode == "tiered":
+            research_results, search_depth, escalated, match = await self._tiered_search(task.query)
+        else:
+            research_results, match = await self._search_results(task.query, search_depth)
         
-        # Remove processed tasks
-        for task in tasks_to_remove:
-            self.task_queue.remove(task)
-            
+        # Tasks with identical results share one stored copy. Searches were
+        # compacted before caching, so only local answers still need it, and
+        # the first put keeps the cached object itself as that copy
+        task.result_id = self.results.put(research_results, compact=search_depth == "local")
+        research_results = self.results.get(task.result_id)
+
+        with self.stage_seconds.time('analysis'):
+            # Lowercase, tokenize and match keywords once for both analysis passes
+            analyzed = self.analyzer.analyze(research_results)
+            task.reasoning_analysis = await self._analyze_results(research_results, analyzed)
+
+        # Enhance research results with category-specific analysis
+        with self.stage_seconds.time('insights'):
+            category_insights = self._get_category_insights(task.category, research_results, analyzed)
+        
+        # Add category-specific insights
+        if category_insights:
+            task.reasoning_analysis += f"\n\nCategory-Specific Insights ({task.category}):\n{category_insights}"
+        # Repeated queries produce the same analysis text
+        task.reasoning_analysis = sys.intern(task.reasoning_analysis)
+        
+        task.status = "completed"
+        self._publish('task_completed', task)
+        self.tasks_total.inc('completed')
+        self.task_seconds.observe(time.perf_counter() - started, 'completed')
+        self.log.info("Task %s completed in %.3fs", task.task_id, time.perf_counter() - started)
+        
+        return {
+            'query': task.query,
+            'category': task.category,
+            'result': {
+                'status': 'success',
+                'research_results': research_results,
+                'reasoning_analysis': task.reasoning_analysis,
+                'importance_level': task.importance,
+                'search_depth': search_depth,
+                'escalated': escalated,
+                'downgraded': downgraded,
+                # Set when the results were cached for a paraphrase of this query
+                'approximate_match': {
+                    'query': match.query,
+                    'similarity': round(match.similarity, 3)
+                } if match is not None else None
+            }
+        }
+
+    def _task_failed(self, task: ResearchTask, status: str, error: str, started: float) -> dict:
+        """Record a task that did not complete: failed, timed_out or cancelled"""
+        self.log.warning("Task %s %s: %s", task.task_id, status.replace('_', ' '), error)
+        self.tasks_total.inc(status)
+        self.task_seconds.observe(time.perf_counter() - started, status)
+        task.status = status
+        task.error = error
+        self._publish(f'task_{status}', task, error=error)
+        return {
+            'query': task.query,
+            'category': task.category,
+            'result': {
+                'status': 'error' if status == 'failed' else status,
+                'error': error
+            }
+        }
+
+    async def process_tasks(self, max_workers: Optional[int] = None, timeout: Optional[float] = None) -> List[dict]:
+        """Process all tasks in the queue, running up to max_workers concurrently
+
+        With a timeout, every task must finish within that many seconds.
+        """
+        if not self.task_queue.pending_count:
+            return []
+
+        # Pop pending tasks in priority order; tasks added while we run are
+        # left for the next call
+        deadline = self._deadline(datetime.now(), timeout) if timeout else None
+        return await self.process_batch(self.task_queue.pop_all(), max_workers, deadline=deadline)
+
+    def _scheduler(self, batch: List[ResearchTask], deadline: Optional[datetime]) -> DeadlineScheduler:
+        """Apply a batch deadline to every task and order the batch for processing"""
+        if deadline is not None:
+            for task in batch:
+                if task.deadline is None or task.deadline > deadline:
+                    task.deadline = deadline
+        return DeadlineScheduler(batch, self._expected_seconds, Config.URGENT_SLACK)
+
+    async def process_batch(self, batch: List[ResearchTask], max_workers: Optional[int] = None,
+                            on_result: Optional[Callable[[int, dict], None]] = None,
+                            deadline: Optional[datetime] = None) -> List[dict]:
+        """Process tasks already taken off the queue, calling on_result(index, result) as each finishes
+
+        Results are returned in batch order. Workers take tasks from a
+        DeadlineScheduler, so tasks close to their deadline (or the batch
+        deadline) jump ahead of more important ones.
+        """
+        scheduler = self._scheduler(batch, deadline)
+        results: List[Optional[dict]] = [None] * len(batch)
+
+        async def worker() -> None:
+            while (picked := scheduler.next()) is not None:
+                index, task = picked
+                result = results[index] = await self.process_task(task)
+                if on_result is not None:
+                    on_result(index, result)
+
+        workers = min(max(1, max_workers or self.max_workers), len(batch))
+        try:
+            await asyncio.gather(*(worker() for _ in range(workers)))
+        finally:
+            self._retire(batch)
         return results
 
+    def iter_results(self, batch: Optional[List[ResearchTask]] = None, max_workers: Optional[int] = None,
+                     deadline: Optional[datetime] = None) -> AsyncIterator[dict]:
+        """Start processing a batch, by default every pending task, and iterate over results as tasks finish
+
+        Must be called on the running loop. Results come in completion order
+        and carry their task_id. The tasks start right away and run to
+        completion even if the iterator is abandoned early or never consumed.
+        """
+        if batch is None:
+            batch = self.task_queue.pop_all()
+        scheduler = self._scheduler(batch, deadline)
+        finished: asyncio.Queue = asyncio.Queue()
+
+        async def worker() -> None:
+            while (picked := scheduler.next()) is not None:
+                _, task = picked
+                try:
+                    finished.put_nowait({'task_id': task.task_id, **await self.process_task(task)})
+                except Exception as e:
+                    finished.put_nowait(e)
+
+        workers = min(max(1, max_workers or self.max_workers), len(batch))
+        pending = [asyncio.ensure_future(worker()) for _ in range(workers)]
+        asyncio.gather(*pending, return_exceptions=True).add_done_callback(lambda _: self._retire(batch))
+        return self._as_completed(finished, len(batch))
+
+    @staticmethod
+    async def _as_completed(finished: asyncio.Queue, count: int) -> AsyncIterator[dict]:
+        for _ in range(count):
+            result = await finished.get()
+            if isinstance(result, Exception):
+                raise result
+            yield result
+
+    def _retire(self, batch: List[ResearchTask]) -> None:
+        """Move processed tasks out of the queue into the recent history"""
+        with self._recent_lock:
+            for task in batch:
+                self.task_queue.remove(task.task_id)
+                self.recent_tasks[task.task_id] = task
+            while len(self.recent_tasks) > self.max_recent_tasks:
+                _, evicted = self.recent_tasks.popitem(last=False)
+                self.results.release(evicted.result_id)
+
 # Example usage
 if __name__ == "__main__":
     # Load environment variables
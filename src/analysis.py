@@ -0,0 +1,99 @@
+from typing import Dict, FrozenSet, List, Optional, Tuple
+from collections import Counter
+
+# Category insight rules: (insight line, keywords). An insight applies when any
+# of its keywords appears anywhere in the lowercased answer + result content.
+CATEGORY_RULES: Dict[str, List[Tuple[str, Tuple[str, ...]]]] = {
+    'technology': [
+        ("• Future Trends: This topic shows significant potential for future developments",
+         ('future', 'emerging', 'trend', 'advancement', 'innovation')),
+        ("• Technical Challenges: There are notable technical challenges to consider",
+         ('challenge', 'limitation', 'problem', 'issue')),
+        ("• Societal Impact: This technology may have significant societal implications",
+         ('impact', 'effect', 'influence', 'change')),
+    ],
+    'science': [
+        ("• Research Focus: Strong experimental/research foundation",
+         ('experiment', 'study', 'research', 'evidence')),
+        ("• Theoretical Framework: Well-established theoretical background",
+         ('theory', 'hypothesis', 'model')),
+        ("• Scientific Impact: Notable scientific achievements identified",
+         ('discovery', 'breakthrough', 'finding')),
+    ],
+    'business': [
+        ("• Market Analysis: Significant market/industry factors identified",
+         ('market', 'industry', 'sector')),
+        ("• Strategic Insights: Clear strategic implications present",
+         ('strategy', 'plan', 'approach')),
+        ("• Growth Potential: Business opportunities highlighted",
+         ('opportunity', 'growth', 'potential')),
+    ],
+    'health': [
+        ("• Medical Research: Based on clinical/medical studies",
+         ('study', 'research', 'trial')),
+        ("• Treatment Options: Therapeutic approaches discussed",
+         ('treatment', 'therapy', 'intervention')),
+        ("• Health Implications: Important health considerations noted",
+         ('prevention', 'risk', 'safety')),
+    ],
+}
+
+STOP_WORDS = frozenset({'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by'})
+
+class AnalyzedText:
+    """A result set lowercased once, with its token stream built on first use"""
+
+    __slots__ = ('text', '_tokens')
+
+    def __init__(self, text: str):
+        self.text = text.lower()
+        self._tokens: Optional[List[str]] = None
+
+    @property
+    def tokens(self) -> List[str]:
+        if self._tokens is None:
+            self._tokens = self.text.split()
+        return self._tokens
+
+    def contains_any(self, keywords: Tuple[str, ...]) -> bool:
+        text = self.text
+        return any(keyword in text for keyword in keywords)
+
+class TextAnalyzer:
+    """Shared text-analysis pipeline for research results
+
+    A result set is lowercased once and tokenized at most once, and both the
+    category insights and key concept extraction reuse it. Rule keywords are
+    matched with plain substring search against the lowercased text.
+    """
+
+    def __init__(self, rules: Dict[str, List[Tuple[str, Tuple[str, ...]]]] = CATEGORY_RULES,
+                 stop_words: FrozenSet[str] = STOP_WORDS):
+        self.rules = {category.lower(): rule_list for category, rule_list in rules.items()}
+        self.stop_words = stop_words
+
+    def analyze_text(self, text: str) -> AnalyzedText:
+        return AnalyzedText(text)
+
+    def analyze(self, research_results: Optional[dict]) -> AnalyzedText:
+        """Analyze the answer and result content of one Tavily response"""
+        research_results = research_results or {}
+        answer = research_results.get('answer') or ''
+        results = research_results.get('results') or []
+        return AnalyzedText(answer + ' ' + ' '.join(r.get('content', '') for r in results))
+
+    def category_insights(self, category: str, analyzed: AnalyzedText) -> str:
+        """Insight lines for every rule of the category that matched"""
+        insights = ""
+        for insight, keywords in self.rules.get(category.lower(), ()):
+            if analyzed.contains_any(keywords):
+                insights += insight + "\n"
+        return insights
+
+    def key_concepts(self, analyzed: AnalyzedText, count: int = 5) -> List[str]:
+        """Most frequent non-stop-word tokens longer than three characters"""
+        stop_words = self.stop_words
+        keyword_freq = Counter([word for word in analyzed.tokens if len(word) > 3 and word not in stop_words])
+        return [word for word, _ in keyword_freq.most_common(count)]
+
+default_analyzer = TextAnalyzer()
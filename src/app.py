@@ -1,14 +1,27 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, render_template, request, jsonify, stream_with_context
 from flask_cors import CORS
 from agent import WorkflowAgent, ResearchError, ReasoningError
+from jobs import BackgroundLoop, JobManager
+from persistence import TaskStore
+from shared_queue import SharedEventRelay, SharedTaskQueue
+from config import Config
+from metrics import MetricsRegistry
+from cache import LRUCache
+from serialization import FastJSONProvider, compress_response, dumps, dumps_with_items, dumps_with_raw
 import asyncio
+import contextvars
+import itertools
+import json
 import os
+import queue
+from datetime import datetime, timedelta
 from functools import wraps
+from typing import Iterator, Optional
 from dotenv import load_dotenv
 import logging
 
 # Configure logging
-logging.basicConfig(level=logging.INFO)
+logging.basicConfig(level=Config.LOG_LEVEL)
 logger = logging.getLogger(__name__)
 
 # Load environment variables
@@ -25,33 +38,140 @@ app = Flask(__name__,
            static_url_path='/static')
            
 CORS(app)
+app.json = FastJSONProvider(app)
 
 # Get API key from environment
 API_KEY = os.getenv("TAVILY_API_KEY")
 if not API_KEY:
     raise ValueError("TAVILY_API_KEY environment variable is not set")
 
-agent = WorkflowAgent(api_key=API_KEY)
+store = None
+# In shared mode tasks go to a SQLite queue that separate worker processes
+# (src/worker.py) claim and process; this process only serves HTTP
+shared = None
+if Config.QUEUE_BACKEND == "sqlite":
+    store = TaskStore(Config.QUEUE_DB, flush_interval=Config.QUEUE_FLUSH_INTERVAL)
+elif Config.QUEUE_BACKEND == "shared":
+    shared = SharedTaskQueue(Config.SHARED_QUEUE_DB)
+elif Config.QUEUE_BACKEND != "memory":
+    raise ValueError(f"Unknown queue backend: {Config.QUEUE_BACKEND}")
+
+agent = WorkflowAgent(api_key=API_KEY, store=store)
+if store is not None:
+    logger.info("Recovered %d tasks from %s", agent.recover(), Config.QUEUE_DB)
+
+# The agent, its HTTP session, rate limiter and background jobs all live on
+# this one long-running loop; async views run on it too
+loop = BackgroundLoop()
+jobs = JobManager(agent, loop)
+loop.on_startup(agent.start)
+loop.on_shutdown(agent.close)
+loop.on_shutdown(jobs.drain)
+if shared is not None:
+    # Workers publish to their own processes' buses; relay their progress to /api/events
+    relay = SharedEventRelay(shared, agent.events, interval=Config.EVENT_POLL_INTERVAL)
+    loop.on_startup(relay.start)
+    loop.on_shutdown(relay.stop)
+
+def run_on_agent_loop(func):
+    """Flask's hook for running views: async views are awaited on the agent loop"""
+    if not asyncio.iscoroutinefunction(func):
+        return func
+
+    @wraps(func)
+    def run(*args, **kwargs):
+        # Copy the request context so request, jsonify etc. work inside the coroutine
+        return loop.run(func(*args, **kwargs), context=contextvars.copy_context())
+    return run
+
+app.ensure_sync = run_on_agent_loop
+
+def startup() -> None:
+    """Start the agent loop and run its startup hooks"""
+    loop.start()
+
+def close_streams() -> None:
+    """End open event streams, which would otherwise keep the server from shutting down"""
+    agent.events.close()
+
+def shutdown() -> None:
+    """Let running jobs finish, close the agent's connections and flush the task store"""
+    close_streams()
+    loop.stop()
+    if store is not None:
+        store.close()
+
+# Finished tasks never change, so each is encoded once and reused by status reads
+FINISHED_STATUSES = frozenset({'completed', 'failed', 'timed_out', 'cancelled'})
+encoded_tasks = LRUCache(max_entries=Config.TASK_HISTORY, ttl=None)
+
+def encode_task(task, summary: bool = False) -> bytes:
+    """JSON for agent.task_to_dict(task), cached for finished tasks"""
+    if summary or task.status not in FINISHED_STATUSES:
+        return dumps(agent.task_to_dict(task, summary))
+    encoded = encoded_tasks.get(task.task_id)
+    if encoded is None:
+        encoded = dumps(agent.task_to_dict(task))
+        encoded_tasks.set(task.task_id, encoded)
+    return encoded
+
+def json_body(body: bytes, status: int = 200) -> Response:
+    return Response(body, status=status, mimetype='application/json')
 
 def handle_errors(f):
-    @wraps(f)
-    def decorated_function(*args, **kwargs):
-        try:
-            return f(*args, **kwargs)
-        except (ResearchError, ReasoningError) as e:
-            logger.error(f"API Error: {str(e)}")
+    def handle(e: Exception):
+        if isinstance(e, (ResearchError, ReasoningError)):
+            logger.error("API Error: %s", e)
             return jsonify({
                 'status': 'error',
                 'message': str(e),
                 'error_type': e.__class__.__name__
             }), 400
+        logger.exception("Unexpected error: %s", e)
+        return jsonify({
+            'status': 'error',
+            'message': str(e),
+            'error_type': 'ServerError'
+        }), 500
+
+    if asyncio.iscoroutinefunction(f):
+        @wraps(f)
+        async def decorated_coroutine(*args, **kwargs):
+            try:
+                return await f(*args, **kwargs)
+            except Exception as e:
+                return handle(e)
+        return decorated_coroutine
+
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        try:
+            return f(*args, **kwargs)
         except Exception as e:
-            logger.error(f"Unexpected error: {str(e)}")
-            return jsonify({
-                'status': 'error',
-                'message': str(e),
-                'error_type': 'ServerError'
-            }), 500
+            return handle(e)
+    return decorated_function
+
+def local_processing_only(f):
+    """Reject processing endpoints when worker processes own the queue"""
+    def rejected():
+        return jsonify({
+            'status': 'error',
+            'message': 'Tasks are processed by worker processes in shared queue mode'
+        }), 409
+
+    if asyncio.iscoroutinefunction(f):
+        @wraps(f)
+        async def decorated_coroutine(*args, **kwargs):
+            if shared is not None:
+                return rejected()
+            return await f(*args, **kwargs)
+        return decorated_coroutine
+
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if shared is not None:
+            return rejected()
+        return f(*args, **kwargs)
     return decorated_function
 
 @app.route('/')
@@ -63,7 +183,7 @@ def index():
 def add_task():
     try:
         data = request.get_json()
-        logger.info(f"Received task data: {data}")
+        logger.debug("Received task data: %s", data)
         
         if not data:
             return jsonify({
@@ -86,57 +206,386 @@ def add_task():
             
         category = data.get('category', 'general')
         importance = int(data.get('importance', 1))
+        try:
+            timeout = WorkflowAgent.validate_timeout(data.get('timeout'))
+        except ValueError as e:
+            return jsonify({
+                'status': 'error',
+                'message': str(e)
+            }), 400
         
-        agent.add_task(query, category, importance)
-        logger.info(f"Task added successfully: {query}")
+        if shared is not None:
+            task_id = shared.enqueue([(query, category, importance)])[0]
+        else:
+            task_id = agent.add_task(query, category, importance, timeout)
+        logger.debug("Task %s added: %r", task_id, query)
         
         return jsonify({
             'status': 'success',
-            'message': 'Task added successfully'
+            'message': 'Task added successfully',
+            'task_id': task_id
         })
     except Exception as e:
-        logger.error(f"Error adding task: {str(e)}")
+        logger.error("Error adding task: %s", e)
         return jsonify({
             'status': 'error',
             'message': str(e)
         }), 500
 
+def read_task_batch():
+    """Read a batch of task descriptions from a JSON array or an NDJSON body"""
+    if request.mimetype in ('application/x-ndjson', 'application/jsonl', 'application/jsonlines'):
+        items = []
+        for line_number, line in enumerate(request.stream, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                items.append(json.loads(line))
+            except ValueError:
+                raise ValueError(f"Line {line_number}: invalid JSON")
+            if len(items) > Config.MAX_BATCH_SIZE:
+                break
+    else:
+        items = request.get_json(silent=True)
+        if isinstance(items, dict):
+            items = items.get('tasks')
+        if not isinstance(items, list):
+            raise ValueError("Expected a JSON array of tasks")
+    if len(items) > Config.MAX_BATCH_SIZE:
+        raise ValueError(f"Batch is larger than {Config.MAX_BATCH_SIZE} tasks")
+    return items
+
+def read_deadline() -> Optional[datetime]:
+    """Batch deadline from a ?timeout= query parameter, in seconds from now"""
+    timeout = WorkflowAgent.validate_timeout(request.args.get('timeout'))
+    return datetime.now() + timedelta(seconds=timeout) if timeout is not None else None
+
+@app.route('/api/add-tasks', methods=['POST'])
+@handle_errors
+def add_tasks():
+    """Queue many tasks at once from a JSON array or NDJSON upload"""
+    try:
+        items = read_task_batch()
+        if shared is not None:
+            task_ids = shared.enqueue([WorkflowAgent.validate_task(item, index) for index, item in enumerate(items)])
+        else:
+            task_ids = agent.add_tasks(items)
+    except ValueError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 400
+    logger.info("Added %d tasks", len(task_ids))
+    return jsonify({
+        'status': 'success',
+        'count': len(task_ids),
+        'task_ids': task_ids
+    })
+
+@app.route('/api/research-batch', methods=['POST'])
+@handle_errors
+@local_processing_only
+def research_batch():
+    """Queue a batch and process it right away, streaming each result as NDJSON as it completes"""
+    try:
+        deadline = read_deadline()
+        task_ids = agent.add_tasks(read_task_batch())
+    except ValueError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 400
+
+    finished = queue.Queue()
+    batch = agent.claim_tasks(task_ids)
+    job = jobs.submit(batch, on_result=lambda index, result: finished.put((index, result)), deadline=deadline)
+    order = [task.task_id for task in batch]
+    logger.info("Research batch %s started with %d tasks", job.job_id, job.total)
+
+    def generate():
+        yield dumps({'job_id': job.job_id, 'total': job.total}) + b'\n'
+        remaining = job.total
+        while remaining:
+            try:
+                index, result = finished.get(timeout=1)
+            except queue.Empty:
+                if job.status == 'failed':
+                    yield dumps({'job_id': job.job_id, 'status': 'error', 'error': job.error}) + b'\n'
+                    return
+                continue
+            remaining -= 1
+            yield dumps({'task_id': order[index], **result}) + b'\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+def stream_results(results) -> Iterator[bytes]:
+    """NDJSON lines pulled one at a time from an async generator on the agent loop"""
+    try:
+        while True:
+            try:
+                result = loop.run(results.__anext__())
+            except StopAsyncIteration:
+                return
+            yield dumps(result) + b'\n'
+    finally:
+        # Also runs when the client disconnects; unfinished tasks keep running
+        loop.run(results.aclose())
+
+def wants_stream() -> bool:
+    if request.args.get('stream') == '1':
+        return True
+    return request.accept_mimetypes.best == 'application/x-ndjson'
+
 @app.route('/api/process-tasks', methods=['POST'])
 @handle_errors
-def process_tasks():
+@local_processing_only
+async def process_tasks():
+    """Process every pending task
+
+    With ?stream=1 (or Accept: application/x-ndjson) the response is NDJSON:
+    a {"total": n} line, then one line per task as soon as it finishes.
+    Otherwise all results are returned together when the last task is done.
+    With ?timeout=seconds, tasks not finished by then time out.
+    """
+    try:
+        deadline = read_deadline()
+    except ValueError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 400
+    if wants_stream():
+        batch = agent.task_queue.pop_all()
+        logger.info("Streaming results for %d tasks", len(batch))
+        header = dumps({'total': len(batch)}) + b'\n'
+        lines = itertools.chain([header], stream_results(agent.iter_results(batch, deadline=deadline)))
+        return Response(lines, mimetype='application/x-ndjson')
     try:
-        logger.info("Processing tasks...")
-        results = asyncio.run(agent.process_tasks())
-        logger.info(f"Tasks processed successfully: {results}")
+        results = await agent.process_batch(agent.task_queue.pop_all(), deadline=deadline)
+        logger.info("Processed %d tasks", len(results))
         return jsonify({
             'status': 'success',
             'results': results
         })
     except Exception as e:
-        logger.error(f"Error processing tasks: {str(e)}")
+        logger.error("Error processing tasks: %s", e)
         return jsonify({
             'status': 'error',
             'message': str(e)
         }), 500
 
+@app.route('/api/jobs', methods=['POST'])
+@handle_errors
+@local_processing_only
+def submit_job():
+    """Process every pending task in the background; ?timeout=seconds sets a deadline for the job"""
+    try:
+        deadline = read_deadline()
+    except ValueError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 400
+    job = jobs.submit(deadline=deadline)
+    logger.info("Job %s submitted with %d tasks", job.job_id, job.total)
+    return jsonify({
+        'status': 'success',
+        'job_id': job.job_id,
+        'job': job.to_dict()
+    }), 202
+
+@app.route('/api/jobs')
+@handle_errors
+def list_jobs():
+    return jsonify({
+        'status': 'success',
+        'jobs': [job.to_dict() for job in jobs.list_jobs()]
+    })
+
+@app.route('/api/jobs/<job_id>')
+@handle_errors
+def get_job(job_id):
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({
+            'status': 'error',
+            'message': 'Job not found'
+        }), 404
+    include_results = request.args.get('results', '1') != '0'
+    return jsonify({
+        'status': 'success',
+        'job': job.to_dict(include_results=include_results)
+    })
+
 @app.route('/api/queue-status')
 @handle_errors
 def queue_status():
+    """Queue status in priority order
+
+    Query parameters: limit and cursor for pagination, summary=1 to leave out
+    research results. Responses carry an ETag tied to the queue version, so
+    an unchanged poll with If-None-Match gets a 304.
+    """
     try:
-        tasks = agent.get_queue_status()
-        logger.info(f"Current queue status: {tasks}")
-        return jsonify({
+        etag = f"q{shared.version() if shared is not None else agent.queue_version}"
+        if request.if_none_match.contains_weak(etag):
+            response = Response(status=304)
+            response.set_etag(etag, weak=True)
+            return response
+
+        limit = request.args.get('limit', type=int)
+        cursor = request.args.get('cursor')
+        summary = request.args.get('summary', '0') == '1'
+        if limit is not None and limit <= 0:
+            return jsonify({
+                'status': 'error',
+                'message': 'limit must be positive'
+            }), 400
+
+        if shared is not None:
+            tasks = shared.status(limit=limit, after=cursor, summary=summary)
+            counts = shared.counts()
+            queue_size = counts.get('pending', 0) + counts.get('processing', 0)
+            last_task_id = tasks[-1]['task_id'] if tasks else None
+            encoded = [dumps(task) for task in tasks]
+        else:
+            tasks = agent.task_queue.page(limit=limit, after=cursor)
+            queue_size = len(agent.task_queue)
+            last_task_id = tasks[-1].task_id if tasks else None
+            encoded = [encode_task(task, summary) for task in tasks]
+        logger.debug("Current queue status: %d tasks", len(tasks))
+
+        next_cursor = None
+        if limit is not None and len(tasks) == limit:
+            if shared is not None:
+                next_cursor = last_task_id
+            else:
+                next_cursor = agent.task_queue.cursor(last_task_id)
+
+        # Tasks are encoded one by one, so finished ones come from the cache
+        response = json_body(dumps_with_items({
             'status': 'success',
-            'queue_size': len(tasks),
-            'tasks': tasks
-        })
+            'queue_size': queue_size,
+            'next_cursor': next_cursor
+        }, 'tasks', encoded))
+        response.set_etag(etag, weak=True)
+        return response
+    except ValueError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 400
     except Exception as e:
-        logger.error(f"Error getting queue status: {str(e)}")
+        logger.error("Error getting queue status: %s", e)
         return jsonify({
             'status': 'error',
             'message': str(e)
         }), 500
 
+@app.route('/api/tasks/<task_id>')
+@handle_errors
+def get_task(task_id):
+    """Full details of one task, including its research results"""
+    if shared is not None:
+        task = shared.get(task_id)
+        encoded = dumps(task) if task is not None else None
+    else:
+        task = agent.get_task(task_id)
+        encoded = encode_task(task) if task is not None else None
+    if encoded is None:
+        return jsonify({
+            'status': 'error',
+            'message': 'Task not found'
+        }), 404
+    return json_body(dumps_with_raw({'status': 'success'}, 'task', encoded))
+
+@app.route('/api/tasks/<task_id>/cancel', methods=['POST'])
+@handle_errors
+def cancel_task(task_id):
+    """Cancel a pending task, or stop one that is processing"""
+    if shared is not None:
+        # Workers own running tasks, so only pending ones can be cancelled
+        cancelled = shared.cancel(task_id)
+    else:
+        cancelled = agent.cancel_task(task_id)
+    if not cancelled:
+        return jsonify({
+            'status': 'error',
+            'message': 'Task not found or already finished'
+        }), 404
+    logger.info("Task %s cancelled", task_id)
+    return jsonify({
+        'status': 'success',
+        'task_id': task_id
+    })
+
+@app.route('/api/local-search')
+@handle_errors
+def local_search():
+    """Search every result fetched so far, ranked by BM25, without calling Tavily
+
+    Query parameters: q, and limit (default 10).
+    """
+    if agent.local_index is None:
+        return jsonify({
+            'status': 'error',
+            'message': 'Local index is disabled (set LOCAL_INDEX=True)'
+        }), 404
+    query = (request.args.get('q') or '').strip()
+    if not query:
+        return jsonify({
+            'status': 'error',
+            'message': 'Query parameter q is required'
+        }), 400
+    limit = request.args.get('limit', 10, type=int)
+    if limit <= 0:
+        return jsonify({
+            'status': 'error',
+            'message': 'limit must be positive'
+        }), 400
+    return jsonify({
+        'status': 'success',
+        'query': query,
+        'results': agent.local_index.search(query, limit)
+    })
+
+@app.route('/api/health')
+def health():
+    """Upstream circuit breaker state and retry counts"""
+    return jsonify({
+        'status': 'success',
+        'upstream': agent.circuit_breaker.stats(),
+        'retries': agent.upstream_retries.value(),
+        'search': agent.search_stats()
+    })
+
+@app.route('/metrics')
+def metrics():
+    """Agent metrics in the Prometheus text format"""
+    return Response(agent.metrics.render(), content_type=MetricsRegistry.CONTENT_TYPE)
+
+@app.route('/api/events')
+def events():
+    """Stream task lifecycle events as Server-Sent Events
+
+    Under run.py this path is served by asgi.EventStreamMiddleware without
+    holding a server thread; this route covers the Flask dev server.
+    """
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_event_id = None
+    return Response(
+        stream_with_context(agent.events.stream(last_event_id)),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        }
+    )
+
 @app.errorhandler(404)
 def not_found(error):
     return jsonify({
@@ -153,6 +602,8 @@ def method_not_allowed(error):
 
 @app.after_request
 def after_request(response):
+    if Config.COMPRESS_RESPONSES:
+        response = compress_response(response)
     response.headers.add('Access-Control-Allow-Origin', '*')
     response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization')
     response.headers.add('Access-Control-Allow-Methods', 'GET,PUT,POST,DELETE,OPTIONS')
@@ -166,4 +617,8 @@ if __name__ == '__main__':
             port = int(sys.argv[sys.argv.index('--port') + 1])
         except (IndexError, ValueError):
             pass
-    app.run(debug=True, port=port, host='0.0.0.0')
+    startup()
+    try:
+        app.run(debug=True, port=port, host='0.0.0.0')
+    finally:
+        shutdown()
@@ -0,0 +1,83 @@
+from typing import Optional
+from urllib.parse import parse_qs
+import asyncio
+import logging
+from hypercorn.middleware import AsyncioWSGIMiddleware
+from events import EventBus
+
+logger = logging.getLogger(__name__)
+
+SSE_HEADERS = [
+    (b'content-type', b'text/event-stream'),
+    (b'cache-control', b'no-cache'),
+    (b'x-accel-buffering', b'no'),
+    (b'access-control-allow-origin', b'*')
+]
+
+class EventStreamMiddleware:
+    """ASGI front for the Flask app that serves /api/events on the server's loop
+
+    Hypercorn runs a WSGI app one request per thread of the loop's default
+    executor, so a blocking SSE generator would hold a thread for as long
+    as its browser tab stays open, and a handful of tabs would leave no
+    thread for other requests. Event streams are served here instead, as
+    coroutines waiting on the EventBus; every other request goes to Flask.
+    """
+
+    def __init__(self, wsgi_app, bus: EventBus, path: str = '/api/events',
+                 heartbeat: float = 15.0, max_body_size: int = 16 * 1024 * 1024):
+        self.wsgi = AsyncioWSGIMiddleware(wsgi_app, max_body_size)
+        self.bus = bus
+        self.path = path
+        self.heartbeat = heartbeat
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope['type'] == 'http' and scope['path'] == self.path and scope['method'] == 'GET':
+            await self._serve_stream(scope, receive, send)
+        else:
+            await self.wsgi(scope, receive, send)
+
+    async def _serve_stream(self, scope, receive, send) -> None:
+        stream = asyncio.ensure_future(self._send_events(send, _last_event_id(scope)))
+        disconnect = asyncio.ensure_future(_disconnected(receive))
+        try:
+            # Stop streaming as soon as the client goes away, not at the next heartbeat
+            await asyncio.wait({stream, disconnect}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            stream.cancel()
+            disconnect.cancel()
+            for task in (stream, disconnect):
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+                except Exception as e:
+                    logger.debug("Event stream ended: %s", e)
+
+    async def _send_events(self, send, last_event_id: Optional[int]) -> None:
+        await send({'type': 'http.response.start', 'status': 200, 'headers': SSE_HEADERS})
+        events = self.bus.astream(last_event_id, self.heartbeat)
+        try:
+            async for chunk in events:
+                await send({'type': 'http.response.body', 'body': chunk.encode(), 'more_body': True})
+        finally:
+            await events.aclose()
+        # The bus was closed for shutdown
+        await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+
+async def _disconnected(receive) -> None:
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+def _last_event_id(scope) -> Optional[int]:
+    """Last-Event-ID header, or the last_event_id query parameter, as the Flask route reads it"""
+    value = None
+    for name, header in scope['headers']:
+        if name == b'last-event-id':
+            value = header.decode('latin-1')
+    if not value:
+        value = parse_qs(scope.get('query_string', b'').decode('latin-1')).get('last_event_id', [None])[0]
+    try:
+        return int(value) if value else None
+    except ValueError:
+        return None
@@ -0,0 +1,301 @@
+from typing import Awaitable, Callable, Dict, Optional
+from collections import OrderedDict
+import asyncio
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from config import Config
+
+_WHITESPACE = re.compile(r"\s+")
+
+def normalize_query(query: str) -> str:
+    """Lowercase a query and collapse its whitespace"""
+    return _WHITESPACE.sub(" ", query).strip().lower()
+
+def make_cache_key(query: str, search_depth: str, max_results: int, include_answer: bool) -> str:
+    """Build a cache key from the normalized query and every search parameter that changes the response"""
+    return f"{normalize_query(query)}|{search_depth}|{max_results}|{int(include_answer)}"
+
+class LRUCache:
+    """In-memory LRU cache with a size limit and per-entry TTL
+
+    Thread-safe, so one cache can be shared by Flask's handler threads.
+    """
+
+    def __init__(self, max_entries: int = 1000, ttl: Optional[float] = 3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.time():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: dict, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        with self._lock:
+            self._entries[key] = (value, time.time() + ttl if ttl else None)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations
+        }
+
+class SQLiteCache:
+    """Persistent cache tier in SQLite (WAL mode), shareable between worker processes
+
+    Calls block on disk, so coroutines should go through ResultsCache.aget/aset.
+    The size limit is enforced every prune_every inserts rather than on each
+    one, since counting the rows is a full scan; other processes may be
+    inserting too, so a per-process running count would drift.
+    """
+
+    def __init__(self, db_path: str, ttl: Optional[float] = 3600, max_entries: int = 100000,
+                 prune_every: Optional[int] = None):
+        self.db_path = db_path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.prune_every = prune_every or max(1, max_entries // 100)
+        self._inserts = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._conn = sqlite3.connect(db_path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS results_cache "
+            "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS results_cache_accessed ON results_cache (accessed_at)")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM results_cache").fetchone()[0]
+
+    def get(self, key: str) -> Optional[dict]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM results_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            if row[1] is not None and row[1] <= now:
+                self._conn.execute("DELETE FROM results_cache WHERE key = ?", (key,))
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE results_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, key: str, value: dict, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        now = time.time()
+        payload = json.dumps(value)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results_cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, payload, now + ttl if ttl else None, now)
+            )
+            self._inserts += 1
+            if self._inserts % self.prune_every == 0:
+                self._prune(now)
+
+    def _prune(self, now: float) -> None:
+        count = self._conn.execute("SELECT COUNT(*) FROM results_cache").fetchone()[0]
+        if count > self.max_entries:
+            # Drop expired entries first, then the least recently used
+            cur = self._conn.execute(
+                "DELETE FROM results_cache WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,)
+            )
+            self.expirations += cur.rowcount
+            excess = count - cur.rowcount - self.max_entries
+            if excess > 0:
+                self._conn.execute(
+                    "DELETE FROM results_cache WHERE key IN "
+                    "(SELECT key FROM results_cache ORDER BY accessed_at LIMIT ?)", (excess,)
+                )
+                self.evictions += excess
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM results_cache WHERE key = ?", (key,))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM results_cache")
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'entries': len(self),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations
+        }
+
+class ResultsCache:
+    """Two-tier results cache: an in-memory LRU in front of an optional persistent tier
+
+    Any object with get/set/delete/clear/stats can be used as either tier.
+    """
+
+    def __init__(self, memory: Optional[LRUCache] = None, persistent=None):
+        self.memory = memory if memory is not None else LRUCache()
+        self.persistent = persistent
+
+    @classmethod
+    def from_config(cls) -> "ResultsCache":
+        memory = LRUCache(max_entries=Config.CACHE_MAX_ENTRIES, ttl=Config.CACHE_TTL)
+        persistent = None
+        if Config.CACHE_BACKEND == "sqlite":
+            persistent = SQLiteCache(Config.CACHE_DB, ttl=Config.CACHE_TTL,
+                                     max_entries=Config.CACHE_DB_MAX_ENTRIES)
+        elif Config.CACHE_BACKEND != "memory":
+            raise ValueError(f"Unknown cache backend: {Config.CACHE_BACKEND}")
+        return cls(memory, persistent)
+
+    def __len__(self) -> int:
+        return len(self.memory)
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def get(self, key: str) -> Optional[dict]:
+        value = self.memory.get(key)
+        if value is None and self.persistent is not None:
+            value = self.persistent.get(key)
+            if value is not None:
+                self.memory.set(key, value)
+        return value
+
+    def set(self, key: str, value: dict) -> None:
+        self.memory.set(key, value)
+        if self.persistent is not None:
+            self.persistent.set(key, value)
+
+    async def aget(self, key: str) -> Optional[dict]:
+        """get() for coroutines: the persistent tier is read in a thread, so the loop never waits on disk"""
+        value = self.memory.get(key)
+        if value is None and self.persistent is not None:
+            value = await asyncio.to_thread(self.persistent.get, key)
+            if value is not None:
+                self.memory.set(key, value)
+        return value
+
+    async def aset(self, key: str, value: dict) -> None:
+        """set() for coroutines, writing the persistent tier in a thread"""
+        self.memory.set(key, value)
+        if self.persistent is not None:
+            await asyncio.to_thread(self.persistent.set, key, value)
+
+    def delete(self, key: str) -> None:
+        self.memory.delete(key)
+        if self.persistent is not None:
+            self.persistent.delete(key)
+
+    def clear(self) -> None:
+        self.memory.clear()
+        if self.persistent is not None:
+            self.persistent.clear()
+
+    def tier_counts(self, name: str) -> Dict[tuple, int]:
+        """One of the tiers' counters (hits, evictions, ...), keyed by tier for metric labels"""
+        counts = {('memory',): getattr(self.memory, name, 0)}
+        if self.persistent is not None:
+            counts[('persistent',)] = getattr(self.persistent, name, 0)
+        return counts
+
+    def stats(self) -> dict:
+        stats = {'memory': self.memory.stats()}
+        if self.persistent is not None:
+            stats['persistent'] = self.persistent.stats()
+        return stats
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key onto one in-flight call
+
+    The first caller for a key starts the call as its own task; callers that
+    arrive while it is pending await the same task instead of starting their
+    own. Every caller awaits it through a shield, so a caller that is
+    cancelled or times out does not cancel the call for the others.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    async def do(self, key: str, fn: Callable[[], Awaitable]):
+        loop = asyncio.get_running_loop()
+        future = self._inflight.get(key)
+        if future is not None and future.get_loop() is loop:
+            self.coalesced += 1
+        else:
+            future = loop.create_task(fn())
+            self._inflight[key] = future
+            self.calls += 1
+            future.add_done_callback(lambda done: self._finished(key, done))
+        return await asyncio.shield(future)
+
+    def _finished(self, key: str, future: asyncio.Future) -> None:
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+        if not future.cancelled():
+            # Mark the exception as retrieved in case every caller gave up waiting
+            future.exception()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'in_flight': len(self._inflight),
+            'upstream_calls': self.calls,
+            'coalesced': self.coalesced
+        }
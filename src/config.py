@@ -4,9 +4,92 @@ from dotenv import load_dotenv
 load_dotenv()
 
 class Config:
-    TAVILY_API_KEY = os.getenv("TAVILY_API_KEY", "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")
+    TAVILY_API_KEY = os.getenv("TAVILY_API_KEY")
     MAX_RETRIES = int(os.getenv("MAX_RETRIES", "3"))
+    RETRY_BASE_DELAY = float(os.getenv("RETRY_BASE_DELAY", "0.5"))
+    RETRY_MAX_DELAY = float(os.getenv("RETRY_MAX_DELAY", "20"))
+    CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+    CIRCUIT_RECOVERY_TIMEOUT = float(os.getenv("CIRCUIT_RECOVERY_TIMEOUT", "30"))
     RATE_LIMIT_CALLS = int(os.getenv("RATE_LIMIT_CALLS", "5"))
     RATE_LIMIT_PERIOD = int(os.getenv("RATE_LIMIT_PERIOD", "60"))
+    RATE_LIMIT_BURST = int(os.getenv("RATE_LIMIT_BURST", "0")) or None
+    RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+    RATE_LIMIT_DB = os.getenv("RATE_LIMIT_DB", "data/rate_limit.db")
+    CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "1000"))
+    CACHE_TTL = int(os.getenv("CACHE_TTL", "3600"))
+    CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+    CACHE_DB = os.getenv("CACHE_DB", "data/results_cache.db")
+    # Row limit of the sqlite tier; least recently used rows are pruned past it
+    CACHE_DB_MAX_ENTRIES = int(os.getenv("CACHE_DB_MAX_ENTRIES", "100000"))
+    # Serve cached results for near-duplicate queries (paraphrases) as approximate hits
+    SIMILARITY_CACHE = os.getenv("SIMILARITY_CACHE", "False").lower() == "true"
+    SIMILARITY_THRESHOLD = float(os.getenv("SIMILARITY_THRESHOLD", "0.8"))
+    SIMILARITY_MAX_ENTRIES = int(os.getenv("SIMILARITY_MAX_ENTRIES", "10000"))
+    # Full-text index of every fetched result, searchable offline; LOCAL_FIRST answers
+    # tasks from it when enough indexed documents contain the query's terms
+    LOCAL_INDEX = os.getenv("LOCAL_INDEX", "False").lower() == "true"
+    LOCAL_INDEX_DB = os.getenv("LOCAL_INDEX_DB", "data/local_index.db")
+    LOCAL_INDEX_MAX_DOCS = int(os.getenv("LOCAL_INDEX_MAX_DOCS", "100000"))
+    LOCAL_FIRST = os.getenv("LOCAL_FIRST", "False").lower() == "true"
+    LOCAL_MIN_RESULTS = int(os.getenv("LOCAL_MIN_RESULTS", "3"))
+    LOCAL_MIN_COVERAGE = float(os.getenv("LOCAL_MIN_COVERAGE", "1.0"))
+    TAVILY_BASE_URL = os.getenv("TAVILY_BASE_URL", "https://api.tavily.com/search")
+    # "aiohttp" for the pooled async client, "thread" for TavilyClient in a thread pool
+    SEARCH_TRANSPORT = os.getenv("SEARCH_TRANSPORT", "aiohttp")
+    # Tasks at or above this importance get an advanced search
+    ADVANCED_IMPORTANCE = int(os.getenv("ADVANCED_IMPORTANCE", "3"))
+    MAX_RESULTS = int(os.getenv("MAX_RESULTS", "5"))
+    # "importance" picks the depth from importance; "tiered" tries basic first for
+    # advanced tasks and escalates only when the basic results fall below the thresholds
+    SEARCH_MODE = os.getenv("SEARCH_MODE", "importance")
+    TIER_MIN_ANSWER_CHARS = int(os.getenv("TIER_MIN_ANSWER_CHARS", "80"))
+    # Unknown domains score a neutral 1.0, so the default asks for at least one boosted source
+    TIER_MIN_CREDIBILITY = float(os.getenv("TIER_MIN_CREDIBILITY", "1.2"))
+    # Tavily API credits per search
+    SEARCH_COST_BASIC = float(os.getenv("SEARCH_COST_BASIC", "1"))
+    SEARCH_COST_ADVANCED = float(os.getenv("SEARCH_COST_ADVANCED", "2"))
+    HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+    HTTP_MAX_CONNECTIONS_PER_HOST = int(os.getenv("HTTP_MAX_CONNECTIONS_PER_HOST", "20"))
+    HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "100"))
+    HTTP_KEEPALIVE_TIMEOUT = float(os.getenv("HTTP_KEEPALIVE_TIMEOUT", "30"))
+    # Optional JSON file of source credibility rules (see credibility.DEFAULT_RULES for the format)
+    CREDIBILITY_RULES = os.getenv("CREDIBILITY_RULES", "")
+    MAX_WORKERS = int(os.getenv("MAX_WORKERS", "5"))
+    # Seconds a task may take from when it is queued (0: no deadline); requests can set their own
+    TASK_TIMEOUT = float(os.getenv("TASK_TIMEOUT", "0"))
+    # Seconds to wait for one Tavily call before giving up on it (and retrying)
+    SEARCH_TIMEOUT = float(os.getenv("SEARCH_TIMEOUT", "30"))
+    # Tasks with less slack than this before their deadline are run ahead of more important ones
+    URGENT_SLACK = float(os.getenv("URGENT_SLACK", "5"))
+    # Seconds for the expected search latency used in deadline planning to halve while no calls complete
+    ESTIMATE_HALF_LIFE = float(os.getenv("ESTIMATE_HALF_LIFE", "60"))
+    # "memory", "sqlite" to keep the task queue across restarts, or "shared"
+    # to hand tasks to separate worker processes (src/worker.py)
+    QUEUE_BACKEND = os.getenv("QUEUE_BACKEND", "memory")
+    QUEUE_DB = os.getenv("QUEUE_DB", "data/task_queue.db")
+    QUEUE_FLUSH_INTERVAL = float(os.getenv("QUEUE_FLUSH_INTERVAL", "0.05"))
+    SHARED_QUEUE_DB = os.getenv("SHARED_QUEUE_DB", "data/shared_queue.db")
+    WORKER_PROCESSES = int(os.getenv("WORKER_PROCESSES", str(os.cpu_count() or 1)))
+    WORKER_LEASE_SECONDS = float(os.getenv("WORKER_LEASE_SECONDS", "60"))
+    WORKER_POLL_INTERVAL = float(os.getenv("WORKER_POLL_INTERVAL", "1"))
+    # Seconds between checks for worker progress to publish on /api/events in shared mode
+    EVENT_POLL_INTERVAL = float(os.getenv("EVENT_POLL_INTERVAL", "1"))
+    MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "10000"))
+    TASK_HISTORY = int(os.getenv("TASK_HISTORY", "1000"))
+    # "full" keeps whole search responses; "slim" keeps only the fields the UI and analysis use
+    RESULT_FIELDS = os.getenv("RESULT_FIELDS", "full")
+    JOB_HISTORY = int(os.getenv("JOB_HISTORY", "100"))
+    # Seconds to let running jobs finish when the server shuts down
+    SHUTDOWN_TIMEOUT = float(os.getenv("SHUTDOWN_TIMEOUT", "30"))
+    EVENT_HISTORY = int(os.getenv("EVENT_HISTORY", "1000"))
+    # "auto" uses orjson when it is installed, "orjson" requires it, "json" is the standard library
+    JSON_ENCODER = os.getenv("JSON_ENCODER", "auto")
+    # JSON and HTML responses at least this large are gzip/brotli compressed if the client accepts it
+    COMPRESS_RESPONSES = os.getenv("COMPRESS_RESPONSES", "True").lower() == "true"
+    COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+    COMPRESS_LEVEL = int(os.getenv("COMPRESS_LEVEL", "6"))
     DEBUG = os.getenv("DEBUG", "True").lower() == "true"
     PORT = int(os.getenv("PORT", "5002"))
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+    # Fraction of per-task info/debug log lines that are emitted; warnings and errors are always logged
+    LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "1.0"))
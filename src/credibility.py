@@ -0,0 +1,118 @@
+from typing import Dict, List, Optional, Tuple
+from functools import lru_cache
+from urllib.parse import urlsplit
+import json
+
+# Each group applies its multiplier at most once per URL. A group matches when
+# the hostname ends with one of its suffixes (on a label boundary), or when
+# the registrable domain name contains one of its keywords.
+DEFAULT_RULES = {
+    'max_score': 2.0,
+    # Public suffixes with more than one label, so "example.co.uk" is read as
+    # the domain "example" and not "co"
+    'multi_part_suffixes': [
+        'co.uk', 'ac.uk', 'gov.uk', 'org.uk', 'com.au', 'edu.au', 'gov.au', 'org.au',
+        'co.jp', 'ac.jp', 'com.br', 'co.in', 'gov.in', 'ac.in', 'co.nz', 'ac.nz'
+    ],
+    'groups': [
+        {
+            'name': 'academic',
+            'multiplier': 1.3,
+            'suffixes': ['edu', 'ac.uk', 'edu.au', 'ac.jp', 'ac.in', 'ac.nz'],
+            'keywords': ['academic', 'research', 'science']
+        },
+        {
+            'name': 'reference',
+            'multiplier': 1.2,
+            'suffixes': ['wikipedia.org', 'britannica.com', 'nature.com', 'science.org']
+        },
+        {
+            'name': 'government',
+            'multiplier': 1.25,
+            'suffixes': ['gov', 'gov.uk', 'gov.au', 'gov.in']
+        },
+        {
+            'name': 'archive',
+            'multiplier': 0.9,
+            'suffixes': ['archive.org']
+        }
+    ]
+}
+
+class CredibilityScorer:
+    """Scores source URLs from their parsed hostnames against domain rules
+
+    Suffix rules sit in a hash index keyed by domain suffix, so a hostname
+    with n labels costs n dictionary lookups however many rules there are.
+    Scores are memoized per hostname.
+    """
+
+    def __init__(self, rules: Optional[dict] = None, cache_size: int = 10000):
+        rules = rules or DEFAULT_RULES
+        self.max_score = float(rules.get('max_score', 2.0))
+        self.multi_part_suffixes = frozenset(s.lower() for s in rules.get('multi_part_suffixes', ()))
+        self.groups: List[Tuple[str, float]] = []
+        self._suffix_index: Dict[str, List[int]] = {}
+        self._keywords: List[Tuple[str, int]] = []
+        for group_id, group in enumerate(rules.get('groups', ())):
+            self.groups.append((group['name'], float(group['multiplier'])))
+            for suffix in group.get('suffixes', ()):
+                self._suffix_index.setdefault(suffix.lower().strip('.'), []).append(group_id)
+            for keyword in group.get('keywords', ()):
+                self._keywords.append((keyword.lower(), group_id))
+        self.score_host = lru_cache(maxsize=cache_size)(self._score_host)
+
+    @classmethod
+    def from_file(cls, path: str) -> "CredibilityScorer":
+        with open(path) as f:
+            return cls(json.load(f))
+
+    @staticmethod
+    def hostname(url: str) -> str:
+        try:
+            host = urlsplit(url if '//' in url else '//' + url).hostname or ''
+        except ValueError:
+            return ''
+        return host.rstrip('.')
+
+    def _registrable_name(self, labels: List[str]) -> str:
+        """The label just left of the public suffix, e.g. "example" for www.example.co.uk"""
+        if len(labels) >= 3 and '.'.join(labels[-2:]) in self.multi_part_suffixes:
+            return labels[-3]
+        if len(labels) >= 2:
+            return labels[-2]
+        return labels[0] if labels else ''
+
+    def _score_host(self, host: str) -> float:
+        if not host:
+            return 1.0
+        labels = host.split('.')
+        matched = set()
+        for i in range(len(labels)):
+            groups = self._suffix_index.get('.'.join(labels[i:]))
+            if groups:
+                matched.update(groups)
+        name = self._registrable_name(labels)
+        for keyword, group_id in self._keywords:
+            if keyword in name:
+                matched.add(group_id)
+
+        score = 1.0
+        for group_id in sorted(matched):
+            score *= self.groups[group_id][1]
+        return min(score, self.max_score)
+
+    def score(self, url: str) -> float:
+        return self.score_host(self.hostname(url))
+
+    def score_many(self, urls: List[str]) -> List[float]:
+        """Score a batch of URLs, parsing each distinct URL once"""
+        hostname = self.hostname
+        score_host = self.score_host
+        scores: Dict[str, float] = {}
+        for url in urls:
+            if url not in scores:
+                scores[url] = score_host(hostname(url))
+        return [scores[url] for url in urls]
+
+default_scorer = CredibilityScorer()
@@ -0,0 +1,169 @@
+from typing import AsyncIterator, Deque, Iterator, Optional, Set
+from dataclasses import dataclass
+from collections import deque
+import asyncio
+import json
+import queue
+import threading
+from config import Config
+
+@dataclass
+class Event:
+    event_id: int
+    type: str
+    data: dict
+
+    def to_sse(self) -> str:
+        return f"id: {self.event_id}\nevent: {self.type}\ndata: {json.dumps(self.data)}\n\n"
+
+class Subscription:
+    """One subscriber's buffered view of the event stream"""
+
+    def __init__(self, bus: "EventBus", max_pending: int):
+        self._bus = bus
+        self._queue: "queue.Queue[Event]" = queue.Queue(max_pending)
+        # Set when the subscriber falls too far behind and has missed events
+        self.overflowed = False
+        self.closed = False
+        # (loop, event) of a coroutine waiting in aget(), woken from publishing threads
+        self._waiter = None
+
+    def _put(self, event: Optional[Event]) -> None:
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self.overflowed = True
+        self._wake()
+
+    def _wake(self) -> None:
+        waiter = self._waiter
+        if waiter is not None:
+            loop, ready = waiter
+            try:
+                loop.call_soon_threadsafe(ready.set)
+            except RuntimeError:
+                # The waiting loop has already closed
+                pass
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Event]:
+        """Wait for the next event, or return None on timeout"""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    async def aget(self, timeout: Optional[float] = None) -> Optional[Event]:
+        """Like get(), but waits on the running event loop instead of blocking a thread"""
+        ready = asyncio.Event()
+        self._waiter = (asyncio.get_running_loop(), ready)
+        try:
+            async with asyncio.timeout(timeout):
+                while True:
+                    ready.clear()
+                    try:
+                        return self._queue.get_nowait()
+                    except queue.Empty:
+                        await ready.wait()
+        except TimeoutError:
+            return None
+        finally:
+            self._waiter = None
+
+    def close(self) -> None:
+        self._bus._unsubscribe(self)
+
+class EventBus:
+    """Thread-safe publish/subscribe bus for compact task lifecycle events
+
+    Keeps a short history so reconnecting clients can resume from the last
+    event ID they saw.
+    """
+
+    def __init__(self, history: int = Config.EVENT_HISTORY, max_pending: int = 1000):
+        self.max_pending = max_pending
+        self._history: Deque[Event] = deque(maxlen=history)
+        self._subscribers: Set[Subscription] = set()
+        self._lock = threading.Lock()
+        self._seq = 0
+        self.closed = False
+
+    @property
+    def last_event_id(self) -> int:
+        return self._seq
+
+    def publish(self, type: str, data: dict) -> Event:
+        with self._lock:
+            self._seq += 1
+            event = Event(self._seq, type, data)
+            self._history.append(event)
+            for subscription in self._subscribers:
+                subscription._put(event)
+        return event
+
+    def subscribe(self, last_event_id: Optional[int] = None) -> Subscription:
+        """Subscribe to new events, first replaying any after last_event_id that are still in history"""
+        subscription = Subscription(self, self.max_pending)
+        with self._lock:
+            subscription.closed = self.closed
+            if last_event_id is not None:
+                if self._history and self._history[0].event_id > last_event_id + 1:
+                    subscription.overflowed = True
+                for event in self._history:
+                    if event.event_id > last_event_id:
+                        subscription._put(event)
+            self._subscribers.add(subscription)
+        return subscription
+
+    def close(self) -> None:
+        """End every open stream, e.g. so a server can shut down"""
+        with self._lock:
+            self.closed = True
+            for subscription in self._subscribers:
+                subscription.closed = True
+                # Wake a subscriber blocked waiting for its next event
+                subscription._put(None)
+
+    def _unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def stream(self, last_event_id: Optional[int] = None, heartbeat: float = 15.0) -> Iterator[str]:
+        """Yield Server-Sent Events text, with comment heartbeats to keep idle connections open
+
+        Blocks a thread for as long as the client stays connected; servers
+        running on an event loop should use astream() instead.
+        """
+        subscription = self.subscribe(last_event_id)
+        try:
+            yield "retry: 3000\n\n"
+            while not subscription.closed:
+                if subscription.overflowed:
+                    yield self._reset(subscription)
+                event = subscription.get(timeout=heartbeat)
+                if event is not None:
+                    yield event.to_sse()
+                elif not subscription.closed:
+                    yield ": heartbeat\n\n"
+        finally:
+            subscription.close()
+
+    async def astream(self, last_event_id: Optional[int] = None, heartbeat: float = 15.0) -> AsyncIterator[str]:
+        """Same as stream(), but waits for events on the running loop without holding a thread"""
+        subscription = self.subscribe(last_event_id)
+        try:
+            yield "retry: 3000\n\n"
+            while not subscription.closed:
+                if subscription.overflowed:
+                    yield self._reset(subscription)
+                event = await subscription.aget(timeout=heartbeat)
+                if event is not None:
+                    yield event.to_sse()
+                elif not subscription.closed:
+                    yield ": heartbeat\n\n"
+        finally:
+            subscription.close()
+
+    def _reset(self, subscription: Subscription) -> str:
+        # Tell the client it missed events and should reload the full state
+        subscription.overflowed = False
+        return f"event: reset\ndata: {json.dumps({'last_event_id': self.last_event_id})}\n\n"
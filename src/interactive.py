@@ -1,8 +1,13 @@
 import asyncio
+from dotenv import load_dotenv
 from agent import WorkflowAgent
+from config import Config
 
 async def interactive_workflow():
-    API_KEY = "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"
+    load_dotenv()
+    API_KEY = Config.TAVILY_API_KEY
+    if not API_KEY:
+        raise ValueError("TAVILY_API_KEY environment variable is not set")
     agent = WorkflowAgent(api_key=API_KEY)
     
     while True:
@@ -30,7 +35,7 @@ async def interactive_workflow():
                 continue
                 
             print("\nProcessing tasks...")
-            results = await agent.run_workflow()
+            results = await agent.process_tasks()
             
             for i, result in enumerate(results, 1):
                 print(f"\n--- Result {i} ---")
@@ -39,13 +44,15 @@ async def interactive_workflow():
                 if 'error' in result['result']:
                     print(f"Error: {result['result']['error']}")
                 else:
-                    print("Answer:", result['result'].get('answer', 'No direct answer available'))
+                    research_results = result['result'].get('research_results') or {}
+                    print("Answer:", research_results.get('answer', 'No direct answer available'))
                     print("\nTop Sources:")
-                    for source in result['result'].get('results', [])[:3]:
+                    for source in research_results.get('results', [])[:3]:
                         print(f"- {source.get('title', 'N/A')}: {source.get('url', 'N/A')}")
                 
         elif choice == "3":
             print("Goodbye!")
+            await agent.close()
             break
         else:
             print("Invalid choice. Please try again.")
@@ -0,0 +1,240 @@
+from typing import Callable, List, Optional
+from dataclasses import dataclass, field
+from collections import OrderedDict
+from concurrent.futures import Future
+from datetime import datetime
+import asyncio
+import contextvars
+import logging
+import threading
+import uuid
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+class BackgroundLoop:
+    """A long-lived event loop running in a daemon thread
+
+    Lets synchronous code (Flask handlers) hand coroutines to one shared loop
+    instead of starting a new loop per request. Startup hooks run on the loop
+    when it starts; shutdown hooks run, in reverse order, before it stops.
+    """
+
+    def __init__(self, name: str = "agent-loop"):
+        self.name = name
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._started = threading.Event()
+        self._lock = threading.Lock()
+        self._startup: List[Callable] = []
+        self._shutdown: List[Callable] = []
+
+    def on_startup(self, fn: Callable) -> Callable:
+        """Register a coroutine function to run when the loop starts"""
+        self._startup.append(fn)
+        return fn
+
+    def on_shutdown(self, fn: Callable) -> Callable:
+        """Register a coroutine function to run before the loop stops"""
+        self._shutdown.append(fn)
+        return fn
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self) -> "BackgroundLoop":
+        with self._lock:
+            if self._thread is not None:
+                return self
+            self._started.clear()
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+            self._started.wait()
+            for fn in self._startup:
+                asyncio.run_coroutine_threadsafe(fn(), self.loop).result()
+        return self
+
+    def _run(self) -> None:
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self._started.set()
+        self.loop.run_forever()
+
+    def submit(self, coro, context: Optional[contextvars.Context] = None) -> Future:
+        """Schedule a coroutine on the loop and return a concurrent.futures.Future
+
+        The coroutine runs in `context` if given, e.g. a copy of the calling
+        thread's context so Flask's request globals work inside it.
+        """
+        self.start()
+        if context is None:
+            return asyncio.run_coroutine_threadsafe(coro, self.loop)
+        future: Future = Future()
+
+        def schedule() -> None:
+            task = self.loop.create_task(coro, context=context)
+
+            def done(task: asyncio.Task) -> None:
+                if task.cancelled():
+                    future.cancel()
+                elif task.exception() is not None:
+                    future.set_exception(task.exception())
+                else:
+                    future.set_result(task.result())
+
+            task.add_done_callback(done)
+
+        self.loop.call_soon_threadsafe(schedule)
+        return future
+
+    def run(self, coro, timeout: Optional[float] = None, context: Optional[contextvars.Context] = None):
+        """Run a coroutine on the loop and block until it finishes"""
+        return self.submit(coro, context).result(timeout)
+
+    async def _shutdown_loop(self) -> None:
+        for fn in reversed(self._shutdown):
+            try:
+                await fn()
+            except Exception:
+                logger.exception("Shutdown hook %r failed", fn)
+        # Cancel whatever is still running, then release the loop's resources
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await self.loop.shutdown_asyncgens()
+        await self.loop.shutdown_default_executor()
+
+    def stop(self) -> None:
+        """Run the shutdown hooks, stop the loop and join its thread"""
+        with self._lock:
+            if self._thread is None:
+                return
+            asyncio.run_coroutine_threadsafe(self._shutdown_loop(), self.loop).result()
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join()
+            self.loop.close()
+            self._thread = None
+
+@dataclass
+class Job:
+    job_id: str
+    created_at: datetime
+    task_ids: List[str] = field(default_factory=list)
+    status: str = "queued"
+    completed: int = 0
+    failed: int = 0
+    results: List[Optional[dict]] = field(default_factory=list)
+    error: Optional[str] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    @property
+    def total(self) -> int:
+        return len(self.task_ids)
+
+    def record(self, index: int, result: dict) -> None:
+        self.results[index] = result
+        self.completed += 1
+        if result['result']['status'] != 'success':
+            self.failed += 1
+
+    def to_dict(self, include_results: bool = False) -> dict:
+        data = {
+            'job_id': self.job_id,
+            'status': self.status,
+            'total': self.total,
+            'completed': self.completed,
+            'failed': self.failed,
+            'task_ids': self.task_ids,
+            'created_at': self.created_at.isoformat(),
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'error': self.error
+        }
+        if include_results:
+            data['results'] = [result for result in self.results if result is not None]
+        return data
+
+class JobManager:
+    """Runs queue processing as background jobs on a shared event loop"""
+
+    def __init__(self, agent, loop: Optional[BackgroundLoop] = None, max_jobs: int = Config.JOB_HISTORY):
+        self.agent = agent
+        self.loop = loop or BackgroundLoop()
+        self.max_jobs = max_jobs
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._running: "set[asyncio.Task]" = set()
+
+    def submit(self, batch: Optional[list] = None,
+               on_result: Optional[Callable[[int, dict], None]] = None,
+               deadline: Optional[datetime] = None) -> Job:
+        """Start processing a batch in the background; by default every pending task in the queue
+
+        on_result(index, result) is called on the loop thread as each task
+        finishes. Tasks still unfinished at `deadline` time out.
+        """
+        if batch is None:
+            batch = self.agent.task_queue.pop_all()
+        job = Job(
+            job_id=uuid.uuid4().hex,
+            created_at=datetime.now(),
+            task_ids=[task.task_id for task in batch],
+            results=[None] * len(batch)
+        )
+        with self._lock:
+            self._jobs[job.job_id] = job
+            # Forget the oldest finished jobs once we keep more than max_jobs
+            for job_id in list(self._jobs):
+                if len(self._jobs) <= self.max_jobs:
+                    break
+                if self._jobs[job_id].status in ("completed", "failed"):
+                    del self._jobs[job_id]
+        self.loop.submit(self._run(job, batch, on_result, deadline))
+        return job
+
+    async def _run(self, job: Job, batch: list, on_result: Optional[Callable[[int, dict], None]],
+                   deadline: Optional[datetime] = None) -> None:
+        job.status = "running"
+        job.started_at = datetime.now()
+        task = asyncio.current_task()
+        self._running.add(task)
+
+        def record(index: int, result: dict) -> None:
+            job.record(index, result)
+            if on_result is not None:
+                on_result(index, result)
+
+        try:
+            await self.agent.process_batch(batch, on_result=record, deadline=deadline)
+            job.status = "completed"
+        except asyncio.CancelledError:
+            job.status = "failed"
+            job.error = "Cancelled at shutdown"
+            raise
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.finished_at = datetime.now()
+            self._running.discard(task)
+
+    async def drain(self, timeout: float = Config.SHUTDOWN_TIMEOUT) -> None:
+        """Wait for running jobs to finish, cancelling any still running after timeout"""
+        running = set(self._running)
+        if not running:
+            return
+        logger.info("Waiting up to %.0fs for %d running jobs", timeout, len(running))
+        _, pending = await asyncio.wait(running, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def list_jobs(self) -> List[Job]:
+        with self._lock:
+            return list(self._jobs.values())
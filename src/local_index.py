@@ -0,0 +1,281 @@
+from typing import Dict, List, Optional
+from collections import OrderedDict
+import atexit
+import heapq
+import logging
+import math
+import os
+import queue
+import sqlite3
+import threading
+import time
+import zlib
+from analysis import STOP_WORDS
+from config import Config
+from similarity import content_words, query_tokens
+
+logger = logging.getLogger(__name__)
+
+# URL parts that every document shares and that carry no meaning
+URL_NOISE = frozenset({'http', 'https', 'www', 'com', 'org', 'net', 'html', 'htm'})
+
+_STOP = object()
+
+class _Doc:
+    __slots__ = ('url', 'title', 'content', 'query', 'length')
+
+    def __init__(self, url: str, title: str, content: str, query: str, length: int):
+        self.url = url
+        self.title = title
+        self.content = content
+        self.query = query
+        self.length = length
+
+def document_terms(url: str, title: str, content: str) -> List[str]:
+    """Index terms of one search result; title words count twice"""
+    title_terms = content_words(title)
+    return title_terms + title_terms + content_words(url, STOP_WORDS | URL_NOISE) + content_words(content)
+
+class LocalIndex:
+    """Incremental BM25 full-text index over every search result the agent has fetched
+
+    Each result is one document, keyed by URL, so a page found again by
+    another query replaces its earlier copy. Postings live in memory as
+    term -> {url: term frequency}. Documents are also written to SQLite
+    (content zlib-compressed) by a background thread, in batches like
+    TaskStore, and the postings are rebuilt from them on startup. The
+    oldest documents are dropped beyond max_docs.
+    """
+
+    def __init__(self, db_path: Optional[str] = None, max_docs: int = 100000,
+                 k1: float = 1.2, b: float = 0.75, flush_interval: float = 0.05):
+        self.db_path = db_path
+        self.max_docs = max_docs
+        self.k1 = k1
+        self.b = b
+        self.flush_interval = flush_interval
+        self._docs: "OrderedDict[str, _Doc]" = OrderedDict()
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._total_length = 0
+        # Tavily's answer for each indexed query, and how many documents still cite it
+        self._answers: Dict[str, str] = {}
+        self._query_docs: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._conn = None
+        self._writer = None
+        if db_path:
+            self._open(db_path)
+
+    @classmethod
+    def from_config(cls) -> Optional["LocalIndex"]:
+        """An index persisted at LOCAL_INDEX_DB, or None if the local index is off"""
+        if not Config.LOCAL_INDEX:
+            return None
+        return cls(Config.LOCAL_INDEX_DB or None, max_docs=Config.LOCAL_INDEX_MAX_DOCS)
+
+    def _open(self, db_path: str) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._conn = sqlite3.connect(db_path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS documents "
+            "(url TEXT PRIMARY KEY, title TEXT NOT NULL, content BLOB NOT NULL, query TEXT NOT NULL, added_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS answers (query TEXT PRIMARY KEY, answer TEXT NOT NULL)")
+        self._load()
+        self._pending: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._writer = threading.Thread(target=self._write_loop, name="local-index-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    def _load(self) -> None:
+        started = time.perf_counter()
+        # Drop answers whose documents have all been evicted
+        self._conn.execute("DELETE FROM answers WHERE query NOT IN (SELECT query FROM documents)")
+        answers = dict(self._conn.execute("SELECT query, answer FROM answers"))
+        rows = self._conn.execute("SELECT url, title, content, query FROM documents ORDER BY rowid")
+        for url, title, content, query in rows:
+            self._insert(url, title, zlib.decompress(content).decode(), query)
+            if query in answers:
+                self._answers[query] = answers[query]
+        logger.info("Loaded %d documents into the local index in %.2fs",
+                    len(self._docs), time.perf_counter() - started)
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def add_response(self, response: dict) -> int:
+        """Index every result of a search response; returns how many documents were added or updated"""
+        query = response.get('query') or ''
+        added = []
+        with self._lock:
+            for result in response.get('results') or ():
+                url = result.get('url')
+                if not url:
+                    continue
+                title, content = result.get('title') or '', result.get('content') or ''
+                self._insert(url, title, content, query)
+                added.append((url, title, content, query))
+            evicted = self._evict()
+            # Set after the documents, since replacing a query's last document drops its answer
+            answer = response.get('answer') if query in self._query_docs else None
+            if answer:
+                self._answers[query] = answer
+        if self._writer is not None:
+            if answer:
+                self._pending.put(('answer', query, answer))
+            for doc in added:
+                self._pending.put(('document',) + doc)
+            for url in evicted:
+                self._pending.put(('delete', url))
+        return len(added)
+
+    def _insert(self, url: str, title: str, content: str, query: str) -> None:
+        if url in self._docs:
+            self._remove(url)
+        terms = document_terms(url, title, content)
+        for term in terms:
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+            postings[url] = postings.get(url, 0) + 1
+        self._docs[url] = _Doc(url, title, content, query, len(terms))
+        self._total_length += len(terms)
+        self._query_docs[query] = self._query_docs.get(query, 0) + 1
+
+    def _remove(self, url: str) -> None:
+        doc = self._docs.pop(url)
+        # Terms are recomputed rather than kept per document, to save memory
+        for term in set(document_terms(doc.url, doc.title, doc.content)):
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(url, None)
+                if not postings:
+                    del self._postings[term]
+        self._total_length -= doc.length
+        remaining = self._query_docs.get(doc.query, 0) - 1
+        if remaining > 0:
+            self._query_docs[doc.query] = remaining
+        else:
+            self._query_docs.pop(doc.query, None)
+            self._answers.pop(doc.query, None)
+
+    def _evict(self) -> List[str]:
+        evicted = []
+        while len(self._docs) > self.max_docs:
+            url = next(iter(self._docs))
+            self._remove(url)
+            evicted.append(url)
+        return evicted
+
+    def search(self, query: str, limit: int = 10) -> List[dict]:
+        """Best documents for a query by BM25, each with the share of query terms it contains"""
+        terms = query_tokens(query)
+        with self._lock:
+            count = len(self._docs)
+            if not count or not terms:
+                return []
+            average_length = self._total_length / count
+            docs, k1 = self._docs, self.k1
+            # k1 * (1 - b + b * length / average length) == base + slope * length
+            base, slope = k1 * (1 - self.b), k1 * self.b / average_length
+            scores: Dict[str, float] = {}
+            matched: Dict[str, int] = {}
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                weight = idf * (k1 + 1)
+                for url, tf in postings.items():
+                    scores[url] = scores.get(url, 0.0) + weight * tf / (tf + base + slope * docs[url].length)
+                    matched[url] = matched.get(url, 0) + 1
+            best = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+            hits = []
+            for url, score in best:
+                doc = self._docs[url]
+                hits.append({
+                    'url': url,
+                    'title': doc.title,
+                    'content': doc.content,
+                    'score': round(score, 4),
+                    'coverage': round(matched[url] / len(terms), 3),
+                    'query': doc.query
+                })
+        return hits
+
+    def answer(self, query: str, max_results: int = 5, min_results: int = 3,
+               min_coverage: float = 1.0) -> Optional[dict]:
+        """A Tavily-shaped response built from the index, if it covers the query well enough
+
+        Coverage is good enough when at least min_results documents each
+        contain at least min_coverage of the query's terms. The answer is
+        the one Tavily gave for the query that found the best document.
+        """
+        hits = [hit for hit in self.search(query, max_results) if hit['coverage'] >= min_coverage]
+        if len(hits) < min_results:
+            return None
+        response = {
+            'query': query,
+            'results': [{key: hit[key] for key in ('title', 'url', 'content', 'score')} for hit in hits]
+        }
+        answer = self._answers.get(hits[0]['query'])
+        if answer:
+            response['answer'] = answer
+        return response
+
+    def _write_loop(self) -> None:
+        stopping = False
+        while not stopping:
+            item = self._pending.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._pending.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._write(batch)
+
+    def _write(self, batch: List[tuple]) -> None:
+        now = time.time()
+        try:
+            self._conn.execute("BEGIN")
+            for op, *args in batch:
+                if op == 'document':
+                    url, title, content, query = args
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO documents (url, title, content, query, added_at) VALUES (?, ?, ?, ?, ?)",
+                        (url, title, zlib.compress(content.encode()), query, now)
+                    )
+                elif op == 'answer':
+                    self._conn.execute("INSERT OR REPLACE INTO answers (query, answer) VALUES (?, ?)", args)
+                else:
+                    self._conn.execute("DELETE FROM documents WHERE url = ?", args)
+            self._conn.execute("COMMIT")
+        except sqlite3.Error as e:
+            self._conn.execute("ROLLBACK")
+            logger.error("Failed to persist %d local index updates: %s", len(batch), e)
+
+    def stats(self) -> dict:
+        return {
+            'documents': len(self._docs),
+            'terms': len(self._postings),
+            'queries': len(self._query_docs)
+        }
+
+    def close(self) -> None:
+        """Flush everything still queued and stop the writer"""
+        if self._writer is not None and self._writer.is_alive():
+            self._pending.put(_STOP)
+            self._writer.join()
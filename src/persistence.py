@@ -0,0 +1,116 @@
+from typing import List, Optional, Tuple
+from datetime import datetime
+import atexit
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+class TaskStore:
+    """Durable record of task state in SQLite (WAL mode)
+
+    record() only puts a small snapshot tuple on an in-memory queue, so it
+    costs microseconds on the request path. A background thread writes the
+    snapshots in batches: one transaction, and so one fsync, per flush
+    interval. Only the latest state of each task is kept.
+    """
+
+    def __init__(self, db_path: str, flush_interval: float = 0.05, max_batch: int = 5000):
+        self.db_path = db_path
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._conn = sqlite3.connect(db_path, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # FULL makes every commit durable; batching keeps commits rare
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS tasks ("
+            "task_id TEXT PRIMARY KEY, query TEXT NOT NULL, category TEXT NOT NULL, "
+            "importance INTEGER NOT NULL, created_at TEXT NOT NULL, status TEXT NOT NULL, "
+            "error TEXT, updated_at REAL NOT NULL, deadline TEXT)"
+        )
+        # Tables created before deadlines were persisted lack the column
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(tasks)")}
+        if 'deadline' not in columns:
+            self._conn.execute("ALTER TABLE tasks ADD COLUMN deadline TEXT")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status)")
+        self._pending: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._writer = threading.Thread(target=self._write_loop, name="task-store-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    def record(self, task) -> None:
+        """Queue the task's current state to be written"""
+        self._pending.put((task.task_id, task.query, task.category, task.importance,
+                           task.created_at, task.status, task.error, task.deadline))
+
+    def record_many(self, tasks) -> None:
+        for task in tasks:
+            self.record(task)
+
+    def _write_loop(self) -> None:
+        stopping = False
+        while not stopping:
+            item = self._pending.get()
+            if item is _STOP:
+                break
+            batch = {item[0]: item}
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.max_batch:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._pending.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch[item[0]] = item
+            self._write(list(batch.values()))
+
+    def _write(self, batch: List[tuple]) -> None:
+        now = time.time()
+        rows = [(task_id, query, category, importance, created_at.isoformat(), status, error, now,
+                 deadline.isoformat() if deadline else None)
+                for task_id, query, category, importance, created_at, status, error, deadline in batch]
+        try:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO tasks "
+                "(task_id, query, category, importance, created_at, status, error, updated_at, deadline) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows
+            )
+            self._conn.execute("COMMIT")
+        except sqlite3.Error as e:
+            self._conn.execute("ROLLBACK")
+            logger.error("Failed to persist %d task updates: %s", len(rows), e)
+
+    def load_unfinished(self) -> List[Tuple[str, str, str, int, datetime, str, Optional[datetime]]]:
+        """Return (task_id, query, category, importance, created_at, status, deadline) for pending and processing tasks
+
+        Rows for finished tasks are dropped at the same time, so the table is
+        compacted on every restart.
+        """
+        self._conn.execute("DELETE FROM tasks WHERE status NOT IN ('pending', 'processing')")
+        rows = self._conn.execute(
+            "SELECT task_id, query, category, importance, created_at, status, deadline "
+            "FROM tasks ORDER BY created_at"
+        ).fetchall()
+        return [(task_id, query, category, importance, datetime.fromisoformat(created_at), status,
+                 datetime.fromisoformat(deadline) if deadline else None)
+                for task_id, query, category, importance, created_at, status, deadline in rows]
+
+    def close(self) -> None:
+        """Flush everything still queued and stop the writer"""
+        if self._writer.is_alive():
+            self._pending.put(_STOP)
+            self._writer.join()
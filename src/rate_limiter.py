@@ -0,0 +1,149 @@
+from typing import Dict, Optional
+import asyncio
+import hashlib
+import os
+import sqlite3
+import time
+from config import Config
+
+class TokenBucket:
+    """Token-bucket limiter: holds up to `burst` tokens, refilled at calls/period per second
+
+    Waiters are served in FIFO order: acquire() holds a lock while it sleeps
+    for the next token, and asyncio.Lock wakes its waiters in arrival order.
+    """
+
+    def __init__(self, calls: int, period: float, burst: Optional[int] = None):
+        if calls <= 0 or period <= 0:
+            raise ValueError("calls and period must be positive")
+        self.capacity = float(burst or calls)
+        self.refill_rate = calls / period
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock: Optional[asyncio.Lock] = None
+        self._lock_loop = None
+
+    def _get_lock(self) -> asyncio.Lock:
+        # asyncio.Lock binds to the loop it is first contended on, so keep one per loop
+        loop = asyncio.get_running_loop()
+        if self._lock is None or self._lock_loop is not loop:
+            self._lock = asyncio.Lock()
+            self._lock_loop = loop
+        return self._lock
+
+    def _take(self, tokens: float) -> float:
+        """Take tokens if available; otherwise return how long to wait for them"""
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.refill_rate)
+        self._updated = now
+        if self._tokens >= tokens:
+            self._tokens -= tokens
+            return 0.0
+        return (tokens - self._tokens) / self.refill_rate
+
+    async def _take_async(self, tokens: float) -> float:
+        return self._take(tokens)
+
+    async def acquire(self, tokens: float = 1) -> float:
+        """Wait until tokens are available and take them. Returns the time spent waiting"""
+        if tokens > self.capacity:
+            raise ValueError(f"Cannot acquire {tokens} tokens from a bucket of {self.capacity}")
+        start = time.monotonic()
+        async with self._get_lock():
+            while True:
+                wait = await self._take_async(tokens)
+                if wait <= 0:
+                    return time.monotonic() - start
+                await asyncio.sleep(wait)
+
+class SQLiteTokenBucket(TokenBucket):
+    """Token bucket whose state lives in SQLite so several worker processes share one quota"""
+
+    def __init__(self, key: str, db_path: str, calls: int, period: float, burst: Optional[int] = None):
+        super().__init__(calls, period, burst)
+        self.key = key
+        self.db_path = db_path
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS token_buckets "
+                "(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+        return self._conn
+
+    def _take(self, tokens: float) -> float:
+        conn = self._connect()
+        # BEGIN IMMEDIATE takes the write lock up front, so read-refill-write is atomic across processes
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            now = time.time()
+            row = conn.execute(
+                "SELECT tokens, updated_at FROM token_buckets WHERE key = ?", (self.key,)
+            ).fetchone()
+            available = self.capacity if row is None else min(
+                self.capacity, row[0] + max(0.0, now - row[1]) * self.refill_rate
+            )
+            if available >= tokens:
+                available -= tokens
+                wait = 0.0
+            else:
+                wait = (tokens - available) / self.refill_rate
+            conn.execute(
+                "INSERT OR REPLACE INTO token_buckets (key, tokens, updated_at) VALUES (?, ?, ?)",
+                (self.key, available, now)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return wait
+
+    async def _take_async(self, tokens: float) -> float:
+        return await asyncio.to_thread(self._take, tokens)
+
+class RateLimiter:
+    """Keeps one token bucket per API key"""
+
+    def __init__(self, calls: int, period: float, burst: Optional[int] = None,
+                 backend: str = "memory", db_path: Optional[str] = None):
+        if backend not in ("memory", "sqlite"):
+            raise ValueError(f"Unknown rate limit backend: {backend}")
+        if backend == "sqlite" and not db_path:
+            raise ValueError("The sqlite rate limit backend needs a db_path")
+        self.calls = calls
+        self.period = period
+        self.burst = burst
+        self.backend = backend
+        self.db_path = db_path
+        self._buckets: Dict[str, TokenBucket] = {}
+
+    @classmethod
+    def from_config(cls) -> "RateLimiter":
+        return cls(
+            calls=Config.RATE_LIMIT_CALLS,
+            period=Config.RATE_LIMIT_PERIOD,
+            burst=Config.RATE_LIMIT_BURST,
+            backend=Config.RATE_LIMIT_BACKEND,
+            db_path=Config.RATE_LIMIT_DB
+        )
+
+    def bucket(self, key: str) -> TokenBucket:
+        # Only a digest of the key is kept, so API keys never end up on disk
+        digest = hashlib.sha256(key.encode()).hexdigest()[:16]
+        bucket = self._buckets.get(digest)
+        if bucket is None:
+            if self.backend == "sqlite":
+                os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+                bucket = SQLiteTokenBucket(digest, self.db_path, self.calls, self.period, self.burst)
+            else:
+                bucket = TokenBucket(self.calls, self.period, self.burst)
+            self._buckets[digest] = bucket
+        return bucket
+
+    async def acquire(self, key: str = "default", tokens: float = 1) -> float:
+        """Wait for a token from the bucket for `key`. Returns the time spent waiting"""
+        return await self.bucket(key).acquire(tokens)
@@ -0,0 +1,123 @@
+from typing import Dict, Optional
+import hashlib
+import json
+import sys
+import threading
+from config import Config
+
+# What the UI and the analysis read from a Tavily response
+SLIM_RESPONSE_FIELDS = ('query', 'answer', 'results')
+SLIM_RESULT_FIELDS = ('title', 'url', 'content', 'score')
+# Per-call fields left out of the content address, so identical results dedupe
+VOLATILE_FIELDS = frozenset({'response_time'})
+
+def _intern(value):
+    return sys.intern(value) if type(value) is str else value
+
+def compact_response(response: dict, slim: bool = False) -> dict:
+    """Copy of a search response with its strings interned
+
+    Identical URLs, titles and content across responses then share one
+    string object. In slim mode only the fields the UI and the analysis
+    use are kept.
+    """
+    if slim:
+        compact = {key: _intern(response[key]) for key in SLIM_RESPONSE_FIELDS if key in response and key != 'results'}
+        results = [{key: _intern(result[key]) for key in SLIM_RESULT_FIELDS if key in result}
+                   for result in response.get('results') or ()]
+    else:
+        compact = {key: _intern(value) for key, value in response.items() if key != 'results'}
+        results = [{key: _intern(value) for key, value in result.items()}
+                   for result in response.get('results') or ()]
+    if 'results' in response:
+        compact['results'] = results
+    return compact
+
+def result_id(response: dict) -> str:
+    """Content address of a response"""
+    content = {key: value for key, value in response.items() if key not in VOLATILE_FIELDS}
+    payload = json.dumps(content, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+class ResultStore:
+    """Content-addressed, reference-counted store of search responses
+
+    Tasks hold a result ID rather than their own copy of the response, so
+    tasks with identical results share one stored dict. A response is
+    dropped when the last task referencing it is released.
+    """
+
+    def __init__(self, slim: bool = False):
+        self.slim = slim
+        self._results: Dict[str, dict] = {}
+        self._refs: Dict[str, int] = {}
+        self._keys: Dict[str, str] = {}
+        # id() of each stored dict, so putting the stored object again skips hashing it
+        self._ids: Dict[int, str] = {}
+        self._lock = threading.Lock()
+        self.deduplicated = 0
+
+    @classmethod
+    def from_config(cls) -> "ResultStore":
+        if Config.RESULT_FIELDS not in ("full", "slim"):
+            raise ValueError(f"Unknown result fields mode: {Config.RESULT_FIELDS}")
+        return cls(slim=Config.RESULT_FIELDS == "slim")
+
+    def compact(self, response: dict) -> dict:
+        return compact_response(response, self.slim)
+
+    def put(self, response: dict, compact: bool = True) -> str:
+        """Store a response, or take another reference to an identical one, and return its ID
+
+        Pass compact=False for a response that already went through compact().
+        A response that is the stored object itself, as handed back by the
+        in-memory cache, is neither compacted nor hashed again.
+        """
+        with self._lock:
+            key = self._ids.get(id(response))
+            if key is not None and self._results.get(key) is response:
+                self.deduplicated += 1
+                self._refs[key] += 1
+                return key
+        if compact:
+            response = self.compact(response)
+        key = result_id(response)
+        with self._lock:
+            if key in self._results:
+                self.deduplicated += 1
+                # Hand out the stored key so tasks share one ID string too
+                key = self._keys[key]
+            else:
+                self._results[key] = response
+                self._keys[key] = key
+                self._ids[id(response)] = key
+            self._refs[key] = self._refs.get(key, 0) + 1
+        return key
+
+    def get(self, key: Optional[str]) -> Optional[dict]:
+        return self._results.get(key) if key else None
+
+    def release(self, key: Optional[str]) -> None:
+        """Drop one reference; the response is removed with its last reference"""
+        if not key:
+            return
+        with self._lock:
+            refs = self._refs.get(key, 0) - 1
+            if refs > 0:
+                self._refs[key] = refs
+            else:
+                self._refs.pop(key, None)
+                response = self._results.pop(key, None)
+                if response is not None:
+                    self._ids.pop(id(response), None)
+                self._keys.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._results)
+
+    def stats(self) -> dict:
+        return {
+            'entries': len(self._results),
+            'references': sum(self._refs.values()),
+            'deduplicated': self.deduplicated
+        }
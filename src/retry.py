@@ -0,0 +1,139 @@
+from typing import Optional
+import asyncio
+import random
+import time
+import aiohttp
+import requests
+from config import Config
+
+# HTTP statuses worth retrying: timeouts, rate limiting and server-side failures
+TRANSIENT_STATUSES = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+def error_status(error: BaseException) -> Optional[int]:
+    """HTTP status carried by an aiohttp or requests error, if any"""
+    if isinstance(error, aiohttp.ClientResponseError):
+        return error.status
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return error.response.status_code
+    return getattr(error, 'status', None)
+
+def is_transient(error: BaseException) -> bool:
+    """Whether an upstream error is worth retrying
+
+    Timeouts, dropped connections, 429 and 5xx responses are transient. Other
+    4xx responses (bad key, bad request) and malformed responses are not.
+    """
+    status = error_status(error)
+    if status is not None:
+        return status in TRANSIENT_STATUSES
+    return isinstance(error, (
+        asyncio.TimeoutError,
+        TimeoutError,
+        ConnectionError,
+        aiohttp.ClientConnectionError,
+        aiohttp.ServerTimeoutError,
+        requests.ConnectionError,
+        requests.Timeout
+    ))
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """Seconds the upstream asked us to wait, from a Retry-After header"""
+    headers = getattr(error, 'headers', None)
+    if headers is None and isinstance(error, requests.HTTPError) and error.response is not None:
+        headers = error.response.headers
+    try:
+        return float(headers.get('Retry-After')) if headers else None
+    except (TypeError, ValueError):
+        return None
+
+class RetryPolicy:
+    """Exponential backoff with full jitter"""
+
+    def __init__(self, max_retries: int = Config.MAX_RETRIES, base_delay: float = Config.RETRY_BASE_DELAY,
+                 max_delay: float = Config.RETRY_MAX_DELAY):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt: int, error: Optional[BaseException] = None) -> float:
+        """Seconds to wait before retry number `attempt` (0-based)"""
+        # Full jitter spreads retries from many callers out instead of having them retry in lockstep
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        if error is not None:
+            requested = retry_after(error)
+            if requested is not None:
+                delay = max(delay, min(requested, self.max_delay))
+        return delay
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose circuit is open"""
+    pass
+
+class CircuitBreaker:
+    """Per-upstream circuit breaker
+
+    After `failure_threshold` consecutive transient failures the circuit opens
+    and calls fail immediately for `recovery_timeout` seconds. After that one
+    trial call is let through (half-open). If it succeeds the circuit closes;
+    if it fails the circuit opens again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = Config.CIRCUIT_FAILURE_THRESHOLD,
+                 recovery_timeout: float = Config.CIRCUIT_RECOVERY_TIMEOUT):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self.rejected = 0
+        self.times_opened = 0
+        self._trial_in_flight = False
+
+    def before_call(self) -> None:
+        """Raise CircuitOpenError if the call should not go upstream"""
+        if self.state == self.OPEN:
+            if time.monotonic() - self.opened_at < self.recovery_timeout:
+                self.rejected += 1
+                raise CircuitOpenError(f"Circuit for {self.name} is open")
+            self.state = self.HALF_OPEN
+        if self.state == self.HALF_OPEN:
+            if self._trial_in_flight:
+                self.rejected += 1
+                raise CircuitOpenError(f"Circuit for {self.name} is half-open")
+            self._trial_in_flight = True
+
+    def record_success(self) -> None:
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self._trial_in_flight = False
+        self.consecutive_failures += 1
+        if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.times_opened += 1
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+    def release(self) -> None:
+        """End a call that neither succeeded nor failed in a way that says anything about the upstream"""
+        self._trial_in_flight = False
+
+    def stats(self) -> dict:
+        retry_in = None
+        if self.state == self.OPEN:
+            retry_in = max(0.0, self.recovery_timeout - (time.monotonic() - self.opened_at))
+        return {
+            'name': self.name,
+            'state': self.state,
+            'consecutive_failures': self.consecutive_failures,
+            'times_opened': self.times_opened,
+            'rejected': self.rejected,
+            'retry_in': retry_in
+        }
@@ -1,13 +1,15 @@
 import os
-from app import app
+from app import app, agent, close_streams, startup, shutdown
+from asgi import EventStreamMiddleware
 from config import Config
 from hypercorn.config import Config as HyperConfig
 from hypercorn.asyncio import serve
 import asyncio
 import logging
+import signal
 
 # Configure logging
-logging.basicConfig(level=logging.INFO)
+logging.basicConfig(level=Config.LOG_LEVEL)
 logger = logging.getLogger(__name__)
 
 async def main():
@@ -16,8 +18,25 @@ async def main():
     config.use_reloader = Config.DEBUG
     config.insecure_bind = True
     
-    logger.info(f"Server starting on http://localhost:{Config.PORT}")
-    await serve(app, config)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    async def shutdown_trigger():
+        # On SIGINT/SIGTERM, end event streams so in-flight requests can finish
+        await stop.wait()
+        close_streams()
+
+    startup()
+    try:
+        logger.info(f"Server starting on http://localhost:{Config.PORT}")
+        # Event streams are served on this loop; everything else goes to Flask
+        server = EventStreamMiddleware(app, agent.events, max_body_size=config.wsgi_max_body_size)
+        await serve(server, config, shutdown_trigger=shutdown_trigger, mode="asgi")
+    finally:
+        # Shutdown blocks while jobs drain, so keep it off the server's loop
+        await asyncio.get_running_loop().run_in_executor(None, shutdown)
 
 if __name__ == "__main__":
     try:
@@ -0,0 +1,65 @@
+from typing import TYPE_CHECKING, Callable, List, Optional, Set, Tuple
+from datetime import datetime
+import heapq
+
+if TYPE_CHECKING:
+    from agent import ResearchTask
+
+class DeadlineScheduler:
+    """Hands out the tasks of a batch by deadline slack as well as importance
+
+    A task's slack is the time left before its deadline minus the time it
+    is expected to take. Tasks whose slack has dropped below `urgent_slack`
+    go first, earliest deadline first; all other tasks go in queue order
+    (highest importance, then oldest). Tasks without a deadline are never
+    urgent.
+
+    Urgency is checked each time a worker asks for its next task, so a
+    deadline task waits behind more important work only while it can
+    afford to. Both orders are kept in heaps, so each pick is O(log n).
+    """
+
+    def __init__(self, tasks: List["ResearchTask"], expected_seconds: Callable[["ResearchTask"], float],
+                 urgent_slack: float = 5.0):
+        self.expected_seconds = expected_seconds
+        self.urgent_slack = urgent_slack
+        self._by_priority: List[Tuple[int, datetime, int]] = []
+        self._by_deadline: List[Tuple[datetime, int]] = []
+        self._tasks = tasks
+        self._taken: Set[int] = set()
+        for index, task in enumerate(tasks):
+            self._by_priority.append((-task.importance, task.created_at, index))
+            if task.deadline is not None:
+                self._by_deadline.append((task.deadline, index))
+        heapq.heapify(self._by_priority)
+        heapq.heapify(self._by_deadline)
+
+    def __len__(self) -> int:
+        return len(self._tasks) - len(self._taken)
+
+    def slack(self, task: "ResearchTask", now: Optional[datetime] = None) -> Optional[float]:
+        """Seconds a task can still wait, or None if it has no deadline"""
+        if task.deadline is None:
+            return None
+        now = now or datetime.now()
+        return (task.deadline - now).total_seconds() - self.expected_seconds(task)
+
+    def next(self) -> Optional[Tuple[int, "ResearchTask"]]:
+        """Take the next task to run, as (index in the batch, task), or None when all are taken"""
+        by_deadline, by_priority = self._by_deadline, self._by_priority
+        while by_deadline and by_deadline[0][1] in self._taken:
+            heapq.heappop(by_deadline)
+        if by_deadline:
+            index = by_deadline[0][1]
+            if self.slack(self._tasks[index]) < self.urgent_slack:
+                heapq.heappop(by_deadline)
+                return self._take(index)
+        while by_priority:
+            index = heapq.heappop(by_priority)[2]
+            if index not in self._taken:
+                return self._take(index)
+        return None
+
+    def _take(self, index: int) -> Tuple[int, "ResearchTask"]:
+        self._taken.add(index)
+        return index, self._tasks[index]
@@ -0,0 +1,80 @@
+from typing import List, Optional
+import asyncio
+import aiohttp
+from config import Config
+
+class AsyncTavilyClient:
+    """Async Tavily search client on one shared, keep-alive aiohttp session
+
+    Takes the same arguments as TavilyClient.search and returns the same
+    response dict. The session is created lazily on the running loop and
+    replaced if the client is later used from a different loop.
+    """
+
+    def __init__(self, api_key: str, base_url: str = Config.TAVILY_BASE_URL,
+                 max_connections: int = Config.HTTP_MAX_CONNECTIONS,
+                 max_connections_per_host: int = Config.HTTP_MAX_CONNECTIONS_PER_HOST,
+                 timeout: float = Config.HTTP_TIMEOUT,
+                 keepalive_timeout: float = Config.HTTP_KEEPALIVE_TIMEOUT):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.max_connections = max_connections
+        self.max_connections_per_host = max_connections_per_host
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.keepalive_timeout = keepalive_timeout
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_loop = None
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        if self._session is not None and not self._session.closed and self._session_loop is loop:
+            return self._session
+        if self._session is not None:
+            await self._session.close()
+        connector = aiohttp.TCPConnector(
+            limit=self.max_connections,
+            limit_per_host=self.max_connections_per_host,
+            keepalive_timeout=self.keepalive_timeout,
+            ttl_dns_cache=300
+        )
+        self._session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=self.timeout,
+            headers={"Content-Type": "application/json"}
+        )
+        self._session_loop = loop
+        return self._session
+
+    async def search(self, query: str, search_depth: str = "basic", topic: str = "general", days: int = 2,
+                     max_results: int = 5, include_domains: Optional[List[str]] = None,
+                     exclude_domains: Optional[List[str]] = None, include_answer: bool = False,
+                     include_raw_content: bool = False, include_images: bool = False,
+                     use_cache: bool = True) -> dict:
+        """Search Tavily. Raises aiohttp.ClientResponseError on a non-200 response"""
+        data = {
+            "query": query,
+            "search_depth": search_depth,
+            "topic": topic,
+            "days": days,
+            "include_answer": include_answer,
+            "include_raw_content": include_raw_content,
+            "max_results": max_results,
+            "include_domains": include_domains or None,
+            "exclude_domains": exclude_domains or None,
+            "include_images": include_images,
+            "api_key": self.api_key,
+            "use_cache": use_cache,
+        }
+        session = await self._get_session()
+        async with session.post(self.base_url, json=data) as response:
+            response.raise_for_status()
+            return await response.json(content_type=None)
+
+    async def open(self) -> None:
+        """Create the session on the running loop ahead of the first search"""
+        await self._get_session()
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
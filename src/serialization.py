@@ -0,0 +1,90 @@
+from typing import Any, List, Optional
+import gzip
+import json
+from flask import Response, request
+from flask.json.provider import DefaultJSONProvider
+from config import Config
+
+# Optional fast paths; the standard library is used when they are missing
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Response types worth compressing; NDJSON and SSE streams are left alone
+COMPRESSIBLE_TYPES = frozenset({'application/json', 'text/html', 'text/plain', 'text/css', 'application/javascript'})
+
+def _encoder() -> str:
+    if Config.JSON_ENCODER not in ("auto", "orjson", "json"):
+        raise ValueError(f"Unknown JSON encoder: {Config.JSON_ENCODER}")
+    if Config.JSON_ENCODER == "orjson" and orjson is None:
+        raise ValueError("JSON_ENCODER is orjson but orjson is not installed")
+    return "orjson" if Config.JSON_ENCODER != "json" and orjson is not None else "json"
+
+ENCODER = _encoder()
+
+def dumps(obj: Any) -> bytes:
+    """Compact UTF-8 JSON, with orjson when it is available"""
+    if ENCODER == "orjson":
+        return orjson.dumps(obj, default=str, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False, default=str).encode()
+
+def dumps_with_raw(envelope: dict, key: str, raw: bytes) -> bytes:
+    """Encode an envelope dict whose `key` holds an already encoded JSON value
+
+    The raw value goes last and is spliced in without being decoded and
+    encoded again.
+    """
+    head = dumps({**{k: v for k, v in envelope.items() if k != key}, key: 0})
+    # Both encoders keep insertion order, so the body ends with "key":0}
+    return head[:-2] + raw + b'}'
+
+def dumps_with_items(envelope: dict, key: str, items: List[bytes]) -> bytes:
+    """Encode an envelope dict whose `key` is a list of already encoded items"""
+    return dumps_with_raw(envelope, key, b'[' + b','.join(items) + b']')
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider that encodes with dumps(), so jsonify gets the fast path too"""
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return dumps(obj).decode()
+
+    def loads(self, s, **kwargs: Any) -> Any:
+        if ENCODER == "orjson":
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+    def response(self, *args: Any, **kwargs: Any) -> Response:
+        # Always compact, and skip the str round trip
+        return self._app.response_class(dumps(self._prepare_response_obj(args, kwargs)), mimetype=self.mimetype)
+
+def compress_response(response: Response, min_bytes: int = Config.COMPRESS_MIN_BYTES,
+                      level: int = Config.COMPRESS_LEVEL) -> Response:
+    """Compress a buffered response with brotli or gzip, as the client accepts, once it is large enough"""
+    response.vary.add('Accept-Encoding')
+    if (response.is_streamed or response.direct_passthrough or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_TYPES or not 200 <= response.status_code < 300):
+        return response
+    if (response.content_length or 0) < min_bytes:
+        return response
+    encoding = _negotiate()
+    if encoding is None:
+        return response
+    data = response.get_data()
+    if encoding == 'br':
+        # Brotli quality runs 0-11, gzip levels 1-9; scale so one setting works for both
+        data = brotli.compress(data, quality=min(11, round(level * 11 / 9)))
+    else:
+        data = gzip.compress(data, compresslevel=level, mtime=0)
+    response.set_data(data)
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+def _negotiate() -> Optional[str]:
+    offered = ['br', 'gzip'] if brotli is not None else ['gzip']
+    return request.accept_encodings.best_match(offered)
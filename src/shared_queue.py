@@ -0,0 +1,270 @@
+from typing import TYPE_CHECKING, List, Optional
+from collections import OrderedDict
+from datetime import datetime
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+if TYPE_CHECKING:
+    from events import EventBus
+
+logger = logging.getLogger(__name__)
+
+class SharedTaskQueue:
+    """Task queue and result store in SQLite, shared by the web process and worker processes
+
+    Workers claim tasks atomically with a lease. A worker that dies stops
+    renewing its leases, and its tasks become claimable again once the leases
+    expire. Tasks are ordered like the in-memory TaskQueue:
+    (-importance, created_at, seq).
+    """
+
+    def __init__(self, db_path: str, max_attempts: int = 3):
+        self.db_path = db_path
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._conn = sqlite3.connect(db_path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS shared_tasks ("
+            "seq INTEGER PRIMARY KEY AUTOINCREMENT, task_id TEXT UNIQUE NOT NULL, "
+            "query TEXT NOT NULL, category TEXT NOT NULL, importance INTEGER NOT NULL, "
+            "neg_importance INTEGER NOT NULL, created_at TEXT NOT NULL, status TEXT NOT NULL, "
+            "error TEXT, lease_owner TEXT, lease_expires REAL, attempts INTEGER NOT NULL DEFAULT 0, "
+            "result TEXT, updated_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS shared_tasks_claim "
+            "ON shared_tasks (status, neg_importance, created_at, seq)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS shared_tasks_updated ON shared_tasks (updated_at)")
+
+    def _transaction(self, fn):
+        """Run fn(conn) inside BEGIN IMMEDIATE, which takes the write lock up front"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn(self._conn)
+                self._conn.execute("COMMIT")
+                return result
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def enqueue(self, items: List[tuple]) -> List[str]:
+        """Add (query, category, importance) tuples in one transaction and return their IDs"""
+        now = time.time()
+        created_at = datetime.now().isoformat()
+        rows = [(uuid.uuid4().hex, query, category, importance, -importance, created_at, now)
+                for query, category, importance in items]
+        self._transaction(lambda conn: conn.executemany(
+            "INSERT INTO shared_tasks (task_id, query, category, importance, neg_importance, "
+            "created_at, status, updated_at) VALUES (?, ?, ?, ?, ?, ?, 'pending', ?)", rows
+        ))
+        return [row[0] for row in rows]
+
+    def claim(self, worker_id: str, limit: int, lease_seconds: float) -> List[dict]:
+        """Atomically lease up to `limit` tasks: pending ones, or processing ones whose lease has expired"""
+        def claim_rows(conn):
+            now = time.time()
+            # Tasks whose lease ran out too many times are given up on
+            conn.execute(
+                "UPDATE shared_tasks SET status = 'failed', error = 'Lease expired too many times', "
+                "lease_owner = NULL, updated_at = ? "
+                "WHERE status = 'processing' AND lease_expires < ? AND attempts >= ?",
+                (now, now, self.max_attempts)
+            )
+            rows = conn.execute(
+                "SELECT task_id, query, category, importance, created_at FROM shared_tasks "
+                "WHERE status = 'pending' OR (status = 'processing' AND lease_expires < ?) "
+                "ORDER BY neg_importance, created_at, seq LIMIT ?", (now, limit)
+            ).fetchall()
+            conn.executemany(
+                "UPDATE shared_tasks SET status = 'processing', lease_owner = ?, lease_expires = ?, "
+                "attempts = attempts + 1, updated_at = ? WHERE task_id = ?",
+                [(worker_id, now + lease_seconds, now, row[0]) for row in rows]
+            )
+            return rows
+        return [{
+            'task_id': task_id,
+            'query': query,
+            'category': category,
+            'importance': importance,
+            'created_at': datetime.fromisoformat(created_at)
+        } for task_id, query, category, importance, created_at in self._transaction(claim_rows)]
+
+    def renew(self, worker_id: str, task_ids: List[str], lease_seconds: float) -> None:
+        now = time.time()
+        self._transaction(lambda conn: conn.executemany(
+            "UPDATE shared_tasks SET lease_expires = ?, updated_at = ? "
+            "WHERE task_id = ? AND lease_owner = ? AND status = 'processing'",
+            [(now + lease_seconds, now, task_id, worker_id) for task_id in task_ids]
+        ))
+
+    def finish(self, worker_id: str, task_id: str, status: str,
+               result: Optional[dict] = None, error: Optional[str] = None) -> bool:
+        """Record a task's outcome. Returns False if the worker no longer holds the lease"""
+        now = time.time()
+        payload = json.dumps(result) if result is not None else None
+        cursor = self._transaction(lambda conn: conn.execute(
+            "UPDATE shared_tasks SET status = ?, result = ?, error = ?, lease_owner = NULL, "
+            "lease_expires = NULL, updated_at = ? WHERE task_id = ? AND lease_owner = ?",
+            (status, payload, error, now, task_id, worker_id)
+        ))
+        return cursor.rowcount == 1
+
+    def cancel(self, task_id: str) -> bool:
+        now = time.time()
+        cursor = self._transaction(lambda conn: conn.execute(
+            "UPDATE shared_tasks SET status = 'cancelled', updated_at = ? "
+            "WHERE task_id = ? AND status = 'pending'", (now, task_id)
+        ))
+        return cursor.rowcount == 1
+
+    @staticmethod
+    def _row_to_dict(row, summary: bool) -> dict:
+        task_id, query, category, importance, created_at, status, error, result = row[:8]
+        data = {
+            'task_id': task_id,
+            'query': query,
+            'category': category,
+            'importance': importance,
+            'created_at': created_at,
+            'status': status,
+            'error': error
+        }
+        if not summary:
+            result = json.loads(result) if result else {}
+            details = result.get('result', {})
+            data['research_results'] = details.get('research_results')
+            data['reasoning_analysis'] = details.get('reasoning_analysis')
+        return data
+
+    def get(self, task_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT task_id, query, category, importance, created_at, status, error, result "
+                "FROM shared_tasks WHERE task_id = ?", (task_id,)
+            ).fetchone()
+        return self._row_to_dict(row, summary=False) if row else None
+
+    def status(self, limit: Optional[int] = None, after: Optional[str] = None,
+               summary: bool = False, include_finished: bool = False) -> List[dict]:
+        """Tasks in priority order; the cursor is the task_id of the last task on the previous page"""
+        where = "" if include_finished else "WHERE status IN ('pending', 'processing')"
+        params: list = []
+        if after:
+            where += (" AND " if where else "WHERE ") + (
+                "(neg_importance, created_at, seq) > "
+                "(SELECT neg_importance, created_at, seq FROM shared_tasks WHERE task_id = ?)"
+            )
+            params.append(after)
+        sql = ("SELECT task_id, query, category, importance, created_at, status, error, "
+               f"{'NULL' if summary else 'result'} FROM shared_tasks {where} "
+               "ORDER BY neg_importance, created_at, seq")
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [self._row_to_dict(row, summary) for row in rows]
+
+    def counts(self) -> dict:
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM shared_tasks GROUP BY status").fetchall()
+        return dict(rows)
+
+    def changes(self, since: float) -> List[tuple]:
+        """(task_id, query, category, importance, status, error, updated_at) of tasks changed after `since`"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT task_id, query, category, importance, status, error, updated_at FROM shared_tasks "
+                "WHERE updated_at > ? ORDER BY updated_at", (since,)
+            ).fetchall()
+
+    def version(self) -> str:
+        """Changes whenever any task changes, for ETags"""
+        with self._lock:
+            seq, updated = self._conn.execute("SELECT MAX(seq), MAX(updated_at) FROM shared_tasks").fetchone()
+        return f"{seq or 0}-{updated or 0}"
+
+class SharedEventRelay:
+    """Publishes task events for changes other processes make to the shared queue
+
+    Workers run in their own processes, so their progress never reaches
+    the web process's EventBus directly. The relay polls the queue's
+    version and, when it moves, publishes one event per task status change
+    since the last poll. Rows are read back with some overlap, since a
+    writer stamps updated_at before it commits; statuses already published
+    are skipped, which also ignores lease renewals.
+    """
+
+    def __init__(self, shared: SharedTaskQueue, bus: "EventBus", interval: float = 1.0,
+                 overlap: float = 5.0, max_tracked: int = 10000):
+        self.shared = shared
+        self.bus = bus
+        self.interval = interval
+        self.overlap = overlap
+        self.max_tracked = max_tracked
+        # Only changes from now on; clients load the current state from /api/queue-status
+        self._since = time.time()
+        self._version: Optional[str] = None
+        self._statuses: "OrderedDict[str, str]" = OrderedDict()
+        self._task: Optional[asyncio.Task] = None
+
+    def poll(self) -> int:
+        """Publish events for changes since the last poll; returns how many were published"""
+        version = self.shared.version()
+        if version == self._version:
+            return 0
+        self._version = version
+        published = 0
+        for task_id, query, category, importance, status, error, updated_at in self.shared.changes(self._since - self.overlap):
+            self._since = max(self._since, updated_at)
+            if self._statuses.get(task_id) == status:
+                continue
+            self._statuses[task_id] = status
+            self._statuses.move_to_end(task_id)
+            data = {
+                'task_id': task_id,
+                'query': query,
+                'category': category,
+                'importance': importance,
+                'status': status
+            }
+            if error:
+                data['error'] = error
+            event_type = {'pending': 'task_added', 'processing': 'task_started'}.get(status, f'task_{status}')
+            self.bus.publish(event_type, data)
+            published += 1
+        while len(self._statuses) > self.max_tracked:
+            self._statuses.popitem(last=False)
+        return published
+
+    async def start(self) -> None:
+        """Start polling on the running loop"""
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.to_thread(self.poll)
+            except sqlite3.Error as e:
+                logger.warning("Failed to read shared queue changes: %s", e)
+            await asyncio.sleep(self.interval)
@@ -0,0 +1,168 @@
+from typing import Dict, FrozenSet, List, NamedTuple, Optional, Set, Tuple
+from collections import OrderedDict
+from functools import lru_cache
+import hashlib
+import random
+import re
+from analysis import STOP_WORDS
+from config import Config
+
+# Words that change how a question is phrased but not what it asks for
+QUESTION_WORDS = frozenset({
+    'what', 'whats', 'which', 'who', 'how', 'why', 'when', 'where', 'is', 'are', 'was', 'were',
+    'do', 'does', 'did', 'can', 'could', 'should', 'would', 'will', 'me', 'tell', 'about',
+    'some', 'any', 'there', 'i', 'you', 'we', 'my', 'your', 'our', 'please', 'explain'
+})
+
+# Unicode letters and digits, so queries in other scripts still have tokens
+_WORD = re.compile(r"[^\W_]+")
+_MERSENNE_PRIME = (1 << 61) - 1
+
+def _stem(word: str) -> str:
+    """Crude plural folding, so "developments" and "development" match"""
+    if len(word) > 4 and word.endswith('ies'):
+        return word[:-3] + 'y'
+    if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+        return word[:-1]
+    return word
+
+def content_words(text: str, ignore: FrozenSet[str] = STOP_WORDS) -> List[str]:
+    """Lowercased, plural-folded words of a text, in order, without the ignored words"""
+    return [_stem(word) for word in _WORD.findall(text.lower()) if word not in ignore]
+
+def query_tokens(query: str, ignore: FrozenSet[str] = STOP_WORDS | QUESTION_WORDS) -> FrozenSet[str]:
+    """Normalized content words of a query, ignoring order, case, punctuation and question phrasing"""
+    tokens = frozenset(content_words(query, ignore))
+    # A query made only of ignored words still needs something to compare
+    return tokens or frozenset(_WORD.findall(query.lower()))
+
+def jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+@lru_cache(maxsize=100000)
+def _token_hash(token: str) -> int:
+    return int.from_bytes(hashlib.blake2b(token.encode(), digest_size=8).digest(), 'big')
+
+class MinHasher:
+    """MinHash signatures over token sets, with fixed seeded permutations"""
+
+    def __init__(self, num_perm: int = 64, seed: int = 1):
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        self._perms = [(rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME))
+                       for _ in range(num_perm)]
+
+    def signature(self, tokens: FrozenSet[str]) -> Tuple[int, ...]:
+        """MinHash signature of a non-empty token set"""
+        hashes = [_token_hash(token) for token in tokens]
+        return tuple(min((a * h + b) % _MERSENNE_PRIME for h in hashes) for a, b in self._perms)
+
+class SimilarMatch(NamedTuple):
+    cache_key: str
+    query: str
+    similarity: float
+
+class SimilarityIndex:
+    """Finds earlier queries that are near-duplicates of a new one
+
+    Each query is reduced to a token set and a MinHash signature. The
+    signature is split into bands and every band is hashed into an LSH
+    bucket, so a lookup only compares the query against entries that share
+    at least one bucket. Candidates are then checked with exact Jaccard
+    similarity on their token sets. Entries are kept per namespace (search
+    depth), and each one points at an exact key in the results cache.
+    """
+
+    def __init__(self, threshold: float = 0.8, max_entries: int = 10000, num_perm: int = 64, bands: int = 16):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.hasher = MinHasher(num_perm)
+        # cache_key -> (namespace, query, tokens, band keys)
+        self._entries: "OrderedDict[str, Tuple[str, str, FrozenSet[str], List[tuple]]]" = OrderedDict()
+        self._buckets: Dict[tuple, Set[str]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_config(cls) -> Optional["SimilarityIndex"]:
+        """An index with the configured threshold, or None if the similarity cache is off"""
+        if not Config.SIMILARITY_CACHE:
+            return None
+        if not 0 < Config.SIMILARITY_THRESHOLD <= 1:
+            raise ValueError(f"Similarity threshold must be in (0, 1]: {Config.SIMILARITY_THRESHOLD}")
+        return cls(Config.SIMILARITY_THRESHOLD, Config.SIMILARITY_MAX_ENTRIES)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _band_keys(self, namespace: str, tokens: FrozenSet[str]) -> List[tuple]:
+        signature = self.hasher.signature(tokens)
+        rows = self.rows
+        return [(namespace, band, signature[band * rows:(band + 1) * rows]) for band in range(self.bands)]
+
+    def add(self, namespace: str, query: str, cache_key: str) -> None:
+        """Index a query whose results are stored under cache_key"""
+        if cache_key in self._entries:
+            self._entries.move_to_end(cache_key)
+            return
+        tokens = query_tokens(query)
+        if not tokens:
+            # Nothing to compare, e.g. a query made only of punctuation
+            return
+        band_keys = self._band_keys(namespace, tokens)
+        self._entries[cache_key] = (namespace, query, tokens, band_keys)
+        for band_key in band_keys:
+            self._buckets.setdefault(band_key, set()).add(cache_key)
+        while len(self._entries) > self.max_entries:
+            self.remove(next(iter(self._entries)))
+
+    def remove(self, cache_key: str) -> None:
+        entry = self._entries.pop(cache_key, None)
+        if entry is None:
+            return
+        for band_key in entry[3]:
+            bucket = self._buckets.get(band_key)
+            if bucket is not None:
+                bucket.discard(cache_key)
+                if not bucket:
+                    del self._buckets[band_key]
+
+    def lookup(self, namespace: str, query: str, exclude: Optional[str] = None) -> Optional[SimilarMatch]:
+        """The most similar indexed query at or above the threshold, if any"""
+        tokens = query_tokens(query)
+        if not tokens:
+            self.misses += 1
+            return None
+        candidates: Set[str] = set()
+        for band_key in self._band_keys(namespace, tokens):
+            bucket = self._buckets.get(band_key)
+            if bucket:
+                candidates.update(bucket)
+        candidates.discard(exclude)
+
+        best = None
+        for cache_key in candidates:
+            _, indexed_query, indexed_tokens, _ = self._entries[cache_key]
+            similarity = jaccard(tokens, indexed_tokens)
+            if similarity >= self.threshold and (best is None or similarity > best.similarity):
+                best = SimilarMatch(cache_key, indexed_query, similarity)
+        if best is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._entries.move_to_end(best.cache_key)
+        return best
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'entries': len(self._entries),
+            'buckets': len(self._buckets),
+            'hits': self.hits,
+            'misses': self.misses
+        }
@@ -0,0 +1,171 @@
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Set, Tuple
+from datetime import datetime
+import heapq
+import itertools
+import threading
+
+if TYPE_CHECKING:
+    from agent import ResearchTask
+
+class TaskQueue:
+    """Heap-backed priority queue of research tasks with an ID index
+
+    Pending tasks are ordered by (-importance, created_at, seq). Every task
+    stays in the index until it is removed, so tasks that are processing or
+    finished can still be looked up by ID. Cancelled tasks are dropped from
+    the index immediately and skipped lazily when they reach the top of the heap.
+
+    Mutations take a lock, so HTTP handler threads can add tasks while the
+    background event loop pops them. `version` is bumped on every change so
+    readers can tell cheaply whether anything moved.
+    """
+
+    def __init__(self):
+        self._heap: List[Tuple[int, datetime, int, str]] = []
+        self._tasks: Dict[str, "ResearchTask"] = {}
+        self._order: Dict[str, Tuple[int, datetime, int]] = {}
+        self._queued: Set[str] = set()
+        self._seq = itertools.count()
+        self._lock = threading.RLock()
+        self.version = 0
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    def __contains__(self, task_id: str) -> bool:
+        return task_id in self._tasks
+
+    def __iter__(self) -> Iterator["ResearchTask"]:
+        """Iterate over all tasks in priority order"""
+        return iter(self.page())
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._queued)
+
+    def touch(self) -> None:
+        """Record a change to a task that the queue itself cannot see, such as a status update"""
+        with self._lock:
+            self.version += 1
+
+    def cursor(self, task_id: str) -> Optional[str]:
+        """Return an opaque cursor that pages past the given task"""
+        key = self._order.get(task_id)
+        if key is None:
+            return None
+        importance, created_at, seq = key
+        return f"{importance}_{created_at.isoformat()}_{seq}"
+
+    @staticmethod
+    def _parse_cursor(cursor: str) -> Tuple[int, datetime, int]:
+        try:
+            importance, created_at, seq = cursor.split("_")
+            return int(importance), datetime.fromisoformat(created_at), int(seq)
+        except ValueError:
+            raise ValueError(f"Invalid cursor: {cursor}")
+
+    def push(self, task: "ResearchTask") -> str:
+        """Add a task in O(log n) and return its ID"""
+        with self._lock:
+            key = (-task.importance, task.created_at, next(self._seq))
+            self._order[task.task_id] = key
+            self._tasks[task.task_id] = task
+            heapq.heappush(self._heap, key + (task.task_id,))
+            self._queued.add(task.task_id)
+            self.version += 1
+            return task.task_id
+
+    def push_many(self, tasks: List["ResearchTask"]) -> List[str]:
+        """Add many tasks at once
+
+        Large batches are appended and re-heapified once in O(n); small batches
+        into a big heap are pushed one by one in O(k log n), whichever is cheaper.
+        """
+        with self._lock:
+            entries = []
+            for task in tasks:
+                key = (-task.importance, task.created_at, next(self._seq))
+                self._order[task.task_id] = key
+                self._tasks[task.task_id] = task
+                self._queued.add(task.task_id)
+                entries.append(key + (task.task_id,))
+            if len(entries) * max(1, len(self._heap)).bit_length() < len(self._heap) + len(entries):
+                for entry in entries:
+                    heapq.heappush(self._heap, entry)
+            else:
+                self._heap.extend(entries)
+                heapq.heapify(self._heap)
+            self.version += 1
+            return [task.task_id for task in tasks]
+
+    def pop(self) -> Optional["ResearchTask"]:
+        """Pop the highest priority pending task in O(log n), or None if there is none"""
+        with self._lock:
+            while self._heap:
+                *_, task_id = heapq.heappop(self._heap)
+                if task_id in self._queued:
+                    self._queued.discard(task_id)
+                    self.version += 1
+                    return self._tasks[task_id]
+            return None
+
+    def pop_all(self) -> List["ResearchTask"]:
+        """Pop every pending task in priority order"""
+        tasks = []
+        with self._lock:
+            while True:
+                task = self.pop()
+                if task is None:
+                    return tasks
+                tasks.append(task)
+
+    def claim(self, task_ids: List[str]) -> List["ResearchTask"]:
+        """Take specific tasks off the queue, returning those still pending in priority order"""
+        with self._lock:
+            claimed = [task_id for task_id in task_ids if task_id in self._queued]
+            for task_id in claimed:
+                self._queued.discard(task_id)
+            if claimed:
+                self.version += 1
+            claimed.sort(key=self._order.__getitem__)
+            return [self._tasks[task_id] for task_id in claimed]
+
+    def get(self, task_id: str) -> Optional["ResearchTask"]:
+        return self._tasks.get(task_id)
+
+    def remove(self, task_id: str) -> Optional["ResearchTask"]:
+        """Drop a task from the index in O(1); its heap entry, if any, is skipped lazily"""
+        with self._lock:
+            task = self._tasks.pop(task_id, None)
+            self._order.pop(task_id, None)
+            self._queued.discard(task_id)
+            if task is not None:
+                self.version += 1
+            return task
+
+    def cancel(self, task_id: str) -> bool:
+        """Cancel a task that has not been popped yet. Returns False if it is unknown or already running"""
+        with self._lock:
+            if task_id not in self._queued:
+                return False
+            task = self.remove(task_id)
+            task.status = "cancelled"
+            return True
+
+    def page(self, offset: int = 0, limit: Optional[int] = None,
+             after: Optional[str] = None) -> List["ResearchTask"]:
+        """Return a slice of the tasks in priority order, optionally starting after a cursor
+
+        Uses a partial sort over the index, so a page costs O(n log k) rather
+        than copying and sorting every task. Cursors stay stable while tasks
+        are added or removed; offsets do not.
+        """
+        start = self._parse_cursor(after) if after else None
+        with self._lock:
+            order = self._order
+            ids = order if start is None else [task_id for task_id, key in order.items() if key > start]
+            if limit is None:
+                ids = sorted(ids, key=order.__getitem__)
+            else:
+                ids = heapq.nsmallest(offset + limit, ids, key=order.__getitem__)
+            return [self._tasks[task_id] for task_id in ids[offset:]]
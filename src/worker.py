@@ -0,0 +1,125 @@
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import time
+from typing import Set
+from dotenv import load_dotenv
+from agent import WorkflowAgent, ResearchTask
+from config import Config
+from shared_queue import SharedTaskQueue
+
+# Configure logging
+logging.basicConfig(level=Config.LOG_LEVEL)
+logger = logging.getLogger(__name__)
+
+async def run_worker(worker_id: str, stop: asyncio.Event) -> None:
+    """Claim tasks from the shared queue and process them until stopped
+
+    Keeps up to max_workers tasks running, claiming another as soon as a
+    slot frees up, so one slow task does not leave the other slots idle.
+    """
+    api_key = os.getenv("TAVILY_API_KEY")
+    if not api_key:
+        raise ValueError("TAVILY_API_KEY environment variable is not set")
+
+    shared = SharedTaskQueue(Config.SHARED_QUEUE_DB)
+    agent = WorkflowAgent(api_key=api_key)
+    lease = Config.WORKER_LEASE_SECONDS
+    in_progress: Set[str] = set()
+    running: Set[asyncio.Task] = set()
+    logger.info("Worker %s started", worker_id)
+
+    async def renew_leases():
+        while True:
+            await asyncio.sleep(lease / 3)
+            if in_progress:
+                await asyncio.to_thread(shared.renew, worker_id, list(in_progress), lease)
+
+    async def run(task: ResearchTask) -> None:
+        try:
+            result = (await agent.process_batch([task]))[0]
+            # SQLite writes wait on the write lock, so keep them off the loop
+            if not await asyncio.to_thread(shared.finish, worker_id, task.task_id, task.status,
+                                           result=result, error=task.error):
+                logger.warning("Lease on task %s was lost before it finished", task.task_id)
+        except Exception:
+            logger.exception("Failed to record the outcome of task %s", task.task_id)
+        finally:
+            in_progress.discard(task.task_id)
+
+    renewer = asyncio.create_task(renew_leases())
+    stopping = asyncio.create_task(stop.wait())
+    try:
+        while not stop.is_set():
+            free = agent.max_workers - len(running)
+            rows = await asyncio.to_thread(shared.claim, worker_id, free, lease) if free else []
+            for row in rows:
+                task = ResearchTask(query=row['query'], category=row['category'], importance=row['importance'],
+                                    created_at=row['created_at'], task_id=row['task_id'])
+                in_progress.add(task.task_id)
+                runner = asyncio.create_task(run(task))
+                running.add(runner)
+                runner.add_done_callback(running.discard)
+            # Claim again when a slot frees up, or after the poll interval if the queue was empty
+            await asyncio.wait({stopping, *running}, timeout=Config.WORKER_POLL_INTERVAL,
+                               return_when=asyncio.FIRST_COMPLETED)
+        # Let claimed tasks finish rather than leaving them for their leases to expire
+        if running:
+            await asyncio.gather(*running, return_exceptions=True)
+    finally:
+        renewer.cancel()
+        stopping.cancel()
+        await agent.close()
+        logger.info("Worker %s stopped", worker_id)
+
+def worker_main(index: int) -> None:
+    load_dotenv()
+    worker_id = f"{socket.gethostname()}-{os.getpid()}-{index}"
+
+    async def main():
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop.set)
+        await run_worker(worker_id, stop)
+
+    asyncio.run(main())
+
+def supervise(processes: int) -> None:
+    """Run worker processes and restart any that exit unexpectedly"""
+    workers = {}
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    while not stopping:
+        for index in range(processes):
+            process = workers.get(index)
+            if process is None or not process.is_alive():
+                if process is not None:
+                    logger.warning("Worker %d exited with code %s, restarting", index, process.exitcode)
+                process = multiprocessing.Process(target=worker_main, args=(index,), name=f"research-worker-{index}")
+                process.start()
+                workers[index] = process
+        time.sleep(1)
+
+    for process in workers.values():
+        process.terminate()
+    for process in workers.values():
+        process.join()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run research worker processes against the shared queue")
+    parser.add_argument('--processes', type=int, default=Config.WORKER_PROCESSES,
+                        help="number of worker processes (default: WORKER_PROCESSES or the CPU count)")
+    args = parser.parse_args()
+    supervise(max(1, args.processes))
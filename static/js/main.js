@@ -102,105 +102,147 @@ taskForm.addEventListener('submit', async (e) => {
 
 // Process tasks button
 processButton.addEventListener('click', async () => {
-    console.log('Processing tasks...');  // Debug log
     loadingOverlay.classList.remove('hidden');
     showNotification('Processing tasks...', 'info');
     
     try {
-        const response = await fetch('http://localhost:5002/api/process-tasks', {
+        const response = await fetch('http://localhost:5002/api/process-tasks?stream=1', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
-                'Accept': 'application/json'
+                'Accept': 'application/x-ndjson'
             }
         });
 
         if (!response.ok) {
-            throw new Error(`HTTP error! status: ${response.status}`);
+            const data = await response.json().catch(() => ({}));
+            throw new Error(data.message || `HTTP error! status: ${response.status}`);
         }
-        
-        const data = await response.json();
-        console.log('Process tasks response:', data);  // Debug log
-        
-        if (data.status === 'success' && data.results) {
-            displayResults(data.results);
-            await updateQueueStatus();
-            showNotification('Tasks processed successfully!', 'success');
+
+        let received = 0;
+        let failed = 0;
+        let total = null;
+        resultsContainer.innerHTML = '';
+
+        // The first line is {"total": n}; every later line is one finished task
+        await readNdjson(response, line => {
+            if (total === null && 'total' in line) {
+                total = line.total;
+                if (total === 0) {
+                    resultsContainer.innerHTML = '<p>No results to display.</p>';
+                }
+                return;
+            }
+            if (received === 0) {
+                // Show the first result as soon as it arrives instead of waiting for the batch
+                loadingOverlay.classList.add('hidden');
+            }
+            received += 1;
+            if (line.result.status !== 'success') {
+                failed += 1;
+            }
+            appendResult(line);
+        });
+
+        if (failed > 0) {
+            showNotification(`${failed} of ${received} tasks failed`, 'error');
         } else {
-            showNotification(data.message || 'Error processing tasks', 'error');
+            showNotification('Tasks processed successfully!', 'success');
         }
     } catch (error) {
         console.error('Error:', error);
         showNotification(`Error processing tasks: ${error.message}`, 'error');
     } finally {
         loadingOverlay.classList.add('hidden');
+        await updateQueueStatus();
     }
 });
 
-// Display results
-function displayResults(results) {
-    console.log('Displaying results:', results);  // Debug log
-    
-    if (!results || results.length === 0) {
-        resultsContainer.innerHTML = '<p>No results to display.</p>';
-        return;
+// Read an NDJSON response body, calling onLine with each parsed line as it arrives
+async function readNdjson(response, onLine) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    while (true) {
+        const { value, done } = await reader.read();
+        buffer += decoder.decode(value || new Uint8Array(), { stream: !done });
+        let newline;
+        while ((newline = buffer.indexOf('\n')) >= 0) {
+            const text = buffer.slice(0, newline).trim();
+            buffer = buffer.slice(newline + 1);
+            if (text) {
+                onLine(JSON.parse(text));
+            }
+        }
+        if (done) {
+            break;
+        }
     }
+    if (buffer.trim()) {
+        onLine(JSON.parse(buffer));
+    }
+}
 
-    resultsContainer.innerHTML = results.map(result => {
-        const query = result.query;
-        const highlightedQuery = highlightKeywords(query);
-        
-        return `
-            <div class="result-card">
-                <div class="result-header">
-                    <div class="query-section">
-                        <div class="query-text">${highlightedQuery}</div>
-                        <div class="category-badge">${escapeHtml(result.category)}</div>
+// Add one result card below the ones already shown
+function appendResult(result) {
+    resultsContainer.insertAdjacentHTML('beforeend', renderResult(result));
+}
+
+function renderResult(result) {
+    const query = result.query;
+    const highlightedQuery = highlightKeywords(query);
+    
+    return `
+        <div class="result-card">
+            <div class="result-header">
+                <div class="query-section">
+                    <div class="query-text">${highlightedQuery}</div>
+                    <div class="category-badge">${escapeHtml(result.category)}</div>
+                </div>
+                <div class="status-badge ${result.result.status}">
+                    ${formatStatus(result.result.status)}
+                </div>
+            </div>
+            
+            ${result.result.error ? 
+                `<div class="error-message">${escapeHtml(result.result.error)}</div>` :
+                `<div class="result-content">
+                    <div class="research-results">
+                        <h4>Research Results:</h4>
+                        <p>${formatContent(result.result.research_results.answer || 'No answer available')}</p>
                     </div>
-                    <div class="status-badge ${result.result.status}">
-                        ${formatStatus(result.result.status)}
+                    
+                    <div class="reasoning-analysis">
+                        <h4>AI Analysis:</h4>
+                        <p>${formatContent(result.result.reasoning_analysis || 'No analysis available')}</p>
                     </div>
-                </div>
-                
-                ${result.result.error ? 
-                    `<div class="error-message">${escapeHtml(result.result.error)}</div>` :
-                    `<div class="result-content">
-                        <div class="research-results">
-                            <h4>Research Results:</h4>
-                            <p>${formatContent(result.result.research_results.answer || 'No answer available')}</p>
-                        </div>
-                        
-                        <div class="reasoning-analysis">
-                            <h4>AI Analysis:</h4>
-                            <p>${formatContent(result.result.reasoning_analysis || 'No analysis available')}</p>
-                        </div>
-                        
-                        ${result.result.research_results.sources ? `
-                            <div class="sources-section">
-                                <h4>Sources:</h4>
-                                <div class="source-list">
-                                    ${result.result.research_results.sources.map(source => `
-                                        <a href="${escapeHtml(source.url)}" class="source-item" target="_blank">
-                                            ${escapeHtml(source.title || source.url)}
-                                        </a>
-                                    `).join('')}
-                                </div>
-                            </div>
-                        ` : ''}
-                        
-                        <div class="follow-up-section">
-                            <h4>Suggested Follow-up Questions:</h4>
-                            <div class="follow-up-questions">
-                                ${generateFollowUpQuestions(query).map(q => `
-                                    <button class="follow-up-question" onclick="addFollowUpQuery('${escapeHtml(q)}')">${escapeHtml(q)}</button>
+                    
+                    ${result.result.research_results.results && result.result.research_results.results.length ? `
+                        <div class="sources-section">
+                            <h4>Sources:</h4>
+                            <div class="source-list">
+                                ${result.result.research_results.results.map(source => `
+                                    <a href="${escapeHtml(source.url)}" class="source-item" target="_blank">
+                                        ${escapeHtml(source.title || source.url)}
+                                    </a>
                                 `).join('')}
                             </div>
                         </div>
-                    </div>`
-                }
-            </div>
-        `;
-    }).join('');
+                    ` : ''}
+                    
+                    <div class="follow-up-section">
+                        <h4>Suggested Follow-up Questions:</h4>
+                        <div class="follow-up-questions">
+                            ${generateFollowUpQuestions(query).map(q => `
+                                <button class="follow-up-question" onclick="addFollowUpQuery('${escapeHtml(q)}')">${escapeHtml(q)}</button>
+                            `).join('')}
+                        </div>
+                    </div>
+                </div>`
+            }
+        </div>
+    `;
 }
 
 // Helper function to highlight keywords
@@ -257,10 +299,13 @@ function addFollowUpQuery(question) {
     queryInput.focus();
 }
 
+// Tasks currently shown in the queue, keyed by task_id
+const queueTasks = new Map();
+
 // Update queue status
 async function updateQueueStatus() {
     try {
-        const response = await fetch('http://localhost:5002/api/queue-status', {
+        const response = await fetch('http://localhost:5002/api/queue-status?summary=1', {
             headers: {
                 'Accept': 'application/json'
             }
@@ -273,32 +318,11 @@ async function updateQueueStatus() {
         const data = await response.json();
         console.log('Queue status:', data);  // Debug log
         
+        queueTasks.clear();
         if (data.status === 'success' && data.tasks) {
-            if (data.tasks.length === 0) {
-                queueList.innerHTML = '<p>No tasks in queue.</p>';
-                processButton.disabled = true;
-                return;
-            }
-
-            queueList.innerHTML = data.tasks.map(task => `
-                <div class="queue-item ${task.status}">
-                    <div class="task-header">
-                        <strong>${escapeHtml(task.query)}</strong>
-                        ${task.status ? `<span class="status-badge ${task.status}">${formatStatus(task.status)}</span>` : ''}
-                    </div>
-                    <div class="task-details">
-                        <span>Category: ${escapeHtml(task.category)}</span>
-                        <span>Priority: ${task.importance}</span>
-                    </div>
-                    ${task.error ? `<div class="error-message">${escapeHtml(task.error)}</div>` : ''}
-                </div>
-            `).join('');
-            
-            processButton.disabled = false;
-        } else {
-            queueList.innerHTML = '<p>No tasks in queue.</p>';
-            processButton.disabled = true;
+            data.tasks.forEach(task => queueTasks.set(task.task_id, task));
         }
+        renderQueue();
     } catch (error) {
         console.error('Error updating queue status:', error);
         showNotification(`Error updating queue status: ${error.message}`, 'error');
@@ -306,6 +330,100 @@ async function updateQueueStatus() {
     }
 }
 
+function renderQueue() {
+    if (queueTasks.size === 0) {
+        queueList.innerHTML = '<p>No tasks in queue.</p>';
+        processButton.disabled = true;
+        return;
+    }
+
+    queueList.innerHTML = Array.from(queueTasks.values()).map(task => `
+        <div class="queue-item ${task.status}">
+            <div class="task-header">
+                <strong>${escapeHtml(task.query)}</strong>
+                ${task.status ? `<span class="status-badge ${task.status}">${formatStatus(task.status)}</span>` : ''}
+            </div>
+            <div class="task-details">
+                <span>Category: ${escapeHtml(task.category)}</span>
+                <span>Priority: ${task.importance}</span>
+            </div>
+            ${task.error ? `<div class="error-message">${escapeHtml(task.error)}</div>` : ''}
+            ${task.status === 'pending' || task.status === 'processing' ?
+                `<button class="cancel-task" onclick="cancelTask('${escapeHtml(task.task_id)}')">Cancel</button>` : ''}
+        </div>
+    `).join('');
+
+    processButton.disabled = !Array.from(queueTasks.values()).some(task => task.status === 'pending');
+}
+
+async function cancelTask(taskId) {
+    try {
+        const response = await fetch(`http://localhost:5002/api/tasks/${encodeURIComponent(taskId)}/cancel`, {
+            method: 'POST'
+        });
+        const data = await response.json();
+        if (data.status !== 'success') {
+            throw new Error(data.message || `HTTP error! status: ${response.status}`);
+        }
+    } catch (error) {
+        console.error('Error cancelling task:', error);
+        showNotification(`Error cancelling task: ${error.message}`, 'error');
+    }
+}
+
+// Apply one task event from the server to the queue view
+function applyTaskEvent(type, task) {
+    if (type === 'task_cancelled') {
+        queueTasks.delete(task.task_id);
+    } else if (type === 'task_added') {
+        queueTasks.set(task.task_id, task);
+        // Keep the view in priority order, as the server does
+        const sorted = Array.from(queueTasks.values()).sort((a, b) => b.importance - a.importance);
+        queueTasks.clear();
+        sorted.forEach(t => queueTasks.set(t.task_id, t));
+    } else {
+        queueTasks.set(task.task_id, { ...queueTasks.get(task.task_id), ...task });
+    }
+    renderQueue();
+}
+
+// Live queue updates over Server-Sent Events, falling back to polling
+let pollTimer = null;
+
+function startPolling() {
+    if (!pollTimer) {
+        pollTimer = setInterval(updateQueueStatus, 5000);
+    }
+}
+
+function stopPolling() {
+    clearInterval(pollTimer);
+    pollTimer = null;
+}
+
+function connectEvents() {
+    if (!window.EventSource) {
+        startPolling();
+        return;
+    }
+
+    const source = new EventSource('http://localhost:5002/api/events');
+    source.onopen = () => {
+        stopPolling();
+        updateQueueStatus();
+    };
+    // EventSource reconnects by itself; poll until it does
+    source.onerror = () => startPolling();
+
+    ['task_added', 'task_started', 'task_completed', 'task_failed', 'task_timed_out', 'task_cancelled'].forEach(type => {
+        source.addEventListener(type, (e) => applyTaskEvent(type, JSON.parse(e.data)));
+    });
+    // We fell behind and missed events, so reload the full state
+    source.addEventListener('reset', () => updateQueueStatus());
+    // Bulk uploads send one event for the whole batch
+    source.addEventListener('tasks_added', () => updateQueueStatus());
+}
+
 // Helper functions
 function formatStatus(status) {
     return {
@@ -313,6 +431,8 @@ function formatStatus(status) {
         'processing': '⚙️ Processing',
         'completed': '✅ Complete',
         'failed': '❌ Failed',
+        'cancelled': '🚫 Cancelled',
+        'timed_out': '⏱️ Timed out',
         'success': '✅ Success',
         'error': '❌ Error',
         'partial': '⚠️ Partial'
@@ -340,8 +460,8 @@ function escapeHtml(unsafe) {
 // Initial queue status update
 updateQueueStatus();
 
-// Auto-refresh queue status every 5 seconds
-setInterval(updateQueueStatus, 5000);
+// Keep the queue up to date
+connectEvents();
 
 // Add styles for status badges
 document.head.insertAdjacentHTML('beforeend', `
@@ -357,6 +477,8 @@ document.head.insertAdjacentHTML('beforeend', `
         .status-badge.partial { background-color: #F59E0B; color: white; }
         .status-badge.error { background-color: #EF4444; color: white; }
         .status-badge.processing { background-color: #3B82F6; color: white; }
+        .status-badge.timed_out { background-color: #F59E0B; color: white; }
+        .status-badge.cancelled { background-color: #6B7280; color: white; }
         
         .task-header {
             display: flex;
@@ -379,5 +501,11 @@ document.head.insertAdjacentHTML('beforeend', `
             margin: 0.5rem 0;
             color: #EF4444;
         }
+        
+        .cancel-task {
+            margin-top: 0.5rem;
+            font-size: 0.75rem;
+            padding: 0.25rem 0.5rem;
+        }
     </style>
 `);
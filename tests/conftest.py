@@ -0,0 +1,31 @@
+import os
+import sys
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Modules under src/ import each other top-level; the fake client lives with the benchmarks
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+os.environ.setdefault('TAVILY_API_KEY', 'test')
+
+from agent import WorkflowAgent
+from cache import LRUCache, ResultsCache
+from events import EventBus
+from rate_limiter import RateLimiter
+from retry import CircuitBreaker, RetryPolicy
+
+@pytest.fixture
+def make_agent():
+    """Factory for agents wired to a given client, with no rate limit, short retry delays and an in-memory cache"""
+    def make(client, max_retries=3, breaker=None, results_cache=None, **kwargs):
+        return WorkflowAgent(
+            api_key='test',
+            client=client,
+            rate_limiter=RateLimiter(calls=10 ** 9, period=1),
+            results_cache=results_cache if results_cache is not None else ResultsCache(LRUCache(ttl=None)),
+            events=EventBus(),
+            retry_policy=RetryPolicy(max_retries=max_retries, base_delay=0.001, max_delay=0.01),
+            circuit_breaker=breaker or CircuitBreaker('test', failure_threshold=10 ** 9),
+            **kwargs
+        )
+    return make
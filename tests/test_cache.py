@@ -0,0 +1,61 @@
+"""Results cache tiers and the counters they expose"""
+import threading
+import time
+import pytest
+from cache import LRUCache, ResultsCache, SQLiteCache
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(max_entries=2, ttl=None)
+    cache.set('a', {'n': 1})
+    cache.set('b', {'n': 2})
+    cache.get('a')
+    cache.set('c', {'n': 3})
+    assert cache.get('b') is None
+    assert cache.get('a') == {'n': 1}
+    assert cache.evictions == 1
+
+@pytest.mark.parametrize('operation', [
+    lambda cache: cache.get('a'),
+    lambda cache: cache.set('b', {'n': 2}),
+    lambda cache: cache.delete('a'),
+    lambda cache: cache.clear()
+])
+def test_lru_operations_wait_for_the_lock(operation):
+    # Handler threads share the cache, so no operation may touch it while another holds the lock
+    cache = LRUCache(max_entries=1, ttl=None)
+    cache.set('a', {'n': 1})
+    done = threading.Event()
+    worker = threading.Thread(target=lambda: (operation(cache), done.set()))
+    with cache._lock:
+        worker.start()
+        assert not done.wait(0.05)
+    worker.join(1)
+    assert done.is_set()
+
+def test_sqlite_prunes_past_max_entries(tmp_path):
+    cache = SQLiteCache(str(tmp_path / 'cache.db'), ttl=None, max_entries=3, prune_every=1)
+    for i in range(5):
+        cache.set(f'k{i}', {'n': i})
+        time.sleep(0.001)
+    assert len(cache) == 3
+    assert cache.evictions == 2
+    assert cache.get('k0') is None
+    assert cache.get('k4') == {'n': 4}
+
+def test_expirations_are_counted(tmp_path):
+    cache = ResultsCache(LRUCache(ttl=0.01), SQLiteCache(str(tmp_path / 'cache.db'), ttl=0.01))
+    cache.set('k', {'n': 1})
+    time.sleep(0.02)
+    assert cache.get('k') is None
+    assert cache.tier_counts('expirations') == {('memory',): 1, ('persistent',): 1}
+
+def test_agent_exports_tier_counters(make_agent, tmp_path):
+    from fake_tavily import FakeTavilyClient
+    cache = ResultsCache(LRUCache(max_entries=1, ttl=None), SQLiteCache(str(tmp_path / 'cache.db'), ttl=None))
+    agent = make_agent(FakeTavilyClient(), results_cache=cache)
+    cache.set('a', {'n': 1})
+    cache.set('b', {'n': 2})
+    text = agent.metrics.render()
+    assert 'research_cache_evictions_total{tier="memory"} 1' in text
+    assert 'research_cache_evictions_total{tier="persistent"} 0' in text
+    assert '# TYPE research_cache_evictions_total counter' in text
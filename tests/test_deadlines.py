@@ -0,0 +1,65 @@
+"""Deadlines, timeouts and cancellation of research tasks"""
+import asyncio
+from datetime import datetime, timedelta
+from agent import ResearchTask
+from fake_tavily import FakeTavilyClient, LatencyModel
+from scheduler import DeadlineScheduler
+
+def test_cancelled_pending_task_can_still_be_looked_up(make_agent):
+    agent = make_agent(FakeTavilyClient())
+    task_id = agent.add_task("a question", 'general', 2)
+    assert agent.cancel_task(task_id)
+    assert agent.get_task(task_id).status == "cancelled"
+    assert agent.cancel_task(task_id) is False
+    assert asyncio.run(agent.process_tasks()) == []
+
+def test_scheduler_runs_urgent_tasks_first():
+    now = datetime.now()
+    tasks = [
+        ResearchTask(query='important', category='general', importance=5, created_at=now),
+        ResearchTask(query='relaxed', category='general', importance=1, created_at=now,
+                     deadline=now + timedelta(minutes=10)),
+        ResearchTask(query='urgent', category='general', importance=1, created_at=now,
+                     deadline=now + timedelta(seconds=3)),
+        ResearchTask(query='routine', category='general', importance=3, created_at=now)
+    ]
+    scheduler = DeadlineScheduler(tasks, expected_seconds=lambda task: 1.0, urgent_slack=5.0)
+    order = []
+    while len(scheduler):
+        order.append(scheduler.next()[1].query)
+    assert order == ['urgent', 'important', 'routine', 'relaxed']
+    assert scheduler.next() is None
+    assert scheduler.slack(tasks[0]) is None
+
+def test_slow_search_times_out(make_agent):
+    agent = make_agent(FakeTavilyClient(latency=LatencyModel('constant', 1.0)))
+    task_id = agent.add_task("a slow question", 'general', 2, timeout=0.05)
+    [result] = asyncio.run(agent.process_tasks())
+    assert result['result'] == {'status': 'timed_out', 'error': 'Deadline exceeded'}
+    assert agent.get_task(task_id).status == "timed_out"
+    # A timeout says nothing about how long the search takes
+    assert agent._estimate('basic') == 0
+
+def test_task_past_its_deadline_is_not_searched(make_agent):
+    client = FakeTavilyClient()
+    agent = make_agent(client)
+    task_id = agent.add_task("a late question", 'general', 2)
+    agent.get_task(task_id).deadline = datetime.now() - timedelta(seconds=1)
+    [result] = asyncio.run(agent.process_tasks())
+    assert result['result']['status'] == 'timed_out'
+    assert client.calls == 0
+
+def test_running_task_can_be_cancelled(make_agent):
+    agent = make_agent(FakeTavilyClient(latency=LatencyModel('constant', 1.0)))
+    task_id = agent.add_task("a long question", 'general', 2)
+
+    async def main():
+        batch = asyncio.ensure_future(agent.process_tasks())
+        while agent.get_task(task_id).status != "processing":
+            await asyncio.sleep(0.001)
+        assert agent.cancel_task(task_id)
+        return await batch
+
+    [result] = asyncio.run(main())
+    assert result['result'] == {'status': 'cancelled', 'error': 'Cancelled while processing'}
+    assert agent.get_task(task_id).status == "cancelled"
@@ -0,0 +1,66 @@
+"""Durable task records and recovery after a restart"""
+import sqlite3
+from datetime import datetime, timedelta
+from agent import ResearchTask
+from fake_tavily import FakeTavilyClient
+from persistence import TaskStore
+
+def test_recovered_tasks_keep_their_deadline(make_agent, tmp_path):
+    db = str(tmp_path / 'tasks.db')
+    agent = make_agent(FakeTavilyClient(), store=TaskStore(db))
+    task_id = agent.add_task("a question", 'general', 2, timeout=60)
+    deadline = agent.get_task(task_id).deadline
+    agent.store.close()
+
+    restarted = make_agent(FakeTavilyClient(), store=TaskStore(db))
+    assert restarted.recover() == 1
+    assert restarted.get_task(task_id).deadline == deadline
+    restarted.store.close()
+
+def test_tables_without_a_deadline_column_are_migrated(tmp_path):
+    db = str(tmp_path / 'tasks.db')
+    conn = sqlite3.connect(db)
+    conn.execute(
+        "CREATE TABLE tasks (task_id TEXT PRIMARY KEY, query TEXT NOT NULL, category TEXT NOT NULL, "
+        "importance INTEGER NOT NULL, created_at TEXT NOT NULL, status TEXT NOT NULL, "
+        "error TEXT, updated_at REAL NOT NULL)"
+    )
+    created_at = datetime.now() - timedelta(minutes=1)
+    conn.execute("INSERT INTO tasks VALUES ('t1', 'q', 'general', 2, ?, 'pending', NULL, 0)",
+                 (created_at.isoformat(),))
+    conn.commit()
+    conn.close()
+
+    store = TaskStore(db)
+    assert store.load_unfinished() == [('t1', 'q', 'general', 2, created_at, 'pending', None)]
+    store.close()
+
+def test_unfinished_tasks_are_requeued_and_finished_rows_compacted(make_agent, tmp_path):
+    db = str(tmp_path / 'tasks.db')
+    agent = make_agent(FakeTavilyClient(), store=TaskStore(db))
+    done, running, waiting = (agent.add_task(query, 'general', 2) for query in ('done', 'running', 'waiting'))
+    agent.get_task(done).status = "completed"
+    agent.get_task(running).status = "processing"
+    agent.store.record_many([agent.get_task(done), agent.get_task(running)])
+    agent.store.close()
+
+    store = TaskStore(db)
+    restarted = make_agent(FakeTavilyClient(), store=store)
+    assert restarted.recover() == 2
+    assert [task.task_id for task in restarted.task_queue.pop_all()] == [running, waiting]
+    assert restarted.get_task(running).status == "pending"
+    store.close()
+    conn = sqlite3.connect(db)
+    assert conn.execute("SELECT task_id FROM tasks WHERE task_id = ?", (done,)).fetchall() == []
+    assert dict(conn.execute("SELECT task_id, status FROM tasks").fetchall()) == {
+        running: 'pending', waiting: 'pending'}
+
+def test_only_the_latest_state_of_a_task_is_written(tmp_path):
+    store = TaskStore(str(tmp_path / 'tasks.db'), flush_interval=1)
+    task = ResearchTask(query='q', category='general', importance=2, created_at=datetime.now())
+    for status in ('pending', 'processing', 'pending'):
+        task.status = status
+        store.record(task)
+    store.close()
+    [row] = store.load_unfinished()
+    assert row[0] == task.task_id and row[5] == 'pending'
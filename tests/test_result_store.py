@@ -0,0 +1,70 @@
+"""Content-addressed result storage shared by tasks"""
+import asyncio
+import result_store
+from fake_tavily import FakeTavilyClient
+from result_store import ResultStore
+
+def response(answer='An answer', response_time=0.5):
+    return {
+        'query': 'q',
+        'answer': answer,
+        'response_time': response_time,
+        'results': [{'title': 'T', 'url': 'https://example.com/a', 'content': 'text', 'score': 0.9, 'raw_content': None}]
+    }
+
+def test_stored_object_is_not_hashed_again(monkeypatch):
+    store = ResultStore()
+    key = store.put(response())
+    stored = store.get(key)
+    calls = []
+    monkeypatch.setattr(result_store, 'result_id', lambda value: calls.append(value) or key)
+    assert store.put(stored, compact=False) == key
+    assert calls == []
+    assert store.stats()['references'] == 2
+
+def test_cached_search_results_are_the_stored_copy(make_agent):
+    agent = make_agent(FakeTavilyClient())
+    agent.add_task("what is the tallest mountain", 'general', 2)
+    asyncio.run(agent.process_tasks())
+    [task] = agent.recent_tasks.values()
+    cache_key = agent._cache_key(task.query, 'basic')
+    assert agent.results.get(task.result_id) is agent.results_cache.get(cache_key)
+
+def test_identical_responses_share_one_entry():
+    store = ResultStore()
+    first = store.put(response(response_time=0.5))
+    # Per-call fields do not count towards the content address
+    second = store.put(response(response_time=1.5))
+    other = store.put(response(answer='Another answer'))
+    assert first == second != other
+    assert store.get(first) is store.get(second)
+    assert store.stats() == {'entries': 2, 'references': 3, 'deduplicated': 1}
+
+def test_entry_is_dropped_with_its_last_reference():
+    store = ResultStore()
+    key = store.put(response())
+    store.put(response())
+    store.release(key)
+    assert store.get(key) is not None
+    store.release(key)
+    assert store.get(key) is None
+    assert len(store) == 0
+    # Releasing again, or releasing nothing, is harmless
+    store.release(key)
+    store.release(None)
+
+def test_slim_mode_keeps_only_displayed_fields():
+    store = ResultStore(slim=True)
+    stored = store.get(store.put(response()))
+    assert set(stored) == {'query', 'answer', 'results'}
+    assert set(stored['results'][0]) == {'title', 'url', 'content', 'score'}
+
+def test_tasks_evicted_from_history_release_their_results(make_agent):
+    agent = make_agent(FakeTavilyClient())
+    agent.max_recent_tasks = 1
+    for query in ("first question", "second question"):
+        agent.add_task(query, 'general', 2)
+        asyncio.run(agent.process_tasks())
+    [task] = agent.recent_tasks.values()
+    assert task.query == "second question"
+    assert agent.results.stats() == {'entries': 1, 'references': 1, 'deduplicated': 0}
@@ -0,0 +1,95 @@
+"""Retry policy and circuit breaker, driven through the agent with the fault-injecting fake client"""
+import asyncio
+import time
+import pytest
+from fake_tavily import FakeHTTPError, FakeTavilyClient
+from retry import CircuitBreaker, CircuitOpenError, RetryPolicy, is_transient
+
+def run(agent, *queries):
+    for query in queries:
+        agent.add_task(query, 'general', 2)
+    return [result['result'] for result in asyncio.run(agent.process_tasks())]
+
+@pytest.mark.parametrize('error, transient', [
+    (FakeHTTPError(429), True),
+    (FakeHTTPError(500), True),
+    (FakeHTTPError(503), True),
+    (FakeHTTPError(400), False),
+    (FakeHTTPError(401), False),
+    (FakeHTTPError(404), False),
+    (asyncio.TimeoutError(), True),
+    (ConnectionError(), True),
+    (ValueError("malformed response"), False),
+])
+def test_classifies_transient_errors(error, transient):
+    assert is_transient(error) is transient
+
+def test_transient_errors_are_retried_until_they_succeed(make_agent):
+    client = FakeTavilyClient(error_rate=0.5, error_statuses=(503, 429))
+    agent = make_agent(client, max_retries=10)
+    results = run(agent, *(f"query {i}" for i in range(20)))
+    assert [result['status'] for result in results] == ['success'] * 20
+    assert client.errors > 0
+    assert client.calls == 20 + client.errors
+    assert agent.upstream_retries.value() == client.errors
+
+def test_permanent_errors_are_not_retried(make_agent):
+    client = FakeTavilyClient(error_rate=1.0, error_statuses=(400,))
+    breaker = CircuitBreaker('test', failure_threshold=1)
+    results = run(make_agent(client, breaker=breaker), "bad request")
+    assert results[0]['status'] == 'error'
+    assert client.calls == 1
+    # A bad request says nothing about the upstream's health
+    assert breaker.state == CircuitBreaker.CLOSED
+
+def test_gives_up_after_max_retries(make_agent):
+    client = FakeTavilyClient(error_rate=1.0, error_statuses=(503,))
+    results = run(make_agent(client, max_retries=2), "always down")
+    assert results[0]['status'] == 'error'
+    assert "after 3 attempts" in results[0]['error']
+    assert client.calls == 3
+
+def test_retry_after_sets_the_minimum_delay():
+    policy = RetryPolicy(max_retries=3, base_delay=0.001, max_delay=10)
+    assert policy.delay(0, FakeHTTPError(429, {'Retry-After': '2'})) == 2
+    # Capped by max_delay, and ignored when it cannot be parsed
+    assert RetryPolicy(base_delay=0.001, max_delay=1).delay(0, FakeHTTPError(429, {'Retry-After': '30'})) == 1
+    assert policy.delay(0, FakeHTTPError(429, {'Retry-After': 'soon'})) <= 0.001
+
+def test_circuit_opens_fails_fast_and_recovers(make_agent):
+    client = FakeTavilyClient(error_rate=1.0, error_statuses=(503,))
+    breaker = CircuitBreaker('test', failure_threshold=3, recovery_timeout=0.05)
+    agent = make_agent(client, max_retries=0, breaker=breaker)
+
+    for i in range(3):
+        assert run(agent, f"down {i}")[0]['status'] == 'error'
+    assert breaker.state == CircuitBreaker.OPEN
+
+    # While open, calls fail without reaching the upstream
+    calls = client.calls
+    result = run(agent, "while open")[0]
+    assert "is open" in result['error']
+    assert client.calls == calls
+
+    # After the recovery timeout one trial call goes through and closes the circuit
+    time.sleep(0.06)
+    client.error_rate = 0.0
+    assert run(agent, "recovered")[0]['status'] == 'success'
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.times_opened == 1
+
+def test_failed_trial_reopens_the_circuit():
+    breaker = CircuitBreaker('test', failure_threshold=1, recovery_timeout=0.05)
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+    time.sleep(0.06)
+    breaker.before_call()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    # Only one trial call at a time
+    with pytest.raises(CircuitOpenError, match="half-open"):
+        breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.times_opened == 2
@@ -0,0 +1,58 @@
+"""AsyncTavilyClient and the retry path against a local stub server"""
+import asyncio
+from aiohttp import web
+from retry import error_status, is_transient, retry_after
+from search_client import AsyncTavilyClient
+
+async def serve(responses):
+    """Start a stub Tavily endpoint that replies with `responses` in turn; returns (runner, url, requests seen)"""
+    seen = []
+
+    async def search(request):
+        seen.append(await request.json())
+        status, headers, body = responses[min(len(seen), len(responses)) - 1]
+        return web.json_response(body, status=status, headers=headers)
+
+    app = web.Application()
+    app.router.add_post('/search', search)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}/search", seen
+
+def test_http_errors_carry_status_and_retry_after():
+    async def main():
+        runner, url, _ = await serve([(429, {'Retry-After': '3'}, {'detail': 'slow down'})])
+        client = AsyncTavilyClient('test', base_url=url)
+        try:
+            await client.search("query")
+        except Exception as e:
+            return e
+        finally:
+            await client.close()
+            await runner.cleanup()
+
+    error = asyncio.run(main())
+    assert error_status(error) == 429
+    assert is_transient(error)
+    assert retry_after(error) == 3
+
+def test_agent_retries_a_503_from_the_server(make_agent):
+    body = {'query': 'q', 'answer': 'an answer', 'results': [{'title': 't', 'url': 'https://nature.com/a', 'content': 'c'}]}
+
+    async def main():
+        runner, url, seen = await serve([(503, {}, {'detail': 'unavailable'}), (200, {}, body)])
+        agent = make_agent(AsyncTavilyClient('test', base_url=url))
+        agent.add_task("query", 'general', 2)
+        try:
+            return await agent.process_tasks(), seen
+        finally:
+            await agent.close()
+            await runner.cleanup()
+
+    results, seen = asyncio.run(main())
+    assert results[0]['result']['status'] == 'success'
+    assert len(seen) == 2
+    assert seen[0]['query'] == "query" and seen[0]['api_key'] == 'test'
@@ -0,0 +1,44 @@
+"""Tiered search: when a basic search escalates to advanced"""
+import asyncio
+import pytest
+from fake_tavily import FakeTavilyClient
+
+class FixedSourcesClient(FakeTavilyClient):
+    """Fake client whose results all come from the given domains, with a long answer"""
+
+    def __init__(self, domains, **kwargs):
+        super().__init__(**kwargs)
+        self.domains = domains
+        self.depths = []
+
+    async def search(self, query, search_depth="basic", **kwargs):
+        self.depths.append(search_depth)
+        return await super().search(query, search_depth=search_depth, **kwargs)
+
+    def make_response(self, query, max_results=5, include_answer=True):
+        response = super().make_response(query, max_results, include_answer)
+        for i, result in enumerate(response['results']):
+            result['url'] = f"https://{self.domains[i % len(self.domains)]}/page/{i}"
+        response['answer'] = "a detailed answer " * 20
+        return response
+
+def run_tiered(make_agent, client):
+    agent = make_agent(client)
+    agent.search_mode = "tiered"
+    agent.add_task("tiered query", 'general', 5)
+    return asyncio.run(agent.process_tasks())[0]['result']
+
+@pytest.mark.parametrize('domains', [('example.com', 'random-blog.net'), ('nytimes.com',)])
+def test_long_answer_from_unknown_domains_escalates(make_agent, domains):
+    client = FixedSourcesClient(domains)
+    result = run_tiered(make_agent, client)
+    assert result['escalated'] is True
+    assert result['search_depth'] == "advanced"
+    assert client.depths == ["basic", "advanced"]
+
+def test_long_answer_with_a_credible_source_stays_basic(make_agent):
+    client = FixedSourcesClient(('example.com', 'nature.com'))
+    result = run_tiered(make_agent, client)
+    assert result['escalated'] is False
+    assert result['search_depth'] == "basic"
+    assert client.depths == ["basic"]
@@ -0,0 +1,48 @@
+"""Leases, retries and outcomes in the SQLite queue shared with worker processes"""
+import time
+import pytest
+from shared_queue import SharedTaskQueue
+
+@pytest.fixture
+def shared(tmp_path):
+    return SharedTaskQueue(str(tmp_path / 'shared.db'), max_attempts=2)
+
+def test_claims_follow_priority_and_lease_once(shared):
+    low, high = shared.enqueue([('low', 'general', 1), ('high', 'general', 5)])
+    assert [row['task_id'] for row in shared.claim('w1', 1, lease_seconds=60)] == [high]
+    assert [row['task_id'] for row in shared.claim('w2', 5, lease_seconds=60)] == [low]
+    assert shared.claim('w3', 5, lease_seconds=60) == []
+
+def test_expired_lease_is_claimed_by_another_worker(shared):
+    [task_id] = shared.enqueue([('q', 'general', 2)])
+    shared.claim('w1', 1, lease_seconds=0.01)
+    time.sleep(0.02)
+    assert [row['task_id'] for row in shared.claim('w2', 1, lease_seconds=60)] == [task_id]
+    # The first worker lost its lease, so its outcome is not recorded
+    assert shared.finish('w1', task_id, 'completed') is False
+    assert shared.finish('w2', task_id, 'completed', result={'result': {}}) is True
+    assert shared.get(task_id)['status'] == 'completed'
+
+def test_renewed_lease_is_kept(shared):
+    shared.enqueue([('q', 'general', 2)])
+    [row] = shared.claim('w1', 1, lease_seconds=0.05)
+    shared.renew('w1', [row['task_id']], lease_seconds=60)
+    time.sleep(0.06)
+    assert shared.claim('w2', 1, lease_seconds=60) == []
+
+def test_task_fails_after_max_attempts(shared):
+    [task_id] = shared.enqueue([('q', 'general', 2)])
+    for worker in ('w1', 'w2'):
+        assert shared.claim(worker, 1, lease_seconds=0.01)
+        time.sleep(0.02)
+    assert shared.claim('w3', 1, lease_seconds=60) == []
+    task = shared.get(task_id)
+    assert task['status'] == 'failed'
+    assert task['error'] == 'Lease expired too many times'
+
+def test_only_pending_tasks_can_be_cancelled(shared):
+    first, second = shared.enqueue([('a', 'general', 5), ('b', 'general', 1)])
+    shared.claim('w1', 1, lease_seconds=60)
+    assert shared.cancel(first) is False
+    assert shared.cancel(second) is True
+    assert shared.counts() == {'processing': 1, 'cancelled': 1}
@@ -0,0 +1,65 @@
+"""Coalescing of identical in-flight fetches"""
+import asyncio
+import pytest
+from cache import SingleFlight
+from fake_tavily import FakeTavilyClient, LatencyModel
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight()
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return {'value': calls}
+
+    async def main():
+        return await asyncio.gather(*(flight.do('key', fetch) for _ in range(5)))
+
+    results = asyncio.run(main())
+    assert calls == 1
+    assert results == [{'value': 1}] * 5
+    assert flight.stats() == {'in_flight': 0, 'upstream_calls': 1, 'coalesced': 4}
+
+def test_a_cancelled_caller_does_not_cancel_the_shared_call():
+    flight = SingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0.02)
+        return 'done'
+
+    async def main():
+        first = asyncio.ensure_future(flight.do('key', fetch))
+        second = asyncio.ensure_future(flight.do('key', fetch))
+        await asyncio.sleep(0.005)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(main()) == 'done'
+
+def test_errors_reach_every_caller_and_clear_the_key():
+    flight = SingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0.01)
+        raise ValueError("upstream broke")
+
+    async def main():
+        results = await asyncio.gather(*(flight.do('key', fetch) for _ in range(3)), return_exceptions=True)
+        return results, len(flight)
+
+    results, in_flight = asyncio.run(main())
+    assert all(isinstance(result, ValueError) for result in results)
+    assert in_flight == 0
+
+def test_agent_reports_saved_calls(make_agent):
+    client = FakeTavilyClient(latency=LatencyModel('constant', 0.02))
+    agent = make_agent(client)
+    for _ in range(4):
+        agent.add_task("same question", 'general', 2)
+    results = asyncio.run(agent.process_tasks())
+    assert [result['result']['status'] for result in results] == ['success'] * 4
+    assert client.calls == 1
+    assert agent.search_stats()['coalesced'] == 3
+    assert "research_coalesced_calls_total 3" in agent.metrics.render()
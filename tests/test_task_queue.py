@@ -0,0 +1,57 @@
+"""Priority order, cursors, claims and cancellation in the in-memory task queue"""
+from datetime import datetime, timedelta
+import pytest
+from agent import ResearchTask
+from task_queue import TaskQueue
+
+START = datetime(2024, 1, 1, 12, 0)
+
+def task(name, importance, minutes=0):
+    return ResearchTask(query=name, category='general', importance=importance,
+                        created_at=START + timedelta(minutes=minutes), task_id=name)
+
+@pytest.fixture
+def queue():
+    queue = TaskQueue()
+    queue.push(task('low', 1))
+    queue.push_many([task('high-new', 5, 2), task('high-old', 5, 1), task('mid', 3)])
+    return queue
+
+def test_pops_by_importance_then_age(queue):
+    assert [t.task_id for t in queue.pop_all()] == ['high-old', 'high-new', 'mid', 'low']
+    assert queue.pop() is None
+    # Popped tasks stay looked up by ID until they are removed
+    assert len(queue) == 4 and queue.pending_count == 0
+
+def test_large_batches_keep_heap_order():
+    queue = TaskQueue()
+    queue.push_many([task(f't{i}', i % 5, i) for i in range(200)])
+    popped = [(-t.importance, t.created_at) for t in queue.pop_all()]
+    assert popped == sorted(popped)
+
+def test_cursor_pages_past_a_task(queue):
+    first = queue.page(limit=2)
+    assert [t.task_id for t in first] == ['high-old', 'high-new']
+    cursor = queue.cursor(first[-1].task_id)
+    # A task added ahead of the cursor does not shift the next page
+    queue.push(task('urgent', 9))
+    assert [t.task_id for t in queue.page(limit=2, after=cursor)] == ['mid', 'low']
+
+def test_invalid_cursor_is_rejected(queue):
+    with pytest.raises(ValueError):
+        queue.page(after='not-a-cursor')
+
+def test_claim_takes_only_pending_tasks_in_priority_order(queue):
+    queue.pop()
+    claimed = queue.claim(['low', 'high-old', 'mid', 'unknown'])
+    assert [t.task_id for t in claimed] == ['mid', 'low']
+    assert [t.task_id for t in queue.pop_all()] == ['high-new']
+
+def test_cancel_skips_the_task_lazily(queue):
+    assert queue.cancel('high-old')
+    assert 'high-old' not in queue
+    assert queue.cancel('high-old') is False
+    queue.pop()
+    # Running tasks cannot be cancelled through the queue
+    assert queue.cancel('high-new') is False
+    assert [t.task_id for t in queue.pop_all()] == ['mid', 'low']